@@ -1,4 +1,6 @@
 # gunicorn.conf.py
+import os
+
 # Non logging stuff
 bind = "127.0.0.1:7009"
 # Access log - records incoming HTTP requests
@@ -17,3 +19,27 @@ worker_class = 'sync'
 worker_connections = 1000
 timeout = 30
 keepalive = 2
+
+# Builds the app once on the master and forks the workers from it, so the imported modules
+# and the swagger specs are shared between them, set GUNICORN_PRELOAD_APP=0 to disable
+preload_app = os.getenv('GUNICORN_PRELOAD_APP', '1') == '1'
+
+
+def when_ready(server):
+    """Runs on the master after the app is loaded and before the workers are forked."""
+    if not server.cfg.preload_app:
+        return
+
+    from server.app import App
+    from server.utils import prepare_preload
+    prepare_preload(App('main'))
+
+
+def post_fork(server, worker):
+    """Runs on each worker after the fork, the connections cannot be shared."""
+    if not server.cfg.preload_app:
+        return
+
+    from server.app import App
+    from server.utils import reset_connections
+    reset_connections(App('main'))
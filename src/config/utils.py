@@ -1,5 +1,7 @@
 """Module to contain all the utility functions for the application."""
+import fcntl
 import os
+from contextlib import contextmanager
 
 
 def create_directories(directories):
@@ -8,3 +10,19 @@ def create_directories(directories):
     for directory in directories:
         if not os.path.exists(directory):
             os.makedirs(directory)
+
+
+@contextmanager
+def file_lock(lock_file: str):
+    """Context manager that holds an exclusive lock on a file, used to synchronize the
+    gunicorn workers since they are separated processes.
+
+    :param lock_file: path of the lock file, created if it does not exist
+    :type lock_file: str
+    """
+    with open(lock_file, 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
@@ -0,0 +1,214 @@
+"""Command line tool to audit the indexes of the api database.
+
+The audit checks if every index declared on ``Base.metadata`` exists on the database
+and runs ``EXPLAIN QUERY PLAN`` on the queries issued by the resources, flagging the
+ones that scan a table bigger than the informed threshold. The query plans are read from
+sqlite, the only backend audited, on the formats before and after sqlite 3.36.
+
+Example:
+    python -m database.audit --database sqlite/api.db --threshold 1000
+"""
+import argparse
+import re
+import sys
+from typing import List, NamedTuple
+
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.engine import Engine
+
+import database.models as models
+
+
+class AuditQuery(NamedTuple):
+    """Query issued by the resources that should be audited."""
+    name: str
+    statement: object
+    # queries that list a whole table will always scan it
+    expect_scan: bool = False
+
+
+class AuditResult(NamedTuple):
+    """Result of the query plan of a single query."""
+    name: str
+    table: str
+    rows: int
+    plan: str
+    flagged: bool
+
+
+# the plans before sqlite 3.36 have the word TABLE, as SCAN TABLE user
+PLAN_DETAIL = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?"?(\w+)"?')
+
+TYPE_MODELS = (
+    models.DatabaseTypeModel,
+    models.ConnectionTypeModel,
+    models.ServerTypeModel,
+    models.FunctionTypeModel,
+    models.GroupModel,
+)
+
+
+def build_audit_queries() -> List[AuditQuery]:
+    """Builds the list with the queries issued by the resources.
+
+    :return: list of queries to be audited
+    :rtype: list
+    """
+    queries = []
+    for model in models.Base.__subclasses__():
+        if not hasattr(model, 'id'):
+            continue
+        queries.append(AuditQuery(f'list {model.__tablename__}', select(model), True))
+        queries.append(AuditQuery(f'get {model.__tablename__} by id',
+                                  select(model).where(model.id == 1)))
+
+    for model in TYPE_MODELS:
+        queries.append(AuditQuery(f'get {model.__tablename__} by description',
+                                  select(model).where(model.description == 'admin')))
+
+    queries.extend([
+        AuditQuery('get user by name',
+                   select(models.UserModel).where(models.UserModel.name == 'admin')),
+        AuditQuery('get user_grp by group',
+                   select(models.UserGroupModel).where(models.UserGroupModel.group_id == 1)),
+        AuditQuery('get user_grp by user',
+                   select(models.UserGroupModel).where(models.UserGroupModel.user_id == 1)),
+        AuditQuery('get function_permissions by group',
+                   select(models.FunctionPermissionsModel).where(
+                       models.FunctionPermissionsModel.group_id == 1)),
+        AuditQuery('get database by database_type',
+                   select(models.DatabaseModel).where(
+                       models.DatabaseModel.database_type_id == 1)),
+        AuditQuery('get server by server_type',
+                   select(models.ServerModel).where(models.ServerModel.server_type_id == 1)),
+    ])
+    return queries
+
+
+def check_missing_indexes(engine: Engine) -> List[str]:
+    """Returns the indexes declared on the models that does not exist on the database.
+
+    :param engine: database engine
+    :type engine: Engine
+    :return: list with the name of the missing indexes
+    :rtype: list
+    """
+    inspector = inspect(engine)
+    missing = []
+    for table in models.Base.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index.name for index in table.indexes if index.name not in existing)
+
+    return missing
+
+
+def parse_plan_detail(detail: str) -> tuple:
+    """Returns the operation and the table of a line of the query plan.
+
+    Example:
+        >>> parse_plan_detail('SCAN TABLE user'), parse_plan_detail('SEARCH user USING INDEX')
+        (('SCAN', 'user'), ('SEARCH', 'user'))
+
+    :param detail: detail of a line of EXPLAIN QUERY PLAN
+    :type detail: str
+    :return: operation and table, None if the line does not read a table
+    :rtype: tuple
+    """
+    match = PLAN_DETAIL.match(detail)
+    if not match:
+        return None
+    return match.group(1), match.group(2)
+
+
+def check_sqlite(engine: Engine) -> None:
+    """Refuses the engines of other backends, the query plans are specific to sqlite.
+
+    :param engine: database engine
+    :type engine: Engine
+    :raises ValueError: if the engine is not of a sqlite database
+    """
+    if engine.dialect.name != 'sqlite':
+        raise ValueError(f'The audit only supports sqlite databases, not {engine.dialect.name}')
+
+
+def explain_query(engine: Engine, query: AuditQuery, threshold: int) -> List[AuditResult]:
+    """Runs the EXPLAIN QUERY PLAN for a single query.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param query: query to be explained
+    :type query: AuditQuery
+    :param threshold: number of rows that a table needs to have to flag a scan
+    :type threshold: int
+    :return: one result per table scanned or searched by the query
+    :rtype: list
+    :raises ValueError: if the engine is not of a sqlite database
+    """
+    check_sqlite(engine)
+    tables = set(models.Base.metadata.tables)
+    sql = str(query.statement.compile(dialect=engine.dialect,
+                                      compile_kwargs={'literal_binds': True}))
+    results = []
+    with engine.connect() as connection:
+        plan = connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+        for row in plan:
+            detail = row[-1]
+            parsed = parse_plan_detail(detail)
+            # the subqueries, constant rows and temporary b-trees don't read a table
+            if not parsed or parsed[1] not in tables:
+                continue
+
+            operation, table = parsed
+
+            rows = connection.execute(text(f'SELECT count(*) FROM "{table}"')).scalar()
+            flagged = (operation == 'SCAN' and not query.expect_scan and rows >= threshold)
+            results.append(AuditResult(query.name, table, rows, detail, flagged))
+
+    return results
+
+
+def audit(engine: Engine, threshold: int = 1000) -> tuple:
+    """Audits the database indexes and query plans.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param threshold: number of rows that a table needs to have to flag a scan
+    :type threshold: int
+    :return: missing indexes and the results of the query plans
+    :rtype: tuple
+    :raises ValueError: if the engine is not of a sqlite database
+    """
+    check_sqlite(engine)
+    results = []
+    for query in build_audit_queries():
+        results.extend(explain_query(engine, query, threshold))
+
+    return check_missing_indexes(engine), results
+
+
+def main(argv: list = None) -> int:
+    """Entrypoint of the audit command line."""
+    parser = argparse.ArgumentParser(description='Audit the indexes of the api database.')
+    parser.add_argument('--database', default='sqlite/api.db', help='path of the database file')
+    parser.add_argument('--threshold', default=1000, type=int,
+                        help='minimum number of rows of a table to flag a scan')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f'sqlite:///{args.database}')
+    missing, results = audit(engine, args.threshold)
+
+    for index in missing:
+        print(f'MISSING INDEX {index}')
+
+    for result in results:
+        status = 'FLAG' if result.flagged else 'ok'
+        print(f'{status:<4} {result.name:<45} {result.table:<22} '
+              f'rows={result.rows:<8} {result.plan}')
+
+    if missing or any(result.flagged for result in results):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Module to take snapshots of the database while the api is running and to restore them.
+
+The snapshots are copied with the online backup API of sqlite in a single step. The api
+database is on WAL mode, so the copy reads a consistent snapshot while the api keeps
+writing. A copy made a few pages at a time would be restarted by sqlite on every write of
+another connection, and would never finish on a busy api. The snapshot is written to a
+temporary file and renamed when complete, compressed with gzip if requested.
+
+A restore moves the table versions past every version used before, so the caches of the
+workers drop the data loaded before the restore.
+
+Example:
+    python -m database.backup create --database sqlite/api.db --output backups/api.db.gz
+    python -m database.backup restore --database sqlite/api.db --input backups/api.db.gz
+"""
+import argparse
+import gzip
+import logging
+import os
+import pathlib
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+# added to the table versions on a restore, past the versions bumped while the copy runs
+RESTORE_VERSION_MARGIN = 1000000
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_name(compress: bool = False) -> str:
+    """Returns the file name of a new snapshot, with the date it was taken."""
+    return f'api-{datetime.now():%Y%m%d-%H%M%S}.db' + ('.gz' if compress else '')
+
+
+def copy_database(source: sqlite3.Connection, target: sqlite3.Connection) -> int:
+    """Copies a database with the online backup API in a single step.
+
+    :param source: connection of the database copied
+    :type source: sqlite3.Connection
+    :param target: connection of the copy
+    :type target: sqlite3.Connection
+    :return: number of pages copied
+    :rtype: int
+    """
+    copied = []
+
+    def progress(status, remaining, total):
+        copied[:] = [total]
+
+    # copied in one step, the steps after the first are restarted by any write on source
+    source.backup(target, pages=-1, progress=progress)
+    return copied[0] if copied else 0
+
+
+def bump_table_versions(connection: sqlite3.Connection, versions: dict) -> None:
+    """Moves the versions of the restored tables past the versions used before the restore,
+    otherwise a worker could find a version it already cached for other data.
+
+    :param connection: connection of the restored database
+    :type connection: sqlite3.Connection
+    :param versions: table versions of the database before the restore
+    :type versions: dict
+    """
+    if not table_exists(connection, 'table_version'):
+        return
+
+    offset = max(versions.values(), default=0) + RESTORE_VERSION_MARGIN
+    restored = dict(connection.execute('SELECT table_name, version FROM table_version'))
+    with connection:
+        connection.executemany(
+            'INSERT OR REPLACE INTO table_version (table_name, version) VALUES (?, ?)',
+            [(table, restored.get(table, 0) + offset) for table in set(restored) | set(versions)])
+
+
+def table_exists(connection: sqlite3.Connection, table: str) -> bool:
+    """Returns if the table exists on the database of the connection."""
+    return connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                              (table, )).fetchone() is not None
+
+
+def compress_file(source_path: str, target_path: str) -> None:
+    """Compresses a file with gzip."""
+    with open(source_path, 'rb') as source, gzip.open(target_path, 'wb', 6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+def decompress_file(source_path: str, target_path: str) -> None:
+    """Decompresses a gzip file."""
+    with gzip.open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+def create_backup(database_path: str, output_path: str, compress: bool = None) -> dict:
+    """Takes a snapshot of the database, the file only shows up on the output path when
+    the snapshot is complete.
+
+    :param database_path: path of the database file
+    :type database_path: str
+    :param output_path: path of the snapshot
+    :type output_path: str
+    :param compress: compress with gzip, by default when the output ends with .gz
+    :type compress: bool
+    :return: dict with the path, pages, bytes written and duration in milliseconds
+    :rtype: dict
+    """
+    if compress is None:
+        compress = output_path.endswith('.gz')
+
+    start = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    os.close(fd)
+
+    try:
+        source = sqlite3.connect(database_path)
+        target = sqlite3.connect(temp_path)
+        try:
+            total_pages = copy_database(source, target)
+            # the copy of a WAL database is also marked as WAL, a snapshot is a single file
+            target.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            target.close()
+            source.close()
+
+        if compress:
+            compressed_path = f'{temp_path}.gz'
+            try:
+                compress_file(temp_path, compressed_path)
+                os.replace(compressed_path, temp_path)
+            finally:
+                if os.path.exists(compressed_path):
+                    os.remove(compressed_path)
+
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    duration_ms = round((time.perf_counter() - start) * 1000)
+    result = dict(path=output_path, pages=total_pages, bytes=os.path.getsize(output_path),
+                  duration_ms=duration_ms)
+    logger.info(f'Backup of {database_path} written to {output_path}: {result}')
+    return result
+
+
+def start_backup(database_path: str, output_path: str, compress: bool = None) -> threading.Thread:
+    """Takes a snapshot on a background thread, the failures are only logged.
+
+    :param database_path: path of the database file
+    :type database_path: str
+    :param output_path: path of the snapshot
+    :type output_path: str
+    :param compress: compress with gzip
+    :type compress: bool
+    :return: the thread running the backup
+    :rtype: threading.Thread
+    """
+    def run():
+        try:
+            create_backup(database_path, output_path, compress)
+        except Exception:
+            logger.exception(f'Failed to write the backup {output_path}')
+
+    thread = threading.Thread(target=run, name='backup', daemon=True)
+    thread.start()
+    return thread
+
+
+def restore_backup(input_path: str, database_path: str) -> dict:
+    """Restores a snapshot over the database, the snapshot is checked before and copied
+    with the backup API, so the connections already open see the restored data, and the
+    table versions are moved past the ones used before, so the caches are dropped.
+
+    :param input_path: path of the snapshot, compressed if it ends with .gz
+    :type input_path: str
+    :param database_path: path of the database file
+    :type database_path: str
+    :return: dict with the pages restored and the duration in milliseconds
+    :rtype: dict
+    :raises ValueError: if the snapshot is not a valid database
+    """
+    if not os.path.isfile(input_path):
+        raise ValueError(f'{input_path} not found')
+
+    start = time.perf_counter()
+    temp_path = None
+    snapshot_path = input_path
+    try:
+        if input_path.endswith('.gz'):
+            fd, temp_path = tempfile.mkstemp(
+                suffix='.db', dir=os.path.dirname(os.path.abspath(database_path)))
+            os.close(fd)
+            try:
+                decompress_file(input_path, temp_path)
+            except (OSError, EOFError) as error:
+                raise ValueError(f'{input_path} is not a valid snapshot: {error}')
+            snapshot_path = temp_path
+
+        snapshot = sqlite3.connect(f'{pathlib.Path(snapshot_path).absolute().as_uri()}?mode=ro',
+                                   uri=True)
+        try:
+            try:
+                status = snapshot.execute('PRAGMA quick_check').fetchone()[0]
+            except sqlite3.DatabaseError as error:
+                raise ValueError(f'{input_path} is not a valid database: {error}')
+            if status != 'ok':
+                raise ValueError(f'{input_path} is not a valid database: {status}')
+
+            target = sqlite3.connect(database_path, timeout=30)
+            try:
+                versions = {}
+                if table_exists(target, 'table_version'):
+                    versions = dict(target.execute(
+                        'SELECT table_name, version FROM table_version'))
+
+                total_pages = copy_database(snapshot, target)
+                bump_table_versions(target, versions)
+            finally:
+                target.close()
+        finally:
+            snapshot.close()
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    duration_ms = round((time.perf_counter() - start) * 1000)
+    logger.info(f'{input_path} restored on {database_path} in {duration_ms}ms')
+    return dict(pages=total_pages, duration_ms=duration_ms)
+
+
+def main(argv: list = None) -> int:
+    """Entrypoint of the backup command line."""
+    parser = argparse.ArgumentParser(description='Backup and restore the api database.')
+    parser.add_argument('command', choices=['create', 'restore'])
+    parser.add_argument('--database', default='sqlite/api.db', help='path of the database file')
+    parser.add_argument('--output', help='path of the snapshot created, .gz to compress')
+    parser.add_argument('--input', help='path of the snapshot restored')
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        output = args.output or os.path.join(os.path.dirname(args.database), 'backups',
+                                             snapshot_name())
+        result = create_backup(args.database, output)
+        seconds = max(result['duration_ms'], 1) / 1000
+        print(f"{result['path']}: {result['bytes'] / 1024 / 1024:.1f}MB in "
+              f"{seconds:.1f}s ({result['bytes'] / 1024 / 1024 / seconds:.1f}MB/s)")
+        return 0
+
+    if not args.input:
+        parser.error('--input is required to restore')
+
+    try:
+        result = restore_backup(args.input, args.database)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    print(f"{args.input} restored on {args.database} in {result['duration_ms']}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
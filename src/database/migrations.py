@@ -0,0 +1,415 @@
+"""Module to apply the schema changes on databases created by older versions of the api.
+
+New databases are created with ``create_all`` already on the latest schema and only get
+stamped with the migration versions, the databases that already exists are upgraded
+applying the pending migrations in order, since ``create_all`` never changes a table
+that was already created.
+
+Every applied migration is registered on the ``schema_migrations`` table with the time
+that it took to run.
+
+Example:
+    python -m database.migrations status --database sqlite/api.db
+    python -m database.migrations upgrade --database sqlite/api.db
+    python -m database.migrations upgrade --url postgresql://api@localhost/api
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, create_engine, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+import database.models as models
+
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    """Single versioned change of the database schema."""
+    version: int
+    description: str
+    upgrade: Callable[[Engine], None]
+
+
+def add_column(engine: Engine, table_name: str, column: Column) -> bool:
+    """Adds a nullable column to an existing table if it does not exist yet.
+
+    On sqlite adding a column without a default only changes the table definition, so
+    it does not matter how big the table is, the values should be filled after that
+    using backfill_in_batches.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param table_name: name of the table
+    :type table_name: str
+    :param column: column to be added, must be nullable
+    :type column: Column
+    :return: True if the column was added
+    :rtype: bool
+    """
+    columns = {item['name'] for item in inspect(engine).get_columns(table_name)}
+    if column.name in columns:
+        return False
+
+    column_type = column.type.compile(dialect=engine.dialect)
+    with engine.begin() as connection:
+        connection.execute(
+            text(f'ALTER TABLE "{table_name}" ADD COLUMN "{column.name}" {column_type}'))
+
+    return True
+
+
+def create_index(engine: Engine, index: Index) -> None:
+    """Creates an index if it does not exist yet.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param index: index to be created
+    :type index: Index
+    :rtype: None
+    """
+    index.create(engine, checkfirst=True)
+
+
+def backfill_in_batches(engine: Engine, table_name: str, column_name: str,
+                        expression: str, batch_size: int = 1000,
+                        pause: float = 0.01) -> int:
+    """Fills a column on small batches of rows, each one on its own transaction.
+
+    The write lock is only held during the update of a single batch and released
+    between them, so the requests are not blocked while a big table is migrated.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param table_name: name of the table
+    :type table_name: str
+    :param column_name: name of the column to be filled
+    :type column_name: str
+    :param expression: sql expression with the value of the column
+    :type expression: str
+    :param batch_size: number of rows updated by transaction
+    :type batch_size: int
+    :param pause: seconds to wait between the batches
+    :type pause: float
+    :return: number of updated rows
+    :rtype: int
+    """
+    select_batch = text(
+        f'SELECT id FROM "{table_name}" WHERE id > :last_id ORDER BY id LIMIT :batch_size')
+    update_batch = text(
+        f'UPDATE "{table_name}" SET "{column_name}" = {expression} '
+        f'WHERE id BETWEEN :first_id AND :last_id AND "{column_name}" IS NULL')
+
+    last_id = 0
+    updated = 0
+    while True:
+        with engine.begin() as connection:
+            ids = connection.execute(
+                select_batch, dict(last_id=last_id, batch_size=batch_size)).scalars().all()
+            if not ids:
+                break
+
+            result = connection.execute(
+                update_batch, dict(first_id=ids[0], last_id=ids[-1]))
+            updated += result.rowcount
+
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+    return updated
+
+
+def add_foreign_key_indexes(engine: Engine) -> None:
+    """Creates the indexes declared on the foreign key columns of the models.
+
+    :param engine: database engine
+    :type engine: Engine
+    :rtype: None
+    """
+    foreign_keys = (
+        models.UserGroupModel.group_id,
+        models.UserGroupModel.user_id,
+        models.FunctionPermissionsModel.group_id,
+        models.DatabaseModel.database_type_id,
+        models.ServerModel.server_type_id,
+    )
+    for column in foreign_keys:
+        table = column.property.columns[0].table
+        for index in table.indexes:
+            if index.columns.keys() == [column.key]:
+                create_index(engine, index)
+
+
+def add_server_permissions_indexes(engine: Engine) -> None:
+    """Creates the indexes used to filter the servers visible by the groups.
+
+    :param engine: database engine
+    :type engine: Engine
+    :rtype: None
+    """
+    for index in models.ServerPermissionsModel.__table__.indexes:
+        if index.name in ('ix_server_permissions_group_id', 'ix_server_permissions_server_id'):
+            create_index(engine, index)
+
+
+def add_connection_login_indexes(engine: Engine) -> None:
+    """Creates the indexes used by the join of the connection credentials.
+
+    :param engine: database engine
+    :type engine: Engine
+    :rtype: None
+    """
+    for index in models.ConnectionLoginModel.__table__.indexes:
+        if index.name in ('ix_connection_login_login_id', 'ix_connection_login_connection_id'):
+            create_index(engine, index)
+
+
+def add_database_natural_key_index(engine: Engine) -> None:
+    """Creates the index used to find the databases by host, port and sid.
+
+    :param engine: database engine
+    :type engine: Engine
+    :rtype: None
+    """
+    for index in models.DatabaseModel.__table__.indexes:
+        if index.name == 'ix_database_natural_key':
+            create_index(engine, index)
+
+
+def add_group_unique_indexes(engine: Engine) -> None:
+    """Removes the duplicated pairs of the association tables of the groups, keeping the
+    oldest row of each pair, and creates the unique indexes that prevent new duplicates.
+
+    :param engine: database engine
+    :type engine: Engine
+    :rtype: None
+    """
+    pairs = (
+        (models.UserGroupModel, 'user_id', 'ux_user_grp_group_user'),
+        (models.FunctionPermissionsModel, 'function_id', 'ux_function_permissions_group_function'),
+        (models.ServerPermissionsModel, 'server_id', 'ux_server_permissions_group_server'),
+    )
+    for model, column, index_name in pairs:
+        table_name = model.__tablename__
+        with engine.begin() as connection:
+            result = connection.execute(text(
+                f'DELETE FROM "{table_name}" WHERE id NOT IN ('
+                f'SELECT MIN(id) FROM "{table_name}" GROUP BY group_id, "{column}")'))
+        if result.rowcount:
+            logger.info(f'Removed {result.rowcount} duplicated rows from {table_name}')
+
+        for index in model.__table__.indexes:
+            if index.name == index_name:
+                create_index(engine, index)
+
+
+def change_type_ids_to_integer(engine: Engine) -> None:
+    """Changes the foreign keys of the database and server types, created as strings, to
+    integers as the ids that they reference.
+
+    :param engine: database engine
+    :type engine: Engine
+    :rtype: None
+    """
+    for column in (models.DatabaseModel.database_type_id, models.ServerModel.server_type_id):
+        change_column_to_integer(engine, column.property.columns[0])
+
+
+def change_column_to_integer(engine: Engine, column: Column) -> None:
+    """Changes the type of a column to integer, casting the values.
+
+    The other databases change the type in place, sqlite can't change the type of a column,
+    so the table is created again with the definition of the model and the rows are
+    copied, on a single transaction.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param column: column of the model, already declared as integer
+    :type column: Column
+    :rtype: None
+    """
+    table = column.table
+    columns = {item['name']: item['type'] for item in inspect(engine).get_columns(table.name)}
+    if isinstance(columns[column.name], Integer):
+        return
+
+    if engine.dialect.name != 'sqlite':
+        with engine.begin() as connection:
+            connection.execute(text(
+                f'ALTER TABLE "{table.name}" ALTER COLUMN "{column.name}" TYPE INTEGER '
+                f'USING "{column.name}"::integer'))
+        return
+
+    # the new table is created without the indexes, their names are still used by the
+    # old table, and the referenced tables are copied only to compile the foreign keys
+    metadata = MetaData()
+    for foreign_key in table.foreign_keys:
+        foreign_key.column.table.to_metadata(metadata)
+    new_table = table.to_metadata(metadata, name=f'{table.name}_migration')
+    new_table.indexes.clear()
+
+    names = ', '.join(f'"{item.name}"' for item in table.columns)
+    values = ', '.join(f'CAST("{item.name}" AS INTEGER)' if item.name == column.name
+                       else f'"{item.name}"' for item in table.columns)
+    with engine.begin() as connection:
+        new_table.create(connection)
+        connection.execute(text(f'INSERT INTO "{new_table.name}" ({names}) '
+                                f'SELECT {values} FROM "{table.name}"'))
+        connection.execute(text(f'DROP TABLE "{table.name}"'))
+        connection.execute(text(f'ALTER TABLE "{new_table.name}" RENAME TO "{table.name}"'))
+        for index in table.indexes:
+            index.create(connection)
+
+
+def create_table(engine: Engine, model) -> None:
+    """Creates the table of a model, with its indexes, if it does not exist yet.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param model: model class
+    :type model: models.Base
+    :rtype: None
+    """
+    model.__table__.create(engine, checkfirst=True)
+
+
+MIGRATIONS = (
+    Migration(1, 'add foreign key indexes', add_foreign_key_indexes),
+    Migration(2, 'add revoked_token table',
+              lambda engine: create_table(engine, models.RevokedTokenModel)),
+    Migration(3, 'add login_failure table',
+              lambda engine: create_table(engine, models.LoginFailureModel)),
+    Migration(4, 'add server_permissions indexes', add_server_permissions_indexes),
+    Migration(5, 'add connection_login indexes', add_connection_login_indexes),
+    Migration(6, 'add database natural key index', add_database_natural_key_index),
+    Migration(7, 'add change_log table',
+              lambda engine: create_table(engine, models.ChangeLogModel)),
+    Migration(8, 'add audit_log table',
+              lambda engine: create_table(engine, models.AuditLogModel)),
+    Migration(9, 'add table_version table',
+              lambda engine: create_table(engine, models.TableVersionModel)),
+    Migration(10, 'add unique indexes of the group pairs', add_group_unique_indexes),
+    Migration(11, 'change the type ids to integer', change_type_ids_to_integer),
+    Migration(12, 'add tokens_revoked_date to user',
+              lambda engine: add_column(engine, 'user',
+                                        Column('tokens_revoked_date', DateTime, nullable=True))),
+)
+
+
+def get_applied_versions(engine: Engine) -> set:
+    """Returns the versions of the migrations already applied on the database.
+
+    :param engine: database engine
+    :type engine: Engine
+    :return: set with the applied versions
+    :rtype: set
+    """
+    models.SchemaMigrationModel.__table__.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        rows = connection.execute(text('SELECT version FROM schema_migrations'))
+        return {row[0] for row in rows}
+
+
+def get_pending_migrations(engine: Engine) -> List[Migration]:
+    """Returns the migrations not applied on the database yet.
+
+    :param engine: database engine
+    :type engine: Engine
+    :return: list of the pending migrations ordered by version
+    :rtype: list
+    """
+    applied = get_applied_versions(engine)
+    return sorted((migration for migration in MIGRATIONS if migration.version not in applied),
+                  key=lambda migration: migration.version)
+
+
+def register_migration(engine: Engine, migration: Migration, duration_ms: int) -> None:
+    """Registers a migration as applied on the schema_migrations table.
+
+    :param engine: database engine
+    :type engine: Engine
+    :param migration: migration applied
+    :type migration: Migration
+    :param duration_ms: time that the migration took to run in milliseconds
+    :type duration_ms: int
+    :rtype: None
+    """
+    session = sessionmaker(bind=engine)()
+    try:
+        session.merge(models.SchemaMigrationModel(
+            migration.version, migration.description, datetime.now(), duration_ms))
+        session.commit()
+    finally:
+        session.close()
+
+
+def stamp_migrations(engine: Engine) -> None:
+    """Registers all the migrations as applied, used for databases created by create_all.
+
+    :param engine: database engine
+    :type engine: Engine
+    :rtype: None
+    """
+    for migration in get_pending_migrations(engine):
+        register_migration(engine, migration, 0)
+
+
+def run_migrations(engine: Engine) -> List[tuple]:
+    """Applies the pending migrations to the database in order of version.
+
+    :param engine: database engine
+    :type engine: Engine
+    :return: list with the applied versions and the time that each one took in ms
+    :rtype: list
+    """
+    timings = []
+    for migration in get_pending_migrations(engine):
+        start = time.perf_counter()
+        migration.upgrade(engine)
+        duration_ms = int((time.perf_counter() - start) * 1000)
+
+        register_migration(engine, migration, duration_ms)
+        logger.info(f'Migration {migration.version} ({migration.description}) '
+                    f'applied in {duration_ms}ms')
+        timings.append((migration.version, duration_ms))
+
+    return timings
+
+
+def main(argv: list = None) -> int:
+    """Entrypoint of the migrations command line."""
+    parser = argparse.ArgumentParser(description='Manage the schema of the api database.')
+    parser.add_argument('command', choices=['upgrade', 'status'])
+    parser.add_argument('--database', default='sqlite/api.db', help='path of the database file')
+    parser.add_argument('--url', default=os.getenv('API_DATABASE_URL'),
+                        help='database url, used instead of the database file')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.url or f'sqlite:///{args.database}')
+
+    if args.command == 'upgrade':
+        for version, duration_ms in run_migrations(engine):
+            print(f'applied {version} in {duration_ms}ms')
+
+    session = sessionmaker(bind=engine)()
+    applied = {row.version: row for row in session.query(models.SchemaMigrationModel)}
+    for migration in MIGRATIONS:
+        row = applied.get(migration.version)
+        status = f'applied {row.applied_date:%Y-%m-%d %H:%M:%S} ({row.duration_ms}ms)' \
+            if row else 'pending'
+        print(f'{migration.version:>4} {migration.description:<40} {status}')
+    session.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,15 +1,21 @@
 """Module to contain the database models and related functions."""
 import base64
 import hashlib
+import hmac
+import json
+import os
 from datetime import datetime
 
 from Crypto.Cipher import AES
 from sqlalchemy import Column
 from sqlalchemy import ColumnDefault
 from sqlalchemy import Date
+from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import Integer
 from sqlalchemy import String
+from sqlalchemy import Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session
 
@@ -32,12 +38,44 @@ def format_date(date: datetime):
     return datetime.strftime(date, '%Y-%m-%d')
 
 
-def password_hash(password: str) -> str:
-    """Hashes a password, hashs are not reversible, so if you need to reverse after
-    use encript_password instead.
+# number of iterations of the PBKDF2 used to hash the user passwords
+PASSWORD_ITERATIONS = 260000
+PASSWORD_ALGORITHM = 'pbkdf2_sha256'
+
+
+def password_hash(password: str, salt: str = None, iterations: int = PASSWORD_ITERATIONS) -> str:
+    """Hashes a password with a salted PBKDF2, hashs are not reversible, so if you need to
+    reverse after use encript_password instead.
+
+    Example:
+        >>> password_hash('password', salt='c2FsdA==', iterations=1000)
+        'pbkdf2_sha256$1000$c2FsdA==$vz6eP9k9+OlTR8/nios4/xq5Zw5d9DCfJf965djvhVU='
+
+    :param password: Password to be hashed.
+    :type password: str
+    :param salt: Salt of the hash, a random one is generated if not informed.
+    :type salt: str
+    :param iterations: Number of iterations of the PBKDF2.
+    :type iterations: int
+    :return: Hashed password on the format algorithm$iterations$salt$hash.
+    :rtype: str
+    """
+    if salt is None:
+        salt = base64.b64encode(os.urandom(16)).decode('utf-8')
+
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'),
+                                 iterations)
+    encoded = base64.b64encode(digest).decode('utf-8')
+
+    return f'{PASSWORD_ALGORITHM}${iterations}${salt}${encoded}'
+
+
+def legacy_password_hash(password: str) -> str:
+    """Hashes a password with the unsalted MD5 used by the older versions of the api, only
+    kept to validate the passwords that were not rehashed yet.
 
     Example:
-        >>> password_hash('password')
+        >>> legacy_password_hash('password')
         '5f4dcc3b5aa765d61d8327deb882cf99'
 
     :param password: Password to be hashed.
@@ -48,58 +86,84 @@ def password_hash(password: str) -> str:
     return hashlib.md5(password.encode('utf-8')).hexdigest()
 
 
-def get_cipher() -> AES:
+def check_password(password: str, hashed: str) -> bool:
+    """Checks a password against a hash generated by password_hash or legacy_password_hash.
+
+    :param password: Password to be checked.
+    :type password: str
+    :param hashed: Hash stored on the database.
+    :type hashed: str
+    :return: True if the password matches the hash.
+    :rtype: bool
+    """
+    if '$' not in hashed:
+        return hmac.compare_digest(hashed, legacy_password_hash(password))
+
+    _, iterations, salt, _ = hashed.split('$')
+    return hmac.compare_digest(hashed, password_hash(password, salt, int(iterations)))
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """Checks if a hash was generated with an older algorithm or less iterations.
+
+    :param hashed: Hash stored on the database.
+    :type hashed: str
+    :return: True if the password should be hashed again.
+    :rtype: bool
+    """
+    if '$' not in hashed:
+        return True
+
+    algorithm, iterations, _, _ = hashed.split('$')
+    return algorithm != PASSWORD_ALGORITHM or int(iterations) < PASSWORD_ITERATIONS
+
+
+def get_cipher(nonce: bytes = None) -> AES:
     """Returns a cipher object to encript and decript passwords.
 
+    :param nonce: Nonce of an encripted password, a random one is used if not informed.
+    :type nonce: bytes
     :return: Cipher object.
     :rtype: AES
     """
-    secret_key = b'connection_manager_key20220821'
-    cipher = AES.new(secret_key, AES.MODE_ECB)
+    secret_key = hashlib.sha256(b'connection_manager_key20220821').digest()
+    cipher = AES.new(secret_key, AES.MODE_GCM, nonce=nonce)
 
     return cipher
 
 
-def encript_password(password: str) -> bytes:
+def encript_password(password: str) -> str:
     """Encripts a password, encripted passwords are reversible, so if you need to
-    hash it, use password_hash instead.
+    hash it, use password_hash instead. A random nonce is used on each call, so the
+    same password is not encripted to the same value twice.
 
     Example:
-        >>> encript_password('password')
-        'b\\x1d\\x8c\\x97\\x19\\x2f\\xdb\\x28\\xdd\\x3c\\x81\\x99\\x2d\\x02\\xd0\\x5f'
-
         >>> decript_password(encript_password('password'))
-        b'password'
+        'password'
 
     :param password: Password to be encripted.
     :type password: str
-    :return: Encripted password.
-    :rtype: bytes
+    :return: Encripted password on base64, with the nonce and the tag of the cipher.
+    :rtype: str
     """
     cipher = get_cipher()
+    encripted, tag = cipher.encrypt_and_digest(password.encode('utf-8'))
 
-    encoded = base64.encodebytes(cipher.encrypt(password))
-
-    return encoded
+    return base64.b64encode(cipher.nonce + tag + encripted).decode('utf-8')
 
 
-def decript_password(password: str) -> bytes:
+def decript_password(password: str) -> str:
     """Decripts a password, encripted by encript_password.
 
-    Example:
-        >>> password='b\\x1d\\x8c\\x97\\x19\\x2f\\xdb\\x28\\xdd\\x3c\\x81\\x99\\x2d\\x02\\xd0\\x5f'
-        >>> decript_password(password)
-        b'password'
-
     :param password: Password to be decripted.
     :type password: str
     :return: Decripted password.
-    :rtype: bytes
+    :rtype: str
     """
-    cipher = get_cipher()
-    decoded = base64.decodebytes(cipher.decrypt(password))
+    decoded = base64.b64decode(password)
+    cipher = get_cipher(decoded[:16])
 
-    return decoded
+    return cipher.decrypt_and_verify(decoded[32:], decoded[16:32]).decode('utf-8')
 
 
 class DatabaseTypeModel(Base):
@@ -179,13 +243,20 @@ class UserModel(Base):
     password = Column(String(255), nullable=False)
     creation_date = Column(Date, nullable=False, default=ColumnDefault(datetime.now()))
     update_date = Column(Date, nullable=True, onupdate=ColumnDefault(datetime.now()))
+    # the tokens of the user issued before this date are not accepted
+    tokens_revoked_date = Column(DateTime, nullable=True)
 
     def __init__(self, name, password):
         self.name = name
         self.password = password_hash(password)
+        # a user created with the name of a deleted one does not get its tokens
+        self.tokens_revoked_date = datetime.now()
 
     def validate_password(self, password):
-        return self.password == password_hash(password)
+        return check_password(password, self.password)
+
+    def needs_rehash(self):
+        return password_needs_rehash(self.password)
 
     def to_json(self, *args, **kwargs):
         user_json = dict(
@@ -201,8 +272,9 @@ class UserModel(Base):
 class UserGroupModel(Base):
     __tablename__ = 'user_grp'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
-    user_id = Column(Integer, ForeignKey('user.id'), nullable=False)
+    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('user.id'), nullable=False, index=True)
+    __table_args__ = (Index('ux_user_grp_group_user', 'group_id', 'user_id', unique=True),)
 
     def __init__(self, group_id, user_id):
         self.group_id = group_id
@@ -219,8 +291,10 @@ class UserGroupModel(Base):
 class FunctionPermissionsModel(Base):
     __tablename__ = 'function_permissions'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
+    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False, index=True)
     function_id = Column(Integer, ForeignKey('function_type.id'), nullable=False)
+    __table_args__ = (Index('ux_function_permissions_group_function', 'group_id', 'function_id',
+                            unique=True),)
 
     def __init__(self, group_id, function_id):
         self.group_id = group_id
@@ -241,9 +315,11 @@ class DatabaseModel(Base):
     host = Column(String(50), nullable=False)
     port = Column(Integer, nullable=False)
     sid = Column(String(50), nullable=False)
-    database_type_id = Column(String(50),
+    database_type_id = Column(Integer,
                               ForeignKey('database_type.id'),
-                              nullable=False)
+                              nullable=False, index=True)
+
+    __table_args__ = (Index('ix_database_natural_key', 'host', 'port', 'sid'), )
 
     def __init__(self, description, host, port, sid, database_type_id):
         self.description = description
@@ -263,6 +339,11 @@ class DatabaseModel(Base):
         requirements = ((DatabaseTypeModel, 'database_type_id'), )
         return requirements
 
+    @staticmethod
+    def get_natural_key() -> tuple:
+        """Function to return the fields that identify a database outside of the api"""
+        return ('host', 'port', 'sid')
+
     def to_json(self, *args, **kwargs):
         return dict(
             id=self.id,
@@ -280,7 +361,8 @@ class ServerModel(Base):
     description = Column(String(50), nullable=False)
     host = Column(String(50), nullable=False)
     port = Column(Integer, nullable=False)
-    server_type_id = Column(String(50), ForeignKey('server_type.id'), nullable=False)
+    server_type_id = Column(Integer, ForeignKey('server_type.id'), nullable=False,
+                            index=True)
     connection_type = Column(Integer, ForeignKey('connection_type.id'), nullable=False)
 
     def __init__(self, description, host, port, server_type_id, connection_type):
@@ -290,6 +372,18 @@ class ServerModel(Base):
         self.server_type_id = server_type_id
         self.connection_type = connection_type
 
+    @staticmethod
+    def get_fields() -> tuple:
+        """Function to return fields that should be used on the insert of the model"""
+        return ('description', 'host', 'port', 'server_type_id', 'connection_type')
+
+    @staticmethod
+    def get_requirements() -> tuple:
+        """Function to return the requirements for the insert"""
+        requirements = ((ServerTypeModel, 'server_type_id'),
+                        (ConnectionTypeModel, 'connection_type'))
+        return requirements
+
     def to_json(self, *args, **kwargs):
         return dict(
             id=self.id,
@@ -304,16 +398,18 @@ class ServerModel(Base):
 class ServerPermissionsModel(Base):
     __tablename__ = 'server_permissions'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
-    server_id = Column(Integer, ForeignKey('server.id'), nullable=False)
+    group_id = Column(Integer, ForeignKey('groups.id'), nullable=False, index=True)
+    server_id = Column(Integer, ForeignKey('server.id'), nullable=False, index=True)
+    __table_args__ = (Index('ux_server_permissions_group_server', 'group_id', 'server_id',
+                            unique=True),)
 
     def __init__(self, group_id, server_id):
         self.group_id = group_id
         self.server_id = server_id
 
     def to_json(self, session: Session, *args, **kwargs):
-        group = session.query(GroupModel).filter(GroupModel.user_id == self.group_id).first()
-        server = session.query(ServerModel).filter(ServerModel.server_id == self.server_id).first()
+        group = session.query(GroupModel).filter(GroupModel.id == self.group_id).first()
+        server = session.query(ServerModel).filter(ServerModel.id == self.server_id).first()
 
         return dict(id=self.id, group=group.to_json(), server=server.to_json())
 
@@ -322,7 +418,7 @@ class LoginModel(Base):
     __tablename__ = 'login'
     id = Column(Integer, primary_key=True, autoincrement=True)
     user = Column(String(50), nullable=False)
-    password = Column(String(50), nullable=False)
+    password = Column(String(255), nullable=False)
     connection_type = Column(Integer, nullable=False)
 
     def __init__(self, user, password, connection_type):
@@ -330,32 +426,190 @@ class LoginModel(Base):
         self.password = encript_password(password)
         self.connection_type = connection_type
 
-    def to_json(self, *args, **kwargs):
-        return dict(
+    @staticmethod
+    def get_fields() -> tuple:
+        """Function to return fields that should be used on the insert of the model"""
+        return ('user', 'password', 'connection_type')
+
+    @staticmethod
+    def get_requirements() -> tuple:
+        """Function to return the requirements for the insert"""
+        requirements = ((ConnectionTypeModel, 'connection_type'), )
+        return requirements
+
+    def to_json(self, *args, show_password: bool = False, **kwargs):
+        login_json = dict(
             id=self.id,
             user=self.user,
-            password=decript_password(self.password),
             connection_type=self.connection_type
         )
+        if show_password:
+            login_json['password'] = decript_password(self.password)
+
+        return login_json
 
 
 class ConnectionLoginModel(Base):
     __tablename__ = 'connection_login'
     id = Column(Integer, primary_key=True, autoincrement=True)
-    login_id = Column(Integer, ForeignKey('login.id'), nullable=False)
-    connection_id = Column(Integer, nullable=False)
+    login_id = Column(Integer, ForeignKey('login.id'), nullable=False, index=True)
+    connection_id = Column(Integer, ForeignKey('server.id'), nullable=False, index=True)
 
     def __init__(self, login_id, connection_id):
         self.login_id = login_id
         self.connection_id = connection_id
 
+    @staticmethod
+    def get_fields() -> tuple:
+        """Function to return fields that should be used on the insert of the model"""
+        return ('login_id', 'connection_id')
+
+    @staticmethod
+    def get_requirements() -> tuple:
+        """Function to return the requirements for the insert"""
+        requirements = ((LoginModel, 'login_id'), (ServerModel, 'connection_id'))
+        return requirements
+
     def to_json(self, session: Session, *args, **kwargs):
-        login = session.query(LoginModel).filter(LoginModel.login_id == self.login_id).first()
-        connection = session.query(ServerModel).filter(
-            ServerModel.server_id == self.connection_id).first()
+        # the links created before the connections were limited to the servers can point
+        # to a database, they are returned without the connection
+        login, connection = session.query(LoginModel, ServerModel)\
+            .outerjoin(ServerModel, ServerModel.id == self.connection_id)\
+            .where(LoginModel.id == self.login_id)\
+            .one()
+
+        return dict(id=self.id, login=login.to_json(),
+                    connection=connection.to_json() if connection else None)
+
+
+class SchemaMigrationModel(Base):
+    __tablename__ = 'schema_migrations'
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(255), nullable=False)
+    applied_date = Column(DateTime, nullable=False)
+    duration_ms = Column(Integer, nullable=False)
+
+    def __init__(self, version, description, applied_date, duration_ms):
+        self.version = version
+        self.description = description
+        self.applied_date = applied_date
+        self.duration_ms = duration_ms
+
+    def to_json(self, *args, **kwargs):
+        return dict(
+            version=self.version,
+            description=self.description,
+            applied_date=self.applied_date.isoformat(),
+            duration_ms=self.duration_ms
+        )
+
+
+class RevokedTokenModel(Base):
+    __tablename__ = 'revoked_token'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String(64), nullable=False, unique=True)
+    expiration_date = Column(DateTime, nullable=False, index=True)
+
+    def __init__(self, jti, expiration_date):
+        self.jti = jti
+        self.expiration_date = expiration_date
+
+    def to_json(self, *args, **kwargs):
+        return dict(id=self.id, jti=self.jti, expiration_date=self.expiration_date.isoformat())
 
-        if connection is None:
-            connection = session.query(DatabaseModel).filter(
-                DatabaseModel.database_id == self.connection_id).first()
 
-        return dict(id=self.id, login=login.to_json(), connection=connection.to_json())
+class LoginFailureModel(Base):
+    __tablename__ = 'login_failure'
+    key = Column(String(255), primary_key=True)
+    failures = Column(Integer, nullable=False)
+    last_failure_date = Column(DateTime, nullable=False)
+    locked_until = Column(DateTime, nullable=True, index=True)
+
+    def __init__(self, key, failures, last_failure_date, locked_until):
+        self.key = key
+        self.failures = failures
+        self.last_failure_date = last_failure_date
+        self.locked_until = locked_until
+
+    def to_json(self, *args, **kwargs):
+        return dict(
+            key=self.key,
+            failures=self.failures,
+            last_failure_date=self.last_failure_date.isoformat(),
+            locked_until=self.locked_until.isoformat() if self.locked_until else None
+        )
+
+
+class ChangeLogModel(Base):
+    __tablename__ = 'change_log'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(50), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)
+    change_date = Column(DateTime, nullable=False)
+
+    def __init__(self, entity, entity_id, operation, change_date):
+        self.entity = entity
+        self.entity_id = entity_id
+        self.operation = operation
+        self.change_date = change_date
+
+    def to_json(self, *args, **kwargs):
+        return dict(
+            seq=self.id,
+            entity=self.entity,
+            entity_id=self.entity_id,
+            operation=self.operation,
+            change_date=self.change_date.isoformat()
+        )
+
+
+class AuditLogModel(Base):
+    __tablename__ = 'audit_log'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    username = Column(String(255), nullable=False)
+    entity = Column(String(50), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)
+    before = Column(Text, nullable=True)
+    after = Column(Text, nullable=True)
+    audit_date = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        Index('ix_audit_log_username_date', 'username', 'audit_date'),
+        Index('ix_audit_log_entity_date', 'entity', 'entity_id', 'audit_date'),
+    )
+
+    def __init__(self, username, entity, entity_id, operation, before, after, audit_date):
+        self.username = username
+        self.entity = entity
+        self.entity_id = entity_id
+        self.operation = operation
+        self.before = before
+        self.after = after
+        self.audit_date = audit_date
+
+    def to_json(self, *args, **kwargs):
+        return dict(
+            id=self.id,
+            username=self.username,
+            entity=self.entity,
+            entity_id=self.entity_id,
+            operation=self.operation,
+            before=json.loads(self.before) if self.before else None,
+            after=json.loads(self.after) if self.after else None,
+            audit_date=self.audit_date.isoformat()
+        )
+
+
+class TableVersionModel(Base):
+    __tablename__ = 'table_version'
+    table_name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False)
+
+    def __init__(self, table_name, version):
+        self.table_name = table_name
+        self.version = version
+
+    def to_json(self, *args, **kwargs):
+        return dict(table_name=self.table_name, version=self.version)
@@ -1,11 +1,33 @@
 import os
+import pathlib
+from datetime import date
 from enum import Enum, auto
 
-from sqlalchemy import create_engine
+from config.utils import file_lock
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 import database.models as models
+from database.migrations import run_migrations, stamp_migrations
+
+
+# id of the group created on the first boot, its users can see everything
+ADMIN_GROUP_ID = 1
+
+# pool of the database servers, each gunicorn worker has its own pool
+POOL_SIZE = int(os.getenv('API_DATABASE_POOL_SIZE', 5))
+POOL_MAX_OVERFLOW = int(os.getenv('API_DATABASE_MAX_OVERFLOW', 5))
+# seconds waiting for a connection of the pool and before a connection is replaced
+POOL_TIMEOUT = int(os.getenv('API_DATABASE_POOL_TIMEOUT', 10))
+POOL_RECYCLE = int(os.getenv('API_DATABASE_POOL_RECYCLE', 1800))
+# milliseconds that a statement can run on postgresql, less than the worker timeout
+STATEMENT_TIMEOUT = int(os.getenv('API_DATABASE_STATEMENT_TIMEOUT', 15000))
 
 
 class ServerTypeEnum(Enum):
@@ -52,8 +74,24 @@ class FunctionTypeEnum(Enum):
     DELETE_LOGIN = auto()
 
 
+def insert_ignore(session, table):
+    """Returns an insert statement that skips the rows that conflict with existing ones.
+
+    :param session: database session
+    :type session: scoped_session
+    :param table: table model
+    :type table: models.Base
+    :return: insert statement with ON CONFLICT DO NOTHING
+    :rtype: Insert
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+
+    return sqlite.insert(table).on_conflict_do_nothing()
+
+
 def populate_type_table(session, table, enum) -> None:
-    """Method to populate the type tables.
+    """Method to populate the type tables, the rows that already exists are skipped.
 
     :param session: database session
     :type session: scoped_session
@@ -63,25 +101,18 @@ def populate_type_table(session, table, enum) -> None:
     :type enum: Enum
     :rtype: None
     """
-    objects = []
-    for item in enum:
-        if session.query(table).where(table.id == item.value).count() > 0:
-            continue
-        objects.append(table(item.name))
+    rows = [dict(id=item.value, description=item.name, creation_date=date.today())
+            for item in enum]
 
-    session.bulk_save_objects(objects)
-    session.commit()
+    session.execute(insert_ignore(session, table).values(rows))
 
 
 def insert_admin_functions(session):
     """Method to create the functions to admin registration"""
-    functions = []
-    for function in FunctionTypeEnum:
-        functions.append(
-            models.FunctionPermissionsModel(group_id=1, function_id=function.value))
+    functions = [dict(id=function.value, group_id=ADMIN_GROUP_ID, function_id=function.value)
+                 for function in FunctionTypeEnum]
 
-    session.bulk_save_objects(functions)
-    session.commit()
+    session.execute(insert_ignore(session, models.FunctionPermissionsModel).values(functions))
 
 
 def insert_admin_login(session):
@@ -91,16 +122,18 @@ def insert_admin_login(session):
     :type session: scoped_session
     :return: None
     """
-    admin_group = models.GroupModel(description='admin')
-    admin_user = models.UserModel(name='admin', password='admin')
-    admin_user_group = models.UserGroupModel(group_id=1, user_id=1)
-
-    session.bulk_save_objects([admin_user, admin_group, admin_user_group])
-    session.commit()
+    session.execute(insert_ignore(session, models.GroupModel).values(
+        id=ADMIN_GROUP_ID, description='admin', creation_date=date.today()))
+    session.execute(insert_ignore(session, models.UserModel).values(
+        id=1, name='admin', password=models.password_hash('admin'),
+        creation_date=date.today(), update_date=date.today()))
+    session.execute(insert_ignore(session, models.UserGroupModel).values(
+        id=1, group_id=ADMIN_GROUP_ID, user_id=1))
 
 
 def insert_types(session: scoped_session):
-    """Insert the basec types for the initial usage.
+    """Insert the basec types for the initial usage, everything is inserted on a single
+    transaction and can be executed more than once.
 
     :param session: database session
     :type session: scoped_session
@@ -113,29 +146,158 @@ def insert_types(session: scoped_session):
 
     insert_admin_login(session)
     insert_admin_functions(session=session)
+    sync_sequences(session, (models.ServerTypeModel, models.ConnectionTypeModel,
+                             models.DatabaseTypeModel, models.FunctionTypeModel,
+                             models.GroupModel, models.UserModel, models.UserGroupModel,
+                             models.FunctionPermissionsModel))
+    session.commit()
+
+
+def sync_sequences(session, tables) -> None:
+    """Moves the id sequences of the tables past the ids inserted explicitly, otherwise
+    the next insert would get an id already used. Only postgresql keeps the sequences apart
+    from the tables, sqlite uses the biggest id.
+
+    :param session: database session
+    :type session: scoped_session
+    :param tables: table models with an id column
+    :type tables: tuple
+    :rtype: None
+    """
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in tables:
+        name = table.__tablename__
+        session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{name}\"', 'id'), "
+            f'COALESCE((SELECT MAX(id) FROM "{name}"), 0) + 1, false)'))
+
+
+class ApiSession(Session):
+    """Session that can defer the commits to the end of a unit of work, so many operations
+    that commit on their own run on a single transaction."""
+
+    def commit(self):
+        # while deferred the changes are only sent to the database, the unit of work
+        # commits or rolls back all of them at the end
+        if self.info.get('defer_commit'):
+            self.flush()
+            return
+
+        super().commit()
+
+
+def create_session(engine):
+    """Creates a new session for the engine.
+
+    :param engine: database engine
+    :type engine: Engine
+    :return: session for database manipulation
+    :rtype: Session
+    """
+    return sessionmaker(bind=engine, class_=ApiSession, autocommit=False, autoflush=False)()
 
 
-def initiate_db(database_directory: str = 'sqlite') -> tuple:
-    """Method to initiate the sqlit database using sqlalchemy.
+def create_database_engine(url: str):
+    """Creates the engine of a database url, the sqlite files are opened as before and
+    the database servers, as postgresql, get a pool of connections checked before use.
 
-    :param database_directory: directory for the database file
+    :param url: database url, as sqlite:///sqlite/api.db or postgresql://user@host/api
+    :type url: str
+    :return: database engine
+    :rtype: Engine
+    """
+    if make_url(url).get_backend_name() == 'sqlite':
+        return create_engine(url, echo=False, connect_args={'check_same_thread': False})
+
+    engine = create_engine(url, echo=False, poolclass=QueuePool, pool_size=POOL_SIZE,
+                           max_overflow=POOL_MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT,
+                           pool_recycle=POOL_RECYCLE, pool_pre_ping=True)
+
+    if engine.dialect.name == 'postgresql':
+        @event.listens_for(engine, 'connect')
+        def set_statement_timeout(connection, record):
+            cursor = connection.cursor()
+            cursor.execute(f'SET statement_timeout = {STATEMENT_TIMEOUT}')
+            cursor.close()
+            connection.commit()
+
+    return engine
+
+
+def create_read_engine(engine, read_url: str = None):
+    """Creates the engine of the reads, a replica of the database informed by read_url or
+    the environment variable API_DATABASE_READ_URL. Without a replica the sqlite files get
+    a separate pool of read only connections and the other databases use the engine itself.
+
+    :param engine: engine of the primary database
+    :type engine: Engine
+    :param read_url: database url of the replica
+    :type read_url: str
+    :return: engine of the reads
+    :rtype: Engine
+    """
+    read_url = read_url or os.getenv('API_DATABASE_READ_URL')
+    if read_url:
+        return create_database_engine(read_url)
+
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return engine
+
+    uri = pathlib.Path(engine.url.database).absolute().as_uri()
+    return create_engine(f'sqlite:///{uri}?mode=ro&uri=true', echo=False, poolclass=QueuePool,
+                         pool_size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+                         connect_args={'check_same_thread': False})
+
+
+def get_database_url(database_directory: str = 'sqlite') -> str:
+    """Returns the url of the database, from the environment variable API_DATABASE_URL or
+    the sqlite file api.db on the database directory."""
+    return os.getenv('API_DATABASE_URL') or \
+        f"sqlite:///{os.path.join(database_directory, 'api.db')}"
+
+
+def initiate_db(database_directory: str = 'sqlite', migrate: bool = True,
+                database_url: str = None) -> tuple:
+    """Method to initiate the database using sqlalchemy.
+
+    :param database_directory: directory for the database file and its lock
     :type database_directory: str
+    :param migrate: apply the pending migrations of an existing database
+    :type migrate: bool
+    :param database_url: database url, defaults to get_database_url
+    :type database_url: str
     :return: engine and session for database manipulation
     :rtype: tuple
     """
     database_destination = os.path.join(database_directory, 'api.db')
 
-    poputate_database = False
-    if not os.path.exists(database_destination):
-        poputate_database = True
-
-    engine = create_engine(f'sqlite:///{database_destination}', echo=False,
-                           connect_args={'check_same_thread': False})
-    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
-
-    # only populate the database if it is a new one
-    if poputate_database:
-        models.Base.metadata.create_all(engine)
-        insert_types(session=session)
+    engine = create_database_engine(database_url or get_database_url(database_directory))
+    session = create_session(engine)
+
+    # every gunicorn worker runs this, the lock makes only the first one create the
+    # database while the others wait and then find it already populated
+    with file_lock(f'{database_destination}.lock'):
+        # only populate the database if it is a new one, the sqlite files created by the
+        # older versions have no schema_migrations table, so the file is checked instead
+        if engine.dialect.name == 'sqlite':
+            new_database = not os.path.exists(engine.url.database)
+        else:
+            new_database = not inspect(engine).has_table(
+                models.SchemaMigrationModel.__tablename__)
+
+        if new_database:
+            models.Base.metadata.create_all(engine)
+            stamp_migrations(engine)
+            insert_types(session=session)
+        elif migrate:
+            run_migrations(engine)
+
+        # on WAL the online backups read a snapshot of the file without blocking the
+        # writes and the writes don't restart the backups
+        if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+            with engine.connect() as connection:
+                connection.exec_driver_sql('PRAGMA journal_mode=WAL')
 
     return engine, session
@@ -15,7 +15,13 @@ def main(*args, **kwargs):
     directory_logs = kwargs.get('directory_logs', f'{cwd}/logs')
     directory_database = kwargs.get('directory_database', f'{cwd}/sqlite')
 
-    app = create_app('main', directory_database, directory_logs, directory_files)
+    # migrations can be disabled to be applied by the command line instead
+    migrate = kwargs.get('migrate', True)
+    # defaults to the environment variable API_DATABASE_URL or the sqlite file
+    database_url = kwargs.get('database_url')
+
+    app = create_app('main', directory_database, directory_logs, directory_files, migrate,
+                     database_url)
     app.logger.info(os.getenv('ADMIN_PASSWORD'))
 
     if kwargs.get('debug', False):
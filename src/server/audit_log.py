@@ -0,0 +1,199 @@
+"""Module to keep the audit trail of the changes, who changed what and the values before
+and after the change.
+
+The entries are staged on the session with the change and only handed to the writer after
+the commit, so a rolled back change is never audited. The writer keeps them on a queue and
+a background thread inserts them on batches, so the requests never wait for the audit.
+The audit_log table is append only, the entries are never updated or deleted by the api.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask import has_request_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from database.models import AuditLogModel
+from server.authentication import current_username
+
+
+# maximum entries inserted by statement
+BATCH_SIZE = 500
+# seconds that an entry waits on the queue before being written
+FLUSH_INTERVAL = 1
+# columns never written on the audit
+MASKED_COLUMNS = ('password', )
+MASK = '***'
+# user of the changes made outside of a request
+SYSTEM_USER = 'system'
+
+logger = logging.getLogger(__name__)
+
+
+def row_values(row) -> dict:
+    """Returns the values of the columns of a row, with the sensitive ones masked."""
+    return {column.key: MASK if column.key in MASKED_COLUMNS else getattr(row, column.key)
+            for column in inspect(row).mapper.column_attrs}
+
+
+def row_diff(row) -> tuple:
+    """Returns the values before and after of the columns changed on a row not flushed yet.
+
+    :param row: row changed
+    :type row: Base
+    :return: tuple with the dicts before and after
+    :rtype: tuple
+    """
+    before, after = {}, {}
+    state = inspect(row)
+    for column in state.mapper.column_attrs:
+        history = state.attrs[column.key].history
+        if not history.added or history.added == history.deleted:
+            continue
+
+        masked = column.key in MASKED_COLUMNS
+        before[column.key] = MASK if masked else (history.deleted or [None])[0]
+        after[column.key] = MASK if masked else history.added[0]
+
+    return before, after
+
+
+def stage(session, entity: str, entity_id: int, operation: str,
+          before: dict = None, after: dict = None) -> None:
+    """Stages an audit entry on the session, it is written only if the session commits.
+
+    :param session: database session
+    :type session: Session
+    :param entity: name of the table changed
+    :type entity: str
+    :param entity_id: id of the row changed
+    :type entity_id: int
+    :param operation: create, update or delete
+    :type operation: str
+    :param before: values before the change
+    :type before: dict
+    :param after: values after the change
+    :type after: dict
+    """
+    username = current_username() if has_request_context() else None
+    session.info.setdefault('audit_entries', []).append(dict(
+        username=username or SYSTEM_USER,
+        entity=entity,
+        entity_id=entity_id,
+        operation=operation,
+        before=json.dumps(before, default=str) if before else None,
+        after=json.dumps(after, default=str) if after else None,
+        audit_date=datetime.now(),
+    ))
+
+
+def stage_row(session, row, operation: str) -> None:
+    """Stages the audit entry of a row created, updated or deleted."""
+    if operation == 'create':
+        before, after = None, row_values(row)
+    elif operation == 'delete':
+        before, after = row_values(row), None
+    else:
+        before, after = row_diff(row)
+
+    stage(session, row.__tablename__, row.id, operation, before, after)
+
+
+class AuditWriter:
+    """Writes the audit entries on batches from a background thread."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.queue = queue.Queue()
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def start(self) -> None:
+        """Starts the writer thread of the current process, the threads are not copied
+        by the fork of the gunicorn workers."""
+        if self.thread is not None and self.pid == os.getpid():
+            return
+
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self.run, name='audit-writer', daemon=True)
+        self.thread.start()
+
+    def enqueue(self, entries: list) -> None:
+        """Queues the entries to be written by the background thread."""
+        self.start()
+        for entry in entries:
+            self.queue.put(entry)
+
+    def run(self) -> None:
+        """Loop of the writer thread, the entries are kept on the queue if the write fails
+        and written on the next flush."""
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Failed to write the audit entries')
+
+    def flush(self) -> int:
+        """Writes all the entries on the queue, returns the number of entries written."""
+        written = 0
+        with self.lock:
+            while True:
+                batch = []
+                while len(batch) < BATCH_SIZE:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                if not batch:
+                    return written
+
+                try:
+                    with self.engine.begin() as connection:
+                        connection.execute(AuditLogModel.__table__.insert(), batch)
+                except Exception:
+                    for entry in batch:
+                        self.queue.put(entry)
+                    raise
+                written += len(batch)
+
+
+writers = []
+
+
+@event.listens_for(Session, 'after_commit')
+def _send_staged_entries(session):
+    """Hands the entries of the committed transaction to the writer."""
+    entries = session.info.pop('audit_entries', None)
+    writer = session.info.get('audit_writer')
+    if entries and writer:
+        writer.enqueue(entries)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_staged_entries(session):
+    """Discards the entries of the changes rolled back."""
+    session.info.pop('audit_entries', None)
+
+
+def attach(session, writer: AuditWriter) -> None:
+    """Makes the writer receive the audit entries committed by the session."""
+    session.info['audit_writer'] = writer
+    if writer not in writers:
+        writers.append(writer)
+
+
+@atexit.register
+def _flush_writers():
+    """Writes the entries still on the queues when the process exits."""
+    for writer in writers:
+        if writer.pid == os.getpid():
+            writer.flush()
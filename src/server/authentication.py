@@ -1,22 +1,217 @@
-from flask_httpauth import HTTPBasicAuth
-from database.models import UserModel
-from flask import Flask
+import hashlib
+import hmac
+import math
+import os
+import time
+
+from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth, MultiAuth
+from database.models import UserModel, password_hash
+from flask import Flask, g, request
 from server.app import App
+from server.login_guard import LoginGuard
 
 
-auth = HTTPBasicAuth()
+basic_auth = HTTPBasicAuth()
+token_auth = HTTPTokenAuth(scheme='Bearer')
+# accepts both, the basic auth checks the password and the token only its signature
+auth = MultiAuth(basic_auth, token_auth)
 app: Flask = App('main')
+login_guard = LoginGuard()
+
+# seconds that a verified username/password is accepted without checking the hash again,
+# the basic auth sends the credentials on every request and the KDF is slow on purpose
+CREDENTIAL_CACHE_TTL = 30
+CREDENTIAL_CACHE_SIZE = 10000
+
+# the cache is keyed by a hmac of the credentials, so the passwords are never kept on memory
+_cache_secret = os.urandom(32)
+_verified_credentials = {}
+
+# seconds that the users of the tokens are kept on memory, a deleted user or a revocation
+# of all the tokens of a user is seen by the other gunicorn workers after this time
+TOKEN_SUBJECT_CACHE_TTL = 5
+# username -> (timestamp the tokens were revoked or None if the user does not exist, expires)
+_token_subjects = {}
+
+
+def credential_cache_key(username: str, password: str) -> bytes:
+    """Returns the key of the credentials on the verified credentials cache.
+
+    :param username: user name
+    :type username: str
+    :param password: user password
+    :type password: str
+    :return: keyed hash of the credentials
+    :rtype: bytes
+    """
+    message = f'{username}\0{password}'.encode('utf-8')
+    return hmac.new(_cache_secret, message, hashlib.sha256).digest()
+
+
+def cache_credentials(username: str, password: str) -> None:
+    """Registers the credentials as verified for CREDENTIAL_CACHE_TTL seconds."""
+    now = time.monotonic()
+    if len(_verified_credentials) >= CREDENTIAL_CACHE_SIZE:
+        for key, (_, expires) in list(_verified_credentials.items()):
+            if expires < now:
+                del _verified_credentials[key]
+
+        if len(_verified_credentials) >= CREDENTIAL_CACHE_SIZE:
+            _verified_credentials.clear()
+
+    key = credential_cache_key(username, password)
+    _verified_credentials[key] = (username, now + CREDENTIAL_CACHE_TTL)
+
+
+def invalidate_credentials(username: str) -> None:
+    """Removes the verified credentials of a user, must be called when the user changes.
+
+    Only the cache of the current process is invalidated, the other gunicorn workers keep
+    accepting the old credentials for at most CREDENTIAL_CACHE_TTL seconds.
+
+    :param username: user name
+    :type username: str
+    """
+    for key, (cached_username, _) in list(_verified_credentials.items()):
+        if cached_username == username:
+            del _verified_credentials[key]
+
+    _token_subjects.pop(username, None)
+
+
+def token_subject_valid(payload: dict) -> bool:
+    """Returns if the user of a token still exists and did not have its tokens revoked
+    after the token was issued, the users are kept on memory for TOKEN_SUBJECT_CACHE_TTL
+    seconds.
+
+    :param payload: payload of the token
+    :type payload: dict
+    :return: True if the token can be accepted
+    :rtype: bool
+    """
+    username = payload['sub']
+    now = time.monotonic()
+    cached = _token_subjects.get(username)
+    if not cached or cached[1] <= now:
+        if len(_token_subjects) >= CREDENTIAL_CACHE_SIZE:
+            _token_subjects.clear()
+
+        row = app.session.query(UserModel.tokens_revoked_date)\
+            .where(UserModel.name == username).first()
+        # on milliseconds, the same precision of the issue time of the tokens
+        revoked = None if row is None else \
+            (math.floor(row.tokens_revoked_date.timestamp() * 1000) / 1000
+             if row.tokens_revoked_date else 0)
+        cached = _token_subjects[username] = (revoked, now + TOKEN_SUBJECT_CACHE_TTL)
+
+    revoked = cached[0]
+    return revoked is not None and payload.get('iat', 0) >= revoked
+
+
+def current_username() -> str:
+    """Returns the name of the user authenticated on the current request."""
+    return auth.current_user()
 
 
-@auth.verify_password
+def limit_user(username: str) -> bool:
+    """Charges the request to the rate limit bucket of the user, called only once the
+    credentials are verified.
+
+    :param username: user name authenticated
+    :type username: str
+    :return: True if the request is allowed
+    :rtype: bool
+    """
+    retry_after = app.rate_limiter.check_user(username)
+    if not retry_after:
+        return True
+
+    app.logger.warning(f'[{username}] Request from {request.remote_addr} to {request.path} '
+                       f'throttled, retry after {retry_after}s')
+    g.rate_limit_retry_after = retry_after
+    return False
+
+
+def throttled_response():
+    """Returns the 429 response of a throttled user, None if the user was not throttled."""
+    retry_after = g.get('rate_limit_retry_after')
+    if not retry_after:
+        return None
+
+    return dict(error='Too many requests', retry_after=retry_after), 429, \
+        {'Retry-After': str(retry_after)}
+
+
+@basic_auth.verify_password
 def verify(username, password):
     global app
+    # the operations of a batch were already authenticated by the batch request
+    if g.get('batch_username'):
+        return g.batch_username
+
     if not (username and password):
         return False
 
-    rows = app.session.query(UserModel).where(UserModel.name == username)
-    print(rows.count())
-    if rows.count() == 0:
+    login_guard.flush(app.session)
+    retry_after = login_guard.retry_after(username, request.remote_addr)
+    if retry_after:
+        g.login_retry_after = retry_after
+        return False
+
+    key = credential_cache_key(username, password)
+    cached = _verified_credentials.get(key)
+    if cached and cached[1] > time.monotonic():
+        return limit_user(username)
+
+    user = app.session.query(UserModel).where(UserModel.name == username).first()
+    if not user or not user.validate_password(password):
+        login_guard.register_failure(username, request.remote_addr)
+        app.logger.warning(f'[{username}] Failed login from {request.remote_addr}')
         return False
 
-    return rows[0].validate_password(password)
+    login_guard.register_success(username, request.remote_addr)
+
+    # the hashes from older versions are replaced on the first successful login
+    if user.needs_rehash():
+        user.password = password_hash(password)
+        app.session.commit()
+
+    cache_credentials(username, password)
+    return limit_user(username)
+
+
+@basic_auth.error_handler
+def basic_auth_error(status):
+    """Answers the locked logins and the throttled users with 429 so the clients know
+    when to retry."""
+    throttled = throttled_response()
+    if throttled:
+        return throttled
+
+    retry_after = g.get('login_retry_after')
+    if retry_after:
+        retry_after = math.ceil(retry_after)
+        return dict(error='Too many failed logins', retry_after=retry_after), 429, \
+            {'Retry-After': str(retry_after)}
+
+    return 'Unauthorized Access', status
+
+
+@token_auth.verify_token
+def verify_token(token):
+    """Verifies a bearer token, the database is only accessed to sync the revoked tokens
+    and to check that the user still exists once every few seconds."""
+    app.tokens.sync_denylist(app.session)
+
+    payload = app.tokens.decode(token)
+    if not payload or not token_subject_valid(payload):
+        return None
+
+    g.token_payload = payload
+    return payload['sub'] if limit_user(payload['sub']) else None
+
+
+@token_auth.error_handler
+def token_auth_error(status):
+    """Answers the throttled users with 429 so the clients know when to retry."""
+    return throttled_response() or ('Unauthorized Access', status)
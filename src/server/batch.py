@@ -0,0 +1,157 @@
+"""Module to run many operations of the api on a single request.
+
+The operations are dispatched to the same resources of the routes, on request contexts
+created for each one, with the user already authenticated by the batch request. All of
+them run on a single transaction, the commits of the resources are deferred to the end
+of the batch, so either all the operations are applied or none of them.
+
+The operations can reference the results of the previous ones, a string ``$<index>.<field>``
+on the path or on the body is replaced by the field of the result of the operation of that
+index, so a batch can create a group and add users to it.
+"""
+import re
+
+from flask import g
+from werkzeug.exceptions import HTTPException
+
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+# maximum number of operations by batch
+MAX_OPERATIONS = 100
+# routes that can't run inside a batch
+EXCLUDED_PREFIXES = ('/batch', '/auth/', '/changes', '/metrics/')
+
+REFERENCE = re.compile(r'\$(\d+)\.(\w+)')
+
+
+class BatchError(Exception):
+    """Error on the operations informed or on the resolution of a reference."""
+
+
+def validate_operations(operations) -> None:
+    """Checks the operations of a batch before any of them is executed.
+
+    :param operations: operations informed on the body
+    :type operations: list
+    :raises BatchError: if an operation is not valid
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('Invalid body provided')
+
+    if len(operations) > MAX_OPERATIONS:
+        raise BatchError(f'A batch can have at most {MAX_OPERATIONS} operations')
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or not isinstance(operation.get('path'), str):
+            raise BatchError(f'Invalid operation {index}')
+
+        if operation.get('method', 'GET') not in BATCH_METHODS:
+            raise BatchError(f'Invalid method on operation {index}')
+
+        if not operation['path'].startswith('/') or \
+                operation['path'].startswith(EXCLUDED_PREFIXES):
+            raise BatchError(f'Path not allowed on operation {index}')
+
+
+def resolve_reference(match, results: list):
+    """Returns the value referenced by a match of REFERENCE on the previous results."""
+    index, field = int(match.group(1)), match.group(2)
+    if index >= len(results):
+        raise BatchError(f'Reference to the operation {index} that did not run yet')
+
+    body = results[index]['body']
+    if not isinstance(body, dict) or field not in body:
+        raise BatchError(f'Operation {index} has no {field} on its result')
+
+    return body[field]
+
+
+def resolve(value, results: list):
+    """Replaces the references to the previous results on a value of the body or the path.
+
+    Example:
+        >>> resolve({'group_id': '$0.id'}, [{'status': 200, 'body': {'id': 7}}])
+        {'group_id': 7}
+
+    :param value: value with the references
+    :type value: Any
+    :param results: results of the operations executed
+    :type results: list
+    :return: the value with the references replaced, a string that is only a reference
+        is replaced by the value itself, keeping its type
+    :rtype: Any
+    """
+    if isinstance(value, dict):
+        return {key: resolve(item, results) for key, item in value.items()}
+
+    if isinstance(value, list):
+        return [resolve(item, results) for item in value]
+
+    if not isinstance(value, str):
+        return value
+
+    match = REFERENCE.fullmatch(value)
+    if match:
+        return resolve_reference(match, results)
+
+    return REFERENCE.sub(lambda item: str(resolve_reference(item, results)), value)
+
+
+def run_operation(app, operation: dict, results: list) -> dict:
+    """Dispatches an operation to the resource of its route.
+
+    :param app: flask app
+    :type app: Flask
+    :param operation: method, path and body of the operation
+    :type operation: dict
+    :param results: results of the operations executed before
+    :type results: list
+    :return: dict with the status and the body of the response
+    :rtype: dict
+    """
+    path = resolve(operation['path'], results)
+    body = resolve(operation.get('body'), results)
+
+    with app.test_request_context(path, method=operation.get('method', 'GET'), json=body):
+        try:
+            response = app.make_response(app.dispatch_request())
+        except HTTPException as error:
+            return dict(status=error.code, body=dict(error=error.description))
+
+        return dict(status=response.status_code,
+                    body=response.get_json(silent=True) or response.get_data(as_text=True))
+
+
+def run_batch(app, session, username: str, operations: list) -> tuple:
+    """Runs the operations on a single transaction, stopping on the first one that fails.
+
+    :param app: flask app
+    :type app: Flask
+    :param session: database session
+    :type session: Session
+    :param username: user authenticated by the batch request
+    :type username: str
+    :param operations: operations validated by validate_operations
+    :type operations: list
+    :return: tuple with the results and the index of the operation that failed, None if
+        all of them succeeded and were committed
+    :rtype: tuple
+    """
+    results = []
+    g.batch_username = username
+    session.info['defer_commit'] = True
+    try:
+        for index, operation in enumerate(operations):
+            results.append(run_operation(app, operation, results))
+            if results[-1]['status'] >= 400:
+                session.rollback()
+                return results, index
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.info.pop('defer_commit', None)
+        g.pop('batch_username', None)
+
+    session.commit()
+    return results, None
@@ -0,0 +1,226 @@
+"""Module to keep the type tables and the responses of the lists on memory.
+
+The type tables are read on almost every request, to validate the types informed on the
+writes and to be listed by the clients, and they almost never change. The rows are loaded
+once by process and kept until the version of the table changes, the versions are checked
+at most once by interval, so between the checks the type tables are served only from the
+memory. A change made by the process itself invalidates the cache right after the commit.
+
+The responses of the lists are cached with the versions of the tables they were read
+from, read by the same session that reads the rows, so a replica behind the primary never
+stores an old response with the new versions. The versions are checked on every request,
+so a response is never returned after a change made by any worker, and the least recently
+used ones are dropped when the cache grows over its size in bytes.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database import models
+from flask import Flask, Response, request
+
+from server import routing
+from server import versions
+from server.app import App
+
+
+app: Flask = App('main')
+
+CACHED_MODELS = (
+    models.DatabaseTypeModel,
+    models.ServerTypeModel,
+    models.ConnectionTypeModel,
+    models.FunctionTypeModel,
+)
+# seconds between the checks of the versions of the tables cached
+VERSION_CHECK_INTERVAL = 1
+# bytes of the responses kept on memory by process
+RESPONSE_CACHE_BYTES = int(os.getenv('API_RESPONSE_CACHE_BYTES', 16 * 1024 * 1024))
+
+
+class TypeCache:
+    """Read through cache of the type tables, invalidated by the version of each table."""
+
+    def __init__(self, cached_models=CACHED_MODELS):
+        self.models = {model.__tablename__: model for model in cached_models}
+        # table name -> {id: json of the row}
+        self.rows = {}
+        # table name -> version of the rows loaded
+        self.versions = {}
+        self.checked = 0
+        self.lock = threading.Lock()
+
+    def is_cached(self, model_class) -> bool:
+        """Returns if the rows of the model are kept on the cache."""
+        return getattr(model_class, '__tablename__', None) in self.models
+
+    def check_versions(self, session, force: bool = False) -> None:
+        """Drops the tables changed by other processes, at most once by check interval.
+
+        :param session: database session
+        :type session: Session
+        :param force: check even if the interval did not pass yet
+        :type force: bool
+        """
+        now = time.monotonic()
+        if not force and now - self.checked < VERSION_CHECK_INTERVAL:
+            return
+
+        current = versions.get_versions(session, self.models)
+        with self.lock:
+            for table, version in current.items():
+                if self.versions.get(table) != version:
+                    self.rows.pop(table, None)
+        self.checked = now
+
+    def get(self, session, model_class) -> dict:
+        """Returns the rows of a type table by id, loading them on a cache miss.
+
+        :param session: database session
+        :type session: Session
+        :param model_class: model of the type table
+        :type model_class: Base
+        :return: dict with the json of the rows by id, the ids as strings
+        :rtype: dict
+        """
+        table = model_class.__tablename__
+        # the changes not committed yet by the session, as on a batch, are never cached
+        if table in session.info.get('changed_tables', ()):
+            return self.load(session, model_class)
+
+        self.check_versions(session)
+
+        rows = self.rows.get(table)
+        if rows is not None:
+            return rows
+
+        # the version is read before the rows, a change between them only reloads the table
+        version = versions.get_versions(session, [table])[table]
+        rows = self.load(session, model_class)
+        with self.lock:
+            self.rows[table] = rows
+            self.versions[table] = version
+        return rows
+
+    @staticmethod
+    def load(session, model_class) -> dict:
+        """Reads the rows of a type table from the database, by id."""
+        return {str(row.id): row.to_json(session)
+                for row in session.query(model_class).order_by(model_class.id)}
+
+    def exists(self, session, model_class, id) -> bool:
+        """Returns if there is a row with the id on a type table."""
+        return str(id) in self.get(session, model_class)
+
+    def invalidate(self, tables) -> None:
+        """Drops the tables from the cache, they are loaded again on the next access."""
+        with self.lock:
+            for table in tables:
+                self.rows.pop(table, None)
+
+
+class ResponseCache:
+    """LRU cache of the serialized responses, limited by the size of the responses."""
+
+    def __init__(self, scope, max_bytes: int = RESPONSE_CACHE_BYTES):
+        # callable that returns the permission scope of the request
+        self.scope = scope
+        self.max_bytes = max_bytes
+        # key -> (versions of the tables, body)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, table_versions: tuple) -> bytes:
+        """Returns the body cached for the key, if it was read on the same versions.
+
+        :param key: endpoint, query string and permission scope of the request
+        :type key: tuple
+        :param table_versions: current versions of the tables the response is read from
+        :type table_versions: tuple
+        :return: the body or None on a cache miss
+        :rtype: bytes
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            if entry[0] != table_versions:
+                self._remove(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, table_versions: tuple, body: bytes) -> None:
+        """Caches a body, dropping the least recently used ones over the size limit.
+
+        :param key: endpoint, query string and permission scope of the request
+        :type key: tuple
+        :param table_versions: versions of the tables read before the response was built
+        :type table_versions: tuple
+        :param body: serialized response
+        :type body: bytes
+        """
+        if len(body) > self.max_bytes:
+            return
+
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (table_versions, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self) -> None:
+        """Drops all the responses."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _remove(self, key) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+def cached_response(*tables):
+    """Decorator of the get methods that caches their responses by endpoint, query string
+    and permission scope, until one of the tables the response is read from changes.
+
+    :param tables: names of the tables read by the method
+    :type tables: str
+    :return: decorator
+    :rtype: Callable
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            # the changes not committed yet by the session, as on a batch, are never cached
+            if set(tables) & app.session.info.get('changed_tables', set()):
+                return method(*args, **kwargs)
+
+            key = (request.path, request.query_string, app.response_cache.scope())
+            with routing.read_session() as session:
+                # the versions are read before the rows and from the same database, a change
+                # between them is never cached
+                current = versions.get_versions(session, tables)
+                table_versions = tuple(current[table] for table in tables)
+
+                body = app.response_cache.get(key, table_versions)
+                if body is None:
+                    result = method(*args, **kwargs)
+                    if not isinstance(result, dict):
+                        return result
+
+                    body = json.dumps(result).encode('utf-8')
+                    app.response_cache.put(key, table_versions, body)
+
+            return Response(body, mimetype='application/json')
+        return wrapper
+    return decorator
@@ -0,0 +1,300 @@
+"""Module to handle the feed of the changes of the inventory.
+
+Every write appends a row to the change_log table on the same transaction of the change,
+so the id of the change_log is a sequence that the clients use to sync incrementally,
+asking only for the changes after the last sequence they have seen. The tables changed are
+marked on the session too, to increment their versions on the commit.
+
+The clients only see a change once it is committed, so the sequences must be committed in
+order, otherwise a client could move past a sequence that is committed later. The rows are
+written right before the commit and, on PostgreSQL, after a lock held until the end of the
+transaction, so the transactions get and commit their sequences one at a time. On sqlite
+the writes are already serialized by the database.
+
+The clients can wait for new changes with a long poll or with a Server-Sent Events
+stream. The gunicorn workers are synchronous, so both are limited to a few seconds,
+less than the worker timeout, and the clients reconnect with the last sequence. A waiting
+client holds a whole worker, so only API_CHANGES_MAX_WAITERS clients wait at the same time
+on all the workers, the others are answered with 429.
+"""
+import fcntl
+import json
+import math
+import os
+import time
+from datetime import datetime
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from database.models import ChangeLogModel
+from server import audit_log
+from server import versions
+
+
+CREATED = 'create'
+UPDATED = 'update'
+DELETED = 'delete'
+
+# maximum number of changes returned by request
+CHANGES_LIMIT = 1000
+# seconds between the checks for new changes while a client waits
+POLL_INTERVAL = 0.5
+# maximum seconds that a long poll or a stream holds a worker, less than its timeout
+MAX_WAIT = 20
+# milliseconds that an event stream client waits before reconnecting
+STREAM_RETRY = 1000
+# seconds without events before a keep alive comment is sent on a stream
+KEEP_ALIVE_INTERVAL = 5
+# clients waiting for changes at the same time, on all the workers
+MAX_WAITERS = int(os.getenv('API_CHANGES_MAX_WAITERS', 3))
+# key of the PostgreSQL advisory lock that orders the commits of the changes
+CHANGE_LOG_LOCK = 7_041_001
+
+
+def record_change(session, row, operation: str) -> None:
+    """Adds the change of a row to the session, it is written on the commit of the change
+    itself, the row of the created ones must be flushed before to have an id. The change
+    is staged on the audit too, so it must be called before the flush of an update.
+
+    :param session: database session
+    :type session: Session
+    :param row: row changed
+    :type row: Base
+    :param operation: CREATED, UPDATED or DELETED
+    :type operation: str
+    """
+    audit_log.stage_row(session, row, operation)
+    versions.mark_changed(session, row.__tablename__)
+    stage_changes(session, row.__tablename__, [row.id], operation)
+
+
+def record_changes(session, entity: str, entity_ids: list, operation: str,
+                   diffs: list = None) -> None:
+    """Adds the changes of many rows to the session, written with a single statement.
+
+    :param session: database session
+    :type session: Session
+    :param entity: name of the table changed
+    :type entity: str
+    :param entity_ids: ids of the rows changed
+    :type entity_ids: list
+    :param operation: CREATED, UPDATED or DELETED
+    :type operation: str
+    :param diffs: values before and after of each row to be audited, on the order of the ids
+    :type diffs: list
+    """
+    if not entity_ids:
+        return
+
+    for entity_id, (before, after) in zip(entity_ids, diffs or [(None, None)] * len(entity_ids)):
+        audit_log.stage(session, entity, entity_id, operation, before, after)
+    versions.mark_changed(session, entity)
+    stage_changes(session, entity, entity_ids, operation)
+
+
+def stage_changes(session, entity: str, entity_ids: list, operation: str) -> None:
+    """Stages the rows of the change_log on the session, they are written on the commit."""
+    now = datetime.now()
+    session.info.setdefault('change_log', []).extend(
+        dict(entity=entity, entity_id=entity_id, operation=operation, change_date=now)
+        for entity_id in entity_ids)
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_change_log(session):
+    """Writes the changes staged on the transaction being committed, on PostgreSQL after
+    the lock that makes the sequences be committed in order."""
+    rows = session.info.pop('change_log', None)
+    if not rows:
+        return
+
+    if session.get_bind().dialect.name == 'postgresql':
+        session.execute(text('SELECT pg_advisory_xact_lock(:key)'), dict(key=CHANGE_LOG_LOCK))
+    session.execute(ChangeLogModel.__table__.insert(), rows)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_change_log(session):
+    """Discards the changes rolled back."""
+    session.info.pop('change_log', None)
+
+
+class WaiterSlots:
+    """Limits the clients waiting for changes on all the gunicorn workers, each waiting
+    client holds the lock of one of the slot files, released by the system if the worker
+    dies."""
+
+    def __init__(self, prefix: str, size: int = MAX_WAITERS):
+        self.prefix = prefix
+        self.size = size
+
+    def acquire(self):
+        """Takes a free slot without waiting.
+
+        :return: the open file of the slot, to be released, or None if all are in use
+        :rtype: file
+        """
+        for index in range(self.size):
+            slot = open(f'{self.prefix}.{index}.lock', 'a')
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                slot.close()
+                continue
+            return slot
+
+        return None
+
+    @staticmethod
+    def release(slot) -> None:
+        """Releases a slot taken by acquire."""
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        slot.close()
+
+
+def waiters_exceeded():
+    """Returns the 429 response of a client that can't wait for changes, since the others
+    are holding all the waiter slots."""
+    return dict(error='Too many clients waiting for changes', retry_after=1), 429, \
+        {'Retry-After': '1'}
+
+
+def parse_sequence(value, default: int = 0) -> int:
+    """Parses a sequence informed by a client.
+
+    Example:
+        >>> parse_sequence('10'), parse_sequence(None), parse_sequence('-1')
+        (10, 0, None)
+
+    :param value: value to be parsed
+    :type value: str
+    :param default: value returned if the sequence is not informed
+    :type default: int
+    :return: the sequence or None if it is not valid
+    :rtype: int
+    """
+    if value in (None, ''):
+        return default
+
+    try:
+        sequence = int(value)
+    except ValueError:
+        return None
+
+    return sequence if sequence >= 0 else None
+
+
+def parse_wait(value) -> float:
+    """Parses the seconds that a client asked to wait for new changes, limited to
+    MAX_WAIT.
+
+    Example:
+        >>> parse_wait('2.5'), parse_wait(None), parse_wait('-1'), parse_wait('nan')
+        (2.5, 0.0, 0.0, None)
+
+    :param value: value to be parsed
+    :type value: str
+    :return: the seconds or None if it is not valid
+    :rtype: float
+    """
+    if value in (None, ''):
+        return 0.0
+
+    try:
+        wait = float(value)
+    except ValueError:
+        return None
+
+    # nan and inf would keep the deadline from ever passing
+    if not math.isfinite(wait):
+        return None
+
+    return min(max(0.0, wait), MAX_WAIT)
+
+
+def get_changes(session, since: int, limit: int = CHANGES_LIMIT) -> list:
+    """Returns the changes after a sequence.
+
+    :param session: database session
+    :type session: Session
+    :param since: last sequence seen by the client
+    :type since: int
+    :param limit: maximum number of changes
+    :type limit: int
+    :return: list of the changes ordered by sequence
+    :rtype: list
+    """
+    return session.query(ChangeLogModel)\
+        .where(ChangeLogModel.id > since)\
+        .order_by(ChangeLogModel.id)\
+        .limit(limit).all()
+
+
+def last_sequence(session) -> int:
+    """Returns the sequence of the last change, 0 if there are no changes."""
+    return session.query(ChangeLogModel.id).order_by(ChangeLogModel.id.desc()).limit(1)\
+        .scalar() or 0
+
+
+def wait_for_changes(session, since: int, timeout: float, limit: int = CHANGES_LIMIT) -> list:
+    """Returns the changes after a sequence, waiting up to timeout seconds for them.
+
+    :param session: database session
+    :type session: Session
+    :param since: last sequence seen by the client
+    :type since: int
+    :param timeout: seconds to wait for new changes
+    :type timeout: float
+    :param limit: maximum number of changes
+    :type limit: int
+    :return: list of the changes, empty if there were no changes on the timeout
+    :rtype: list
+    """
+    deadline = time.monotonic() + (min(timeout, MAX_WAIT) if math.isfinite(timeout) else 0)
+    while True:
+        changes = get_changes(session, since, limit)
+        if changes or time.monotonic() >= deadline:
+            return changes
+        time.sleep(POLL_INTERVAL)
+
+
+def stream_changes(session, since: int, duration: float = MAX_WAIT, slot=None):
+    """Generates the changes after a sequence as Server-Sent Events, for at most duration
+    seconds, the client reconnects with the Last-Event-ID header to continue.
+
+    :param session: database session
+    :type session: Session
+    :param since: last sequence seen by the client
+    :type since: int
+    :param duration: seconds that the stream is kept open
+    :type duration: float
+    :param slot: waiter slot released when the stream is closed
+    :type slot: file
+    :return: generator of the events
+    :rtype: generator
+    """
+    try:
+        yield f'retry: {STREAM_RETRY}\n\n'
+
+        last_event = time.monotonic()
+        deadline = last_event + min(duration, MAX_WAIT)
+        while time.monotonic() < deadline:
+            changes = get_changes(session, since)
+            for change in changes:
+                yield f'id: {change.id}\nevent: change\n' \
+                      f'data: {json.dumps(change.to_json())}\n\n'
+                since = change.id
+                last_event = time.monotonic()
+
+            if changes:
+                continue
+
+            # keeps the connection alive through the proxies
+            if time.monotonic() - last_event >= KEEP_ALIVE_INTERVAL:
+                yield ': keep-alive\n\n'
+                last_event = time.monotonic()
+            time.sleep(POLL_INTERVAL)
+    finally:
+        if slot is not None:
+            WaiterSlots.release(slot)
@@ -0,0 +1,105 @@
+"""Module to render the connection strings of the databases.
+
+Each database type has its own format, the one expected by the usual client of the
+database, so the consumers of the api don't need to build them. The strings are rendered
+from the row on each request, rendering is cheaper than keeping a cache consistent.
+"""
+import re
+from urllib.parse import quote
+
+from database.utils import DatabaseEnum
+
+DSN_FORMATS = {
+    DatabaseEnum.ORACLE: '{host}:{port}/{sid}',
+    DatabaseEnum.MYSQL: 'mysql://{host}:{port}/{sid}',
+    DatabaseEnum.POSTGRES: 'postgresql://{host}:{port}/{sid}',
+    DatabaseEnum.SQLITE: 'sqlite:///{sid}',
+    DatabaseEnum.MONGODB: 'mongodb://{host}:{port}/{sid}',
+    DatabaseEnum.REDIS: 'redis://{host}:{port}/{sid}',
+    DatabaseEnum.MSSQL: 'Server={server};Database={sid}',
+}
+
+# characters that end or change a value of an odbc connection string
+ODBC_SPECIAL = re.compile(r'[;{}=]|^\s|\s$')
+
+
+def format_host(host: str) -> str:
+    """Returns the host to be used on a connection string, the ipv6 addresses need brackets.
+
+    Example:
+        >>> format_host('::1')
+        '[::1]'
+
+    :param host: hostname or ip address
+    :type host: str
+    :return: formatted host
+    :rtype: str
+    """
+    if ':' in host and not host.startswith('['):
+        return f'[{host}]'
+    return host
+
+
+def odbc_value(value: str) -> str:
+    """Returns a value to be used on an odbc connection string, the values with special
+    characters are enclosed by braces, so they can't add attributes to the string.
+
+    Example:
+        >>> odbc_value('app;Trusted_Connection=yes')
+        '{app;Trusted_Connection=yes}'
+
+    :param value: value of an attribute
+    :type value: str
+    :return: escaped value
+    :rtype: str
+    """
+    value = str(value)
+    if ODBC_SPECIAL.search(value):
+        return '{' + value.replace('}', '}}') + '}'
+    return value
+
+
+def render_dsn(database_type_id, host: str, port: int, sid: str) -> str:
+    """Renders the connection string of a database.
+
+    Example:
+        >>> render_dsn(3, 'db.example.com', 5432, 'inventory')
+        'postgresql://db.example.com:5432/inventory'
+
+    :param database_type_id: id of the database type, the value of DatabaseEnum
+    :type database_type_id: int
+    :param host: hostname or ip address
+    :type host: str
+    :param port: database port
+    :type port: int
+    :param sid: database sid or name
+    :type sid: str
+    :return: connection string or None if the database type is unknown
+    :rtype: str
+    """
+    try:
+        database_type = DatabaseEnum(int(database_type_id))
+    except ValueError:
+        return None
+
+    if database_type == DatabaseEnum.MSSQL:
+        return DSN_FORMATS[database_type].format(
+            server=odbc_value(f'{format_host(host)},{port}'), sid=odbc_value(sid))
+
+    if database_type == DatabaseEnum.SQLITE:
+        sid = quote(str(sid), safe='/')
+    else:
+        sid = quote(str(sid), safe='')
+
+    return DSN_FORMATS[database_type].format(host=format_host(host), port=port, sid=sid)
+
+
+def get_dsn(row) -> str:
+    """Returns the connection string of a database row.
+
+    :param row: row with database_type_id, host, port and sid
+    :type row: DatabaseModel
+    :return: connection string
+    :rtype: str
+    """
+    return render_dsn(row.database_type_id, row.host, row.port, row.sid)
@@ -0,0 +1,206 @@
+"""Module to export the servers as ssh_config or as an ansible inventory.
+
+The exports are rendered line by line from the rows of a single query, read with a server
+side cursor, so the memory used does not depend on the number of servers. The inventories
+are grouped by the groups the servers are granted to, the query is ordered by group so
+each group is written only once, with a name that is unique on the file.
+"""
+import json
+import re
+
+from database import models
+from sqlalchemy import and_
+
+
+EXPORT_FORMATS = ('ssh_config', 'ini', 'yaml')
+# rows fetched by round trip from the cursor
+EXPORT_BATCH_SIZE = 1000
+# group of the servers not granted to any group, the same name used by ansible
+UNGROUPED = 'ungrouped'
+
+
+def safe_name(name: str) -> str:
+    """Returns a name that can be used as a host alias or group name.
+
+    Example:
+        >>> safe_name('Web server 01')
+        'Web_server_01'
+
+    :param name: name to be converted
+    :type name: str
+    :return: name with only letters, numbers, dots, hyphens and underscores
+    :rtype: str
+    """
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+
+
+def single_line(value: str) -> str:
+    """Returns a value to be written on a comment, the line breaks and the other control
+    characters are replaced by spaces, so the value can't add lines to the file.
+
+    Example:
+        >>> single_line('web\\nHost *')
+        'web Host *'
+
+    :param value: value to be written
+    :type value: str
+    :return: value on a single line
+    :rtype: str
+    """
+    return re.sub(r'[\x00-\x1f\x7f\x85\u2028\u2029]+', ' ', str(value))
+
+
+def safe_host(host: str) -> str:
+    """Returns the host without whitespace or control characters, the hosts are checked
+    when the servers are saved, this only protects the exports of older rows."""
+    return re.sub(r'[\s\x00-\x1f\x7f]', '', str(host))
+
+
+def host_alias(row) -> str:
+    """Returns the alias of a server, the description followed by the id to be unique."""
+    return f'{safe_name(row.description)}-{row.id}'
+
+
+def unique_group_names():
+    """Returns a function that gives the name of the group of a row, the names are made
+    safe and suffixed by a counter when two groups would end up with the same name.
+
+    :return: function receiving a row of export_query and returning the group name
+    :rtype: callable
+    """
+    names = {}
+    used = set()
+
+    def group_name(row) -> str:
+        if row.group_id not in names:
+            name = safe_name(row.group or UNGROUPED)
+            unique_name, index = name, 1
+            while unique_name in used:
+                index += 1
+                unique_name = f'{name}_{index}'
+
+            used.add(unique_name)
+            names[row.group_id] = unique_name
+
+        return names[row.group_id]
+
+    return group_name
+
+
+def export_query(session, grouped: bool = True, group_ids: set = None):
+    """Returns the query of the servers to be exported, with their types.
+
+    :param session: database session
+    :type session: Session
+    :param grouped: join with the groups of the servers, ordering the rows by group
+    :type grouped: bool
+    :param group_ids: groups that can be listed, None to list all the groups
+    :type group_ids: set
+    :return: query of the rows
+    :rtype: Query
+    """
+    columns = [
+        models.ServerModel.id,
+        models.ServerModel.description,
+        models.ServerModel.host,
+        models.ServerModel.port,
+        models.ServerTypeModel.description.label('server_type'),
+        models.ConnectionTypeModel.description.label('connection_type'),
+    ]
+    if grouped:
+        columns.append(models.GroupModel.id.label('group_id'))
+        columns.append(models.GroupModel.description.label('group'))
+
+    query = session.query(*columns)\
+        .join(models.ServerTypeModel,
+              models.ServerTypeModel.id == models.ServerModel.server_type_id)\
+        .join(models.ConnectionTypeModel,
+              models.ConnectionTypeModel.id == models.ServerModel.connection_type)
+
+    if not grouped:
+        return query.order_by(models.ServerModel.id)
+
+    # the groups the user does not belong to are not listed, their servers are written
+    # on the groups of the user or as ungrouped
+    permission = models.ServerPermissionsModel.server_id == models.ServerModel.id
+    if group_ids is not None:
+        permission = and_(permission, models.ServerPermissionsModel.group_id.in_(group_ids))
+
+    return query\
+        .outerjoin(models.ServerPermissionsModel, permission)\
+        .outerjoin(models.GroupModel,
+                   models.GroupModel.id == models.ServerPermissionsModel.group_id)\
+        .order_by(models.GroupModel.description, models.GroupModel.id, models.ServerModel.id)
+
+
+def stream_rows(query):
+    """Iterates the rows of the query with a server side cursor."""
+    return query.execution_options(stream_results=True).yield_per(EXPORT_BATCH_SIZE)
+
+
+def render_ssh_config(rows):
+    """Renders the servers as a ssh_config file, one Host entry by server.
+
+    :param rows: rows of export_query without the groups
+    :type rows: iterable
+    :return: generator of the lines
+    :rtype: generator
+    """
+    for row in rows:
+        yield f'# {single_line(row.description)} ({single_line(row.server_type)})\n'
+        yield f'Host {host_alias(row)}\n'
+        yield f'    HostName {safe_host(row.host)}\n'
+        yield f'    Port {row.port}\n\n'
+
+
+def render_ini(rows):
+    """Renders the servers as an ansible inventory on the ini format.
+
+    :param rows: rows of export_query ordered by group
+    :type rows: iterable
+    :return: generator of the lines
+    :rtype: generator
+    """
+    group_name = unique_group_names()
+    current_group = None
+    for row in rows:
+        group = group_name(row)
+        if group != current_group:
+            if current_group is not None:
+                yield '\n'
+            yield f'[{group}]\n'
+            current_group = group
+
+        yield f'{host_alias(row)} ansible_host={safe_host(row.host)} ' \
+              f'ansible_port={row.port} ' \
+              f'server_type={safe_name(row.server_type.lower())} ' \
+              f'connection_type={safe_name(row.connection_type.lower())}\n'
+
+
+def render_yaml(rows):
+    """Renders the servers as an ansible inventory on the yaml format, the strings are
+    written as json, that is also valid yaml.
+
+    :param rows: rows of export_query ordered by group
+    :type rows: iterable
+    :return: generator of the lines
+    :rtype: generator
+    """
+    yield 'all:\n  children:\n'
+
+    group_name = unique_group_names()
+    current_group = None
+    for row in rows:
+        group = group_name(row)
+        if group != current_group:
+            yield f'    {group}:\n      hosts:\n'
+            current_group = group
+
+        yield f'        {host_alias(row)}:\n' \
+              f'          ansible_host: {json.dumps(row.host)}\n' \
+              f'          ansible_port: {row.port}\n' \
+              f'          server_type: {json.dumps(row.server_type.lower())}\n' \
+              f'          connection_type: {json.dumps(row.connection_type.lower())}\n'
+
+
+RENDERERS = dict(ssh_config=render_ssh_config, ini=render_ini, yaml=render_yaml)
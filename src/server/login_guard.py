@@ -0,0 +1,116 @@
+"""Module to slow down brute force attacks on the basic auth.
+
+The failed logins are counted by user name and by remote ip on a sliding window kept on
+memory, after too many failures the user or ip is locked for a time that doubles on each
+new failure. The failures are flushed to the database at most once by FLUSH_INTERVAL, in a
+single transaction, and the locks registered by the other workers are loaded on the same
+flush, so an attack does not turn into one write by failed request.
+"""
+import time
+from collections import deque
+from datetime import datetime
+
+from database.models import LoginFailureModel
+
+
+# seconds of the sliding window of the failures
+FAILURE_WINDOW = 300
+# number of failures on the window before the lock, the ips are shared by many users
+MAX_FAILURES = dict(user=5, ip=20)
+# seconds of the first lock, doubled on each new failure up to LOCKOUT_MAX
+LOCKOUT_BASE = 1
+LOCKOUT_MAX = 900
+# seconds between the flushes to the database
+FLUSH_INTERVAL = 10
+
+
+class LoginGuard:
+    """Tracks the failed logins of the process and the locks of the users and ips."""
+
+    def __init__(self):
+        # key -> timestamps of the failures on the window
+        self.failures = {}
+        # key -> timestamp until the key is locked
+        self.locked = {}
+        # keys changed since the last flush
+        self.dirty = set()
+        self.last_flush = 0
+
+    @staticmethod
+    def keys(username: str, remote_addr: str) -> list:
+        """Returns the keys tracked for a login."""
+        return [('user', f'user:{username}'), ('ip', f'ip:{remote_addr}')]
+
+    def retry_after(self, username: str, remote_addr: str) -> float:
+        """Returns the seconds until the user and ip can try to login again.
+
+        :param username: user name
+        :type username: str
+        :param remote_addr: remote ip
+        :type remote_addr: str
+        :return: 0 if the login is allowed
+        :rtype: float
+        """
+        now = time.time()
+        locked_until = max(self.locked.get(key, 0) for _, key in self.keys(username, remote_addr))
+        return max(0, locked_until - now)
+
+    def register_failure(self, username: str, remote_addr: str) -> None:
+        """Registers a failed login, locking the user or ip after too many failures."""
+        now = time.time()
+        for kind, key in self.keys(username, remote_addr):
+            failures = self.failures.setdefault(key, deque())
+            failures.append(now)
+            while failures and failures[0] < now - FAILURE_WINDOW:
+                failures.popleft()
+
+            exceeded = len(failures) - MAX_FAILURES[kind]
+            if exceeded >= 0:
+                lockout = min(LOCKOUT_MAX, LOCKOUT_BASE * 2 ** exceeded)
+                self.locked[key] = max(self.locked.get(key, 0), now + lockout)
+
+            self.dirty.add(key)
+
+    def register_success(self, username: str, remote_addr: str) -> None:
+        """Clears the failures of the user after a successful login, the ip is kept since
+        an attacker could have a valid user."""
+        key = f'user:{username}'
+        if key in self.failures or key in self.locked:
+            self.failures.pop(key, None)
+            self.locked.pop(key, None)
+            self.dirty.add(key)
+
+    def flush(self, session, force: bool = False) -> None:
+        """Writes the changed keys to the database and loads the locks of the other workers.
+
+        :param session: database session
+        :type session: Session
+        :param force: flush even if the interval did not pass yet
+        :type force: bool
+        """
+        now = time.time()
+        if not force and now - self.last_flush < FLUSH_INTERVAL:
+            return
+
+        for key in self.dirty:
+            failures = self.failures.get(key)
+            if not failures:
+                session.query(LoginFailureModel).where(LoginFailureModel.key == key).delete()
+                continue
+
+            locked_until = self.locked.get(key)
+            session.merge(LoginFailureModel(
+                key, len(failures), datetime.fromtimestamp(failures[-1]),
+                datetime.fromtimestamp(locked_until) if locked_until else None))
+        session.commit()
+        self.dirty = set()
+
+        rows = session.query(LoginFailureModel)\
+            .where(LoginFailureModel.locked_until > datetime.fromtimestamp(now)).all()
+        for row in rows:
+            self.locked[row.key] = max(self.locked.get(row.key, 0), row.locked_until.timestamp())
+
+        self.locked = {key: until for key, until in self.locked.items() if until > now}
+        self.failures = {key: failures for key, failures in self.failures.items()
+                         if failures and failures[-1] >= now - FAILURE_WINDOW}
+        self.last_flush = now
@@ -0,0 +1,159 @@
+"""Module to handle the rate limit of the requests by user and by remote ip.
+
+Each user and ip has a token bucket, that is refilled at ``rate`` tokens per second up to
+``burst`` tokens and each request consumes one token. The buckets are stored on a separate
+sqlite file, so all the gunicorn workers share them, and each request is a single UPSERT
+statement, so the buckets are updated atomically without a read before the write.
+"""
+import math
+import os
+import sqlite3
+import time
+
+
+USER_RATE = float(os.getenv('API_USER_RATE', 20))
+USER_BURST = float(os.getenv('API_USER_BURST', 60))
+IP_RATE = float(os.getenv('API_IP_RATE', 50))
+IP_BURST = float(os.getenv('API_IP_BURST', 150))
+
+# seconds that a bucket without requests is kept before being removed
+BUCKET_RETENTION = 3600
+
+CREATE_TABLE = '''
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    allowed INTEGER NOT NULL,
+    throttled INTEGER NOT NULL DEFAULT 0
+)
+'''
+
+# refills the bucket by the time passed since the last request and consumes one token,
+# when there is not a full token the request is not allowed and the token is not consumed
+CONSUME_TOKEN = '''
+INSERT INTO bucket (key, tokens, updated, allowed, throttled)
+VALUES (:key, :burst - 1, :now, 1, 0)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = min(:burst, tokens + (:now - updated) * :rate)
+             - (min(:burst, tokens + (:now - updated) * :rate) >= 1),
+    allowed = min(:burst, tokens + (:now - updated) * :rate) >= 1,
+    throttled = throttled + (min(:burst, tokens + (:now - updated) * :rate) < 1),
+    updated = :now
+RETURNING tokens, allowed
+'''
+
+
+class RateLimiter:
+    """Token bucket rate limiter shared by the processes using the same sqlite file."""
+
+    def __init__(self, database_file: str, enabled: bool = True):
+        self.database_file = database_file
+        self.enabled = enabled
+        self.limits = dict(user=(USER_RATE, USER_BURST), ip=(IP_RATE, IP_BURST))
+
+        self.connection = None
+        self.pid = None
+        self.last_cleanup = time.time()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Returns the connection of the current process, since it can't be shared after
+        the fork of the gunicorn workers."""
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.database_file, timeout=5,
+                                              isolation_level=None, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=OFF')
+            self.connection.execute(CREATE_TABLE)
+            self.pid = os.getpid()
+
+        return self.connection
+
+    def consume(self, kind: str, identifier: str) -> float:
+        """Consumes one token of the bucket.
+
+        :param kind: kind of the bucket, user or ip
+        :type kind: str
+        :param identifier: user name or ip
+        :type identifier: str
+        :return: 0 if the request is allowed otherwise the seconds until the next token
+        :rtype: float
+        """
+        rate, burst = self.limits[kind]
+        tokens, allowed = self.get_connection().execute(CONSUME_TOKEN, dict(
+            key=f'{kind}:{identifier}', now=time.time(), rate=rate, burst=burst)).fetchone()
+
+        if allowed:
+            return 0
+        return (1 - tokens) / rate
+
+    def check(self, username: str, remote_addr: str) -> int:
+        """Checks the buckets of the user and of the ip of a request.
+
+        :param username: user name of the request, None if it is not authenticated
+        :type username: str
+        :param remote_addr: remote ip of the request
+        :type remote_addr: str
+        :return: 0 if the request is allowed otherwise the seconds to retry
+        :rtype: int
+        """
+        retry_after = self.check_ip(remote_addr)
+        if username and not retry_after:
+            retry_after = self.check_user(username)
+
+        return retry_after
+
+    def check_ip(self, remote_addr: str) -> int:
+        """Checks the bucket of the ip of a request, before the request is authenticated.
+
+        :param remote_addr: remote ip of the request
+        :type remote_addr: str
+        :return: 0 if the request is allowed otherwise the seconds to retry
+        :rtype: int
+        """
+        if not self.enabled:
+            return 0
+
+        self.cleanup()
+        return math.ceil(self.consume('ip', remote_addr))
+
+    def check_user(self, username: str) -> int:
+        """Checks the bucket of a user, only after the credentials of the user were
+        verified, otherwise anyone could empty the bucket of another user.
+
+        :param username: user name authenticated
+        :type username: str
+        :return: 0 if the request is allowed otherwise the seconds to retry
+        :rtype: int
+        """
+        if not self.enabled:
+            return 0
+
+        return math.ceil(self.consume('user', username))
+
+    def cleanup(self) -> None:
+        """Removes the buckets not used for a while, at most once by minute by process."""
+        now = time.time()
+        if now - self.last_cleanup < 60:
+            return
+
+        self.get_connection().execute(
+            'DELETE FROM bucket WHERE updated < ?', (now - BUCKET_RETENTION, ))
+        self.last_cleanup = now
+
+    def metrics(self, top: int = 10) -> dict:
+        """Returns the number of throttled requests, in total and of the top buckets.
+
+        :param top: number of buckets to be returned
+        :type top: int
+        :return: dict with the metrics
+        :rtype: dict
+        """
+        connection = self.get_connection()
+        total = connection.execute('SELECT coalesce(sum(throttled), 0) FROM bucket').fetchone()
+        rows = connection.execute(
+            'SELECT key, throttled FROM bucket WHERE throttled > 0 '
+            'ORDER BY throttled DESC LIMIT ?', (top, )).fetchall()
+
+        return dict(throttled=total[0], buckets=[dict(key=key, throttled=throttled)
+                                                 for key, throttled in rows])
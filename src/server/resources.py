@@ -1,14 +1,26 @@
 """Method to handle the resource for the API"""
 from abc import ABC, abstractmethod
+from datetime import datetime
 import json
+import os
 
+from database import backup
 from database import models
 from flask import Flask
+from flask import g
 from flask import request
+from flask import Response
+from flask import stream_with_context
 from flask_restful import Resource
 
 from server.app import App
-from server.authentication import auth
+from server.authentication import auth, basic_auth, token_auth
+from server.authentication import current_username, invalidate_credentials
+from server import batch
+from server import cache
+from server import changes
+from server import dsn
+from server import inventory
 from server import utils
 
 
@@ -1340,6 +1352,7 @@ class Groups(BasicTypes):
     methods = ['GET', 'POST', 'OPTIONS']
 
     @auth.login_required
+    @cache.cached_response('groups')
     def get(self):
         """Method to get the Group types.
         ---
@@ -1655,12 +1668,165 @@ class Group(BasicTypeSingle):
         return dict(Allow=self.methods)
 
 
+class GroupAssignments(Resource, ABC):
+    """Base class to assign many rows to a group at once."""
+    model_class = None
+    # model of the rows assigned, the column of the association table and the body key
+    target_class = None
+    field = None
+    body_key = None
+    methods = ['POST', 'OPTIONS']
+
+    def assign(self, id):
+        """Validates the ids of the body and assigns them to the group on one transaction,
+        only the admin group can change the members and the functions of the groups."""
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can change the group assignments'}, 401
+
+        data = json.loads(request.get_data().decode('utf-8'))
+        items = data.get(self.body_key) if isinstance(data, dict) else None
+
+        try:
+            ids = [int(item) for item in items]
+        except (TypeError, ValueError):
+            return {'error': 'Invalid body provided', 'required_fields': [self.body_key]}, 401
+
+        if not ids:
+            return {'error': 'Invalid body provided', 'required_fields': [self.body_key]}, 401
+
+        if not utils.check_if_info_exists(models.GroupModel, id)[0]:
+            return {'error': 'Group not found'}, 401
+
+        missing = utils.find_missing_ids(self.target_class, ids)
+        if missing:
+            return {'error': f'{self.target_class.__name__} not found', self.body_key: missing}, 401
+
+        result = utils.assign_to_group(app.session, self.model_class, int(id), self.field, ids)
+        app.logger.info(f'[{current_username()}] {self.__class__.__name__} group {id}: {result}')
+        return result
+
+    def options(self, id):
+        return dict(Allow=self.methods)
+
+
+class GroupMembers(GroupAssignments):
+    """Class to add many users to a group."""
+    model_class = models.UserGroupModel
+    target_class = models.UserModel
+    field = 'user_id'
+    body_key = 'user_ids'
+
+    @auth.login_required
+    def post(self, id):
+        """Method to add many users to a group, the users already on the group are skipped.
+        ---
+        tags:
+          - Groups
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            type: integer
+            description: Id of the group
+          - in: body
+            name: user_ids
+            description: Ids of the users
+            schema:
+              $ref: '#/definitions/GroupMembersBody'
+
+        definitions:
+          GroupMembersBody:
+            type: object
+            properties:
+              user_ids:
+                type: array
+                items:
+                  type: integer
+                example: [2, 3]
+          GroupAssignment:
+            type: object
+            properties:
+              inserted:
+                type: integer
+                description: Number of rows assigned to the group
+              existing:
+                type: integer
+                description: Number of rows that were already assigned
+        responses:
+          '200':
+            description: Number of rows assigned
+            schema:
+              $ref: '#/definitions/GroupAssignment'
+          '401':
+            description: Error if the group or any of the users is not found or the user is
+              not on the admin group
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        return self.assign(id)
+
+
+class GroupFunctions(GroupAssignments):
+    """Class to grant many functions to a group."""
+    model_class = models.FunctionPermissionsModel
+    target_class = models.FunctionTypeModel
+    field = 'function_id'
+    body_key = 'function_ids'
+
+    @auth.login_required
+    def post(self, id):
+        """Method to grant many functions to a group, the functions already granted are skipped.
+        ---
+        tags:
+          - Groups
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            type: integer
+            description: Id of the group
+          - in: body
+            name: function_ids
+            description: Ids of the functions
+            schema:
+              $ref: '#/definitions/GroupFunctionsBody'
+
+        definitions:
+          GroupFunctionsBody:
+            type: object
+            properties:
+              function_ids:
+                type: array
+                items:
+                  type: integer
+                example: [1, 2]
+        responses:
+          '200':
+            description: Number of rows assigned
+            schema:
+              $ref: '#/definitions/GroupAssignment'
+          '401':
+            description: Error if the group or any of the functions is not found or the user
+              is not on the admin group
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        return self.assign(id)
+
+
 class Users(BasicTypes):
     """Class to handle user requests"""
     model_class = models.UserModel
     methods = ['GET', 'POST', 'OPTIONS']
 
     @auth.login_required
+    @cache.cached_response('user')
     def get(self):
         """Method to get the Users list.
         ---
@@ -1792,13 +1958,12 @@ class Users(BasicTypes):
             }, 401
 
         user = models.UserModel(name, password)
-        app.session.bulk_save_objects([user])
+        app.session.add(user)
+        app.session.flush()
+        changes.record_change(app.session, user, changes.CREATED)
         app.session.commit()
 
-        row = app.session.query(models.UserModel).\
-            where(models.UserModel.name == name).first()
-
-        return {'success': f'User {name} created.', 'id': row.id}
+        return {'success': f'User {name} created.', 'id': user.id}
 
     def options(self):
         return dict(Allow=self.methods)
@@ -1919,18 +2084,26 @@ class User(BasicTypeSingle):
 
         data = json.loads(request.get_data().decode('utf-8'))
 
-        if ['name', 'password'] not in data:
+        if not all(item in data for item in ['name', 'password']):
             return {'error': 'Invalid description provided'}, 401
 
-        row.password = data['password']
+        invalidate_credentials(row.name)
+
+        # the tokens issued before a change of the password or of the name are revoked
+        if data['name'] != row.name or not row.validate_password(data['password']):
+            row.tokens_revoked_date = datetime.now()
+
+        row.password = models.password_hash(data['password'])
         row.name = data['name']
+        invalidate_credentials(row.name)
 
         app.session.bulk_save_objects([row])
+        changes.record_change(app.session, row, changes.UPDATED)
         app.session.commit()
 
         message = f"{self.__class__.__name__}:" + \
                   f" {row.id} saved successfully"
-        app.logger.debug(f"[{request.authorization.username}] " + message)
+        app.logger.debug(f"[{current_username()}] " + message)
 
         return dict(message=message, register=row.to_json())
 
@@ -1978,6 +2151,10 @@ class User(BasicTypeSingle):
             schema:
               $ref: '#/definitions/Error'
         """
+        verifier, row = utils.check_if_info_exists(self.model_class, id)
+        if verifier:
+            invalidate_credentials(row.name)
+
         resp = utils.basic_single_delete(
             id,
             app,
@@ -2096,20 +2273,27 @@ class UserGroup(Resource):
 
         data = json.loads(request.get_data().decode('utf-8'))
 
-        if ['group_id', 'user_id'] not in data:
+        if not all(item in data for item in ['group_id', 'user_id']):
             return {'error': 'Invalid description provided'}, 401
 
+        if utils.pair_exists(app.session, self.model_class, row.id,
+                             group_id=data['group_id'], user_id=data['user_id']):
+            return dict(
+               error=f'{self.__class__.__name__}: Combination already exists'
+            ), 401
+
         row.user_id = data['user_id']
         row.group_id = data['group_id']
 
         app.session.bulk_save_objects([row])
+        changes.record_change(app.session, row, changes.UPDATED)
         app.session.commit()
 
         message = f"{self.__class__.__name__}:" + \
                   f" {row.id} saved successfully"
-        app.logger.debug(f"[{request.authorization.username}] " + message)
+        app.logger.debug(f"[{current_username()}] " + message)
 
-        return dict(message=message, register=row.to_json())
+        return dict(message=message, register=row.to_json(app.session))
 
     @auth.login_required
     def delete(self, id):
@@ -2174,6 +2358,7 @@ class UserGroups(BasicTypes):
     methods = ['GET', 'POST', 'OPTIONS']
 
     @auth.login_required
+    @cache.cached_response('user_grp', 'groups', 'user')
     def get(self):
         """Method to handle get requests for type tables.
         ---
@@ -2325,21 +2510,15 @@ class UserGroups(BasicTypes):
         if not utils.check_if_info_exists(models.UserModel, data['user_id'])[0]:
             return {'error': 'User not found'}, 401
 
-        row = app.session.query(self.model_class).\
-            where(self.model_class.group_id == data['group_id'] and
-                  self.model_class.user_id == data['user_id']).first()
-        if row:
+        row = utils.insert_pair(app.session, self.model_class,
+                                group_id=data['group_id'], user_id=data['user_id'])
+        if not row:
             return dict(
                error=f'{self.__class__.__name__}: Combination already exists'
             ), 401
 
-        app.session.bulk_save_objects([self.model_class(data["group_id"], data['user_id'])])
         app.session.commit()
 
-        row = app.session.query(self.model_class).\
-            where(self.model_class.group_id == data['group_id'] and
-                  self.model_class.user_id == data['user_id']).first()
-
         return {'success': 'Registered successfully', 'id': row.id}
 
     def options(self):
@@ -2452,20 +2631,27 @@ class FunctionPermission(Resource):
 
         data = json.loads(request.get_data().decode('utf-8'))
 
-        if ['group_id', 'function_id'] not in data:
+        if not all(item in data for item in ['group_id', 'function_id']):
             return {'error': 'Invalid description provided'}, 401
 
-        row.user_id = data['user_id']
+        if utils.pair_exists(app.session, self.model_class, row.id,
+                             group_id=data['group_id'], function_id=data['function_id']):
+            return dict(
+               error=f'{self.__class__.__name__}: Combination already exists'
+            ), 401
+
+        row.group_id = data['group_id']
         row.function_id = data['function_id']
 
         app.session.bulk_save_objects([row])
+        changes.record_change(app.session, row, changes.UPDATED)
         app.session.commit()
 
         message = f"{self.__class__.__name__}:" + \
                   f" {row.id} saved successfully"
-        app.logger.debug(f"[{request.authorization.username}] " + message)
+        app.logger.debug(f"[{current_username()}] " + message)
 
-        return dict(message=message, register=row.to_json())
+        return dict(message=message, register=row.to_json(app.session))
 
     @auth.login_required
     def delete(self, id):
@@ -2530,6 +2716,7 @@ class FunctionPermissions(Resource):
     methods = ['GET', 'POST', 'OPTIONS']
 
     @auth.login_required
+    @cache.cached_response('function_permissions', 'groups', 'function_type')
     def get(self):
         """(Incomplete) Method to handle get requests for type tables.
           ---
@@ -2659,24 +2846,18 @@ class FunctionPermissions(Resource):
         if not utils.check_if_info_exists(models.GroupModel, data['group_id'])[0]:
             return {'error': 'Group not found'}, 401
 
-        if not utils.check_if_info_exists(models.FunctionTypeModel, data['function_id'])[0]:
+        if not utils.check_requirements(models.FunctionTypeModel, data['function_id'])[0]:
             return {'error': 'Function not found'}, 401
 
-        row = app.session.query(self.model_class).\
-            where(self.model_class.group_id == data['group_id'] and
-                  self.model_class.function_id == data['function_id']).first()
-        if row:
+        row = utils.insert_pair(app.session, self.model_class,
+                                group_id=data['group_id'], function_id=data['function_id'])
+        if not row:
             return dict(
                error=f'{self.__class__.__name__}: Combination already exists'
             ), 401
 
-        app.session.bulk_save_objects([self.model_class(data["group_id"], data['function_id'])])
         app.session.commit()
 
-        row = app.session.query(self.model_class).\
-            where(self.model_class.group_id == data['group_id'] and
-                  self.model_class.function_id == data['function_id']).first()
-
         return {'success': 'Registered successfully', 'id': row.id}
 
     def options(self):
@@ -2821,11 +3002,12 @@ class Database(Resource):
         row.database_type_id = data['database_type_id']
 
         app.session.bulk_save_objects([row])
+        changes.record_change(app.session, row, changes.UPDATED)
         app.session.commit()
 
         message = f"{self.__class__.__name__}:" + \
                   f" {row.id} saved successfully"
-        app.logger.debug(f"[{request.authorization.username}] " + message)
+        app.logger.debug(f"[{current_username()}] " + message)
 
         return dict(message=message, register=row.to_json())
 
@@ -2889,9 +3071,10 @@ class Database(Resource):
 class Databases(Resource):
     """Class to handle database requests"""
     model_class = models.DatabaseModel
-    methods = ['GET', 'POST', 'OPTIONS']
+    methods = ['GET', 'POST', 'PUT', 'OPTIONS']
 
     @auth.login_required
+    @cache.cached_response('database')
     def get(self):
         """Method to handle get requests
         ---
@@ -3026,166 +3209,2206 @@ class Databases(Resource):
         for item in self.model_class.get_fields():
             fields.append(data[item])
 
+        natural_key = self.model_class.get_natural_key()
+        row = app.session.query(self.model_class.id)\
+            .where(*[getattr(self.model_class, item) == data[item] for item in natural_key])\
+            .first()
+        if row:
+            return dict(
+               error=f'{self.__class__.__name__}: Database already exists, use the PUT to sync',
+               id=row.id
+            ), 401
+
         model = self.model_class(*fields)
-        app.session.bulk_save_objects([model])
+        app.session.add(model)
+        app.session.flush()
+        changes.record_change(app.session, model, changes.CREATED)
         app.session.commit()
 
-        print(model.to_json())
-
-        return {'success': 'Registered successfully'}
-
-    def options(self):
-        return dict(Allow=self.methods)
-
-
-class Servers(Resource):
-    # TODO: Implement this class 
-    model_class = models.ServerModel
-    methods = ['GET', 'POST', 'OPTIONS']
+        return {'success': 'Registered successfully', 'id': model.id}
 
     @auth.login_required
-    def get(self):
-        pass
+    def put(self):
+        """Method to sync a list of databases, identified by host, port and sid. The new
+        databases are inserted, the changed ones updated and the others are kept.
+        ---
+        tags:
+          - Databases
 
-    @auth.login_required
-    def post(self):
-        pass
+        security:
+          - basicAuth: []
 
-    def options(self):
-        pass
+        parameters:
+          - in: body
+            name: databases
+            description: List of the databases
+            schema:
+              $ref: '#/definitions/DatabasesSync'
 
+        definitions:
+          DatabasesSync:
+            type: object
+            properties:
+              database:
+                type: array
+                items:
+                  $ref: '#/definitions/DatabaseBody'
+          DatabasesSyncResult:
+            type: object
+            properties:
+              inserted:
+                type: integer
+                description: Number of databases inserted
+              updated:
+                type: integer
+                description: Number of databases updated
+              unchanged:
+                type: integer
+                description: Number of databases without changes
 
-class Server(Resource):
-    # TODO: Implement this class 
-    model_class = models.ServerModel
-    methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
+        responses:
+          '200':
+            description: The number of databases inserted, updated and unchanged
+            schema:
+              $ref: '#/definitions/DatabasesSyncResult'
+          '401':
+            description: Object with the status of the request
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        data = json.loads(request.get_data().decode('utf-8'))
+        records = data.get(self.model_class.__tablename__) if isinstance(data, dict) else None
 
-    @auth.login_required
-    def get(self, id):
-        pass
+        if not isinstance(records, list):
+            return {'error': 'Invalid body provided'}, 401
 
-    @auth.login_required
-    def put(self, id):
-        pass
+        class_fields = self.model_class.get_fields()
+        for record in records:
+            if not isinstance(record, dict) or not all(item in record for item in class_fields):
+                return {
+                    'error': 'Invalid body provided',
+                    'required_fields': class_fields
+                }, 401
 
-    @auth.login_required
-    def delete(self, id):
-        pass
+        type_ids = {str(record['database_type_id']) for record in records}
+        found = set(app.type_cache.get(app.session, models.DatabaseTypeModel))
+        if type_ids - found:
+            return {
+                'error': 'DatabaseTypeModel not found',
+                'database_type_id': sorted(type_ids - found)
+            }, 401
 
-    def options(self, id):
-        pass
+        result = utils.sync_by_natural_key(app.session, self.model_class, records)
+        app.logger.info(f"[{current_username()}] {self.__class__.__name__} synced: {result}")
 
+        return result
 
+    def options(self):
+        return dict(Allow=self.methods)
 
-class ServerPermissions(Resource):
-    # TODO: Implement this class 
-    model_class = models.ServerPermissionsModel
-    methods = ['GET', 'POST', 'OPTIONS']
 
-    @auth.login_required
-    def get(self):
-        pass
+class DatabaseDsn(Resource):
+    """Class to render the connection string of a database."""
+    model_class = models.DatabaseModel
+    methods = ['GET', 'OPTIONS']
 
     @auth.login_required
-    def post(self):
-        pass
-
-    def options(self):
-        pass
+    def get(self, id):
+        """Method to get the connection string of a Database.
+        ---
+        tags:
+          - Databases
 
+        security:
+          - basicAuth: []
 
-class ServerPermission(Resource):
-    # TODO: Implement this class 
-    model_class = models.ServerPermissionsModel
-    methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
+        parameters:
+          - in: path
+            name: id
+            description: Id of the Database
 
-    @auth.login_required
-    def get(self, id):
-        pass
+        definitions:
+          DatabaseDsn:
+            type: object
+            properties:
+              id:
+                type: integer
+                description: Id of the database
+              database_type_id:
+                type: integer
+                description: database type id
+              dsn:
+                type: string
+                description: connection string on the format of the database type
+                example: postgresql://db.example.com:5432/inventory
 
-    @auth.login_required
-    def put(self, id):
-        pass
+        responses:
+          '200':
+            description: The connection string of the database
+            schema:
+              $ref: '#/definitions/DatabaseDsn'
+          '401':
+            description: Error if the database does not exist
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        row = app.session.query(self.model_class).where(self.model_class.id == id).first()
+        if not row:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
 
-    @auth.login_required
-    def delete(self, id):
-        pass
+        return dict(id=row.id, database_type_id=row.database_type_id, dsn=dsn.get_dsn(row))
 
     def options(self, id):
-        pass
+        """Method to get the methods allowd for this enpoint."""
+        return dict(Allow=self.methods)
 
 
-class Logins(Resource):
-    # TODO: Implement this class 
-    model_class = models.LoginModel
-    methods = ['GET', 'POST', 'OPTIONS']
+class DatabasesDsn(Resource):
+    """Class to render the connection strings of many databases in a single request."""
+    model_class = models.DatabaseModel
+    methods = ['GET', 'OPTIONS']
 
     @auth.login_required
     def get(self):
-        pass
-
-    @auth.login_required
-    def post(self):
-        pass
+        """Method to get the connection strings of the databases, all of them or the ones
+        informed on the ids parameter.
+        ---
+        tags:
+          - Databases
 
-    def options(self):
-        pass
+        security:
+          - basicAuth: []
 
+        parameters:
+          - in: query
+            name: ids
+            type: string
+            description: Ids of the databases separated by comma, all if not informed
+            example: 1,2,3
 
-class Login(Resource):
-    # TODO: Implement this class 
-    model_class = models.LoginModel
-    methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
+        definitions:
+          DatabasesDsn:
+            type: object
+            properties:
+              database:
+                type: array
+                items:
+                  $ref: '#/definitions/DatabaseDsn'
 
-    @auth.login_required
-    def get(self, id):
-        pass
+        responses:
+          '200':
+            description: The connection strings of the databases
+            schema:
+              $ref: '#/definitions/DatabasesDsn'
+          '401':
+            description: Error if the ids are not valid
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        query = app.session.query(
+            self.model_class.id,
+            self.model_class.database_type_id,
+            self.model_class.host,
+            self.model_class.port,
+            self.model_class.sid)
+
+        if request.args.get('ids'):
+            try:
+                ids = {int(item) for item in request.args['ids'].split(',') if item}
+            except ValueError:
+                return {'error': 'Invalid ids provided'}, 401
+            query = query.where(self.model_class.id.in_(ids))
+
+        rows = query.order_by(self.model_class.id).all()
+        app.logger.debug(
+            f"[{current_username()}] Returning {len(rows)} {self.__class__.__name__} rows")
+
+        return {self.model_class.__tablename__: [
+            dict(id=row.id, database_type_id=row.database_type_id, dsn=dsn.get_dsn(row))
+            for row in rows]}
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class Servers(Resource):
+    """Class to handle server requests, only the servers granted to the groups of the
+    user are returned."""
+    model_class = models.ServerModel
+    methods = ['GET', 'POST', 'OPTIONS']
 
     @auth.login_required
-    def put(self, id):
-        pass
+    @cache.cached_response('server', 'server_permissions')
+    def get(self):
+        """Method to handle get requests
+        ---
+        tags:
+          - Servers
+
+        security:
+          - basicAuth: []
+
+        definitions:
+          Server:
+            type: object
+            properties:
+              id:
+                type: integer
+                description: Id of the server
+              description:
+                type: string
+                description: Server description
+              host:
+                type: string
+                description: Hostname or ip address of the server
+              port:
+                type: integer
+                description: port used by the connection
+              server_type_id:
+                type: string
+                description: server type id
+              connection_type:
+                type: integer
+                description: connection type id
+          Servers:
+            type: object
+            properties:
+              server:
+                type: array
+                items:
+                  $ref: '#/definitions/Server'
+        responses:
+          '200':
+            type: object
+            description: A list of the Servers visible by the groups of the user
+            schema:
+              $ref: '#/definitions/Servers'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        query = utils.filter_visible_servers(app.session.query(self.model_class))
+        return utils.basic_get(app.session, self.model_class, self.__class__.__name__, query)
 
     @auth.login_required
-    def delete(self, id):
-        pass
+    def post(self):
+        """Method to handle post requests
+        ---
+        tags:
+          - Servers
 
-    def options(self, id):
-        pass
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: body
+            name: server
+            description: Description of the server
+            schema:
+              $ref: '#/definitions/ServerBody'
 
+        definitions:
+          ServerBody:
+            type: object
+            properties:
+              description:
+                type: string
+                description: Server description
+              host:
+                type: string
+                description: Hostname or ip address of the server
+              port:
+                type: integer
+                description: port used by the connection
+              server_type_id:
+                type: string
+                description: server type id
+              connection_type:
+                type: integer
+                description: connection type id
+          BasicPost:
+            type: object
+            properties:
+              status:
+                type: string
+                description: Message of the status
+                example: Registered successfully
+              id:
+                type: integer
+                description: Server id
+          Error:
+            type: object
+            properties:
+              error:
+                type: string
+                description: Error message
+                example: Invalid body provided
 
-class ConnectionLogins(Resource):
-    # TODO: Implement this class 
-    model_class = models.ConnectionLoginModel
-    methods = ['GET', 'POST', 'OPTIONS']
+        responses:
+          '200':
+            description: Object with the status of the request, and id of the new server
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Object with the status of the request
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        class_fields = self.model_class.get_fields()
+        for item in class_fields:
+            if item not in data:
+                return {
+                    'error': 'Invalid body provided',
+                    'required_fields': class_fields
+                }, 401
+
+        for requirement in self.model_class.get_requirements():
+            requirement_result = utils.check_requirements(requirement[0], data[requirement[1]])
+            if not requirement_result[0]:
+                return {'error': requirement_result[1]}, 401
+
+        valid, message = utils.host_check(data['host'])
+        if not valid:
+            return {'error': message}, 401
+
+        model = self.model_class(*[data[item] for item in class_fields])
+        app.session.add(model)
+        app.session.flush()
+        changes.record_change(app.session, model, changes.CREATED)
+        app.session.commit()
+
+        return {'success': 'Registered successfully', 'id': model.id}
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class ServersExport(Resource):
+    """Class to export the servers visible by the user as ssh_config or inventory."""
+    model_class = models.ServerModel
+    methods = ['GET', 'OPTIONS']
 
     @auth.login_required
     def get(self):
-        pass
+        """Method to export the servers, the file is streamed while the servers are read.
+        ---
+        tags:
+          - Servers
 
-    @auth.login_required
-    def post(self):
-        pass
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: query
+            name: format
+            type: string
+            enum: [ssh_config, ini, yaml]
+            default: ssh_config
+            description: Format of the export, the ini and yaml are ansible inventories
+
+        produces:
+          - text/plain
+
+        responses:
+          '200':
+            description: The exported file
+            schema:
+              type: string
+          '401':
+            description: Error if the format is not valid
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        export_format = request.args.get('format', 'ssh_config')
+        if export_format not in inventory.EXPORT_FORMATS:
+            return {
+                'error': 'Invalid format provided',
+                'formats': inventory.EXPORT_FORMATS
+            }, 401
+
+        group_ids = None if utils.is_admin() else utils.get_caller_group_ids()
+        query = inventory.export_query(app.session, grouped=export_format != 'ssh_config',
+                                       group_ids=group_ids)
+        rows = inventory.stream_rows(utils.filter_visible_servers(query))
+
+        app.logger.debug(
+            f"[{current_username()}] Exporting {self.__class__.__name__} as {export_format}")
+
+        return Response(stream_with_context(inventory.RENDERERS[export_format](rows)),
+                        mimetype='text/plain')
 
     def options(self):
-        pass
+        return dict(Allow=self.methods)
 
 
-class ConnectionLogin(Resource):
-    # TODO: Implement this class 
-    model_class = models.ConnectionLoginModel
+class Server(Resource):
+    """Class to handle single server requests, the servers not granted to the groups of
+    the user are handled as not found."""
+    model_class = models.ServerModel
     methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
 
     @auth.login_required
     def get(self, id):
-        pass
+        """Method to get single Server.
+        ---
+        tags:
+          - Servers
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the Server
+
+        responses:
+          '200':
+            description: returns the server
+            schema:
+              $ref: '#/definitions/Server'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        query = utils.filter_visible_servers(app.session.query(self.model_class))
+        return utils.basic_single_get(
+            id,
+            app,
+            self.model_class,
+            request,
+            self.__class__.__name__,
+            query
+        )
 
     @auth.login_required
     def put(self, id):
-        pass
+        """Method to change single Server.
+        ---
+        tags:
+          - Servers
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the Server
+          - in: body
+            name: server
+            description: New values of the server.
+            schema:
+              $ref: '#/definitions/ServerBody'
+
+        responses:
+          '200':
+            description: Status of the update
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Error message
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        row = utils.filter_visible_servers(app.session.query(self.model_class))\
+            .where(self.model_class.id == id).first()
+        if not row:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        for item in row.get_fields():
+            if item not in data:
+                return {
+                    'error': 'Invalid body provided',
+                    'required_fields': row.get_fields()
+                }, 401
+
+        for requirement in row.get_requirements():
+            requirement_result = utils.check_requirements(requirement[0], data[requirement[1]])
+            if not requirement_result[0]:
+                return {'error': requirement_result[1]}, 401
+
+        valid, message = utils.host_check(data['host'])
+        if not valid:
+            return {'error': message}, 401
+
+        row.description = data['description']
+        row.host = data['host']
+        row.port = data['port']
+        row.server_type_id = data['server_type_id']
+        row.connection_type = data['connection_type']
+
+        changes.record_change(app.session, row, changes.UPDATED)
+        app.session.commit()
+
+        message = f"{self.__class__.__name__}:" + \
+                  f" {row.id} saved successfully"
+        app.logger.debug(f"[{current_username()}] " + message)
+
+        return dict(message=message, register=row.to_json())
 
     @auth.login_required
     def delete(self, id):
-        pass
+        """Method to handle the delete of a Server, its permissions and the links of its
+        logins are deleted too.
+        ---
+        tags:
+          - Servers
 
-    def options(self, id):
-        pass
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the Server.
+
+        responses:
+          '200':
+            description: A objects with a success message
+            schema:
+              $ref: '#/definitions/BasicDelete'
+          '401':
+            description: A object with the error message and the id requested
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        row = utils.filter_visible_servers(app.session.query(self.model_class))\
+            .where(self.model_class.id == id).first()
+        if not row:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        permissions = app.session.query(models.ServerPermissionsModel.id)\
+            .where(models.ServerPermissionsModel.server_id == row.id)
+        changes.record_changes(app.session, models.ServerPermissionsModel.__tablename__,
+                               [permission.id for permission in permissions], changes.DELETED)
+        app.session.query(models.ServerPermissionsModel)\
+            .where(models.ServerPermissionsModel.server_id == row.id)\
+            .delete(synchronize_session=False)
+
+        connections = app.session.query(models.ConnectionLoginModel.id)\
+            .where(models.ConnectionLoginModel.connection_id == row.id)
+        changes.record_changes(app.session, models.ConnectionLoginModel.__tablename__,
+                               [connection.id for connection in connections], changes.DELETED)
+        app.session.query(models.ConnectionLoginModel)\
+            .where(models.ConnectionLoginModel.connection_id == row.id)\
+            .delete(synchronize_session=False)
+        app.session.delete(row)
+        changes.record_change(app.session, row, changes.DELETED)
+        app.session.commit()
+
+        return dict(success=f'{id} deleted'), 200
+
+    def options(self, id):
+        """Method to get the methods allowd for this enpoint."""
+        return dict(Allow=self.methods)
+
+
+class ServerPermissions(Resource):
+    """Class to handle the server / group permissions."""
+    model_class = models.ServerPermissionsModel
+    methods = ['GET', 'POST', 'OPTIONS']
+
+    @auth.login_required
+    def get(self):
+        """Method to handle get requests, only the permissions of the groups of the user
+        are returned.
+        ---
+        tags:
+          - ServerPermissions
+
+        security:
+          - basicAuth: []
+
+        definitions:
+          ServerPermission:
+            type: object
+            properties:
+              id:
+                type: integer
+                description: Id of the server permission
+              group:
+                type: object
+                description: Group object
+                schema:
+                  $ref: '#/definitions/GroupType'
+              server:
+                type: object
+                description: Server object
+                schema:
+                  $ref: '#/definitions/Server'
+          ServerPermissions:
+            type: object
+            properties:
+              server_permissions:
+                type: array
+                items:
+                  $ref: '#/definitions/ServerPermission'
+
+        responses:
+          '200':
+            description: A list of Server permissions
+            schema:
+              $ref: '#/definitions/ServerPermissions'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        query = utils.filter_visible_server_permissions(app.session.query(self.model_class))
+        return utils.basic_get(app.session, self.model_class, self.__class__.__name__, query)
+
+    @auth.login_required
+    def post(self):
+        """Method to grant a server to a group.
+        ---
+        tags:
+          - ServerPermissions
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: body
+            name: server_permission
+            description: link of the server and group
+            schema:
+              $ref: '#/definitions/ServerPermissionBody'
+
+        definitions:
+          ServerPermissionBody:
+            type: object
+            properties:
+              group_id:
+                type: integer
+                description: The id of the Group
+              server_id:
+                type: integer
+                description: The id of the server
+
+        responses:
+          '200':
+            description: Object with the status of the request, and id of the new permission
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Object with the status of the request
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can change the server permissions'}, 401
+
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        for item in ['group_id', 'server_id']:
+            if item not in data:
+                return {'error': 'Invalid body provided'}, 401
+
+        if not utils.check_if_info_exists(models.GroupModel, data['group_id'])[0]:
+            return {'error': 'Group not found'}, 401
+
+        if not utils.check_if_info_exists(models.ServerModel, data['server_id'])[0]:
+            return {'error': 'Server not found'}, 401
+
+        row = utils.insert_pair(app.session, self.model_class,
+                                group_id=data['group_id'], server_id=data['server_id'])
+        if not row:
+            return dict(
+               error=f'{self.__class__.__name__}: Combination already exists'
+            ), 401
+
+        app.session.commit()
+
+        return {'success': 'Registered successfully', 'id': row.id}
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class ServerPermission(Resource):
+    """Class to handle a single server / group permission."""
+    model_class = models.ServerPermissionsModel
+    methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
+
+    @auth.login_required
+    def get(self, id):
+        """Method to get single server permission.
+        ---
+        tags:
+          - ServerPermissions
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the server permission
+
+        responses:
+          '200':
+            description: returns a server / group combination
+            schema:
+              $ref: '#/definitions/ServerPermission'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        query = utils.filter_visible_server_permissions(app.session.query(self.model_class))
+        return utils.basic_single_get(
+            id,
+            app,
+            self.model_class,
+            request,
+            self.__class__.__name__,
+            query
+        )
+
+    @auth.login_required
+    def put(self, id):
+        """Method to change single server permission.
+        ---
+        tags:
+          - ServerPermissions
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the server permission
+          - in: body
+            name: server_permission
+            description: Server / group combination.
+            schema:
+              $ref: '#/definitions/ServerPermissionBody'
+
+        responses:
+          '200':
+            description: Status of the update
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Error message
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can change the server permissions'}, 401
+
+        verifier, row = utils.check_if_info_exists(self.model_class, id)
+        if not verifier:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        if not all(item in data for item in ['group_id', 'server_id']):
+            return {'error': 'Invalid body provided'}, 401
+
+        if not utils.check_if_info_exists(models.GroupModel, data['group_id'])[0]:
+            return {'error': 'Group not found'}, 401
+
+        if not utils.check_if_info_exists(models.ServerModel, data['server_id'])[0]:
+            return {'error': 'Server not found'}, 401
+
+        if utils.pair_exists(app.session, self.model_class, row.id,
+                             group_id=data['group_id'], server_id=data['server_id']):
+            return dict(
+               error=f'{self.__class__.__name__}: Combination already exists'
+            ), 401
+
+        row.group_id = data['group_id']
+        row.server_id = data['server_id']
+        changes.record_change(app.session, row, changes.UPDATED)
+        app.session.commit()
+
+        message = f"{self.__class__.__name__}:" + \
+                  f" {row.id} saved successfully"
+        app.logger.debug(f"[{current_username()}] " + message)
+
+        return dict(message=message, register=row.to_json(app.session))
+
+    @auth.login_required
+    def delete(self, id):
+        """Method to handle the delete of a server permission
+        ---
+        tags:
+          - ServerPermissions
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the server permission.
+
+        responses:
+          '200':
+            description: A objects with a success message
+            schema:
+              $ref: '#/definitions/BasicDelete'
+          '401':
+            description: A object with the error message and the id requested
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can change the server permissions'}, 401
+
+        return utils.basic_single_delete(
+            id,
+            app,
+            self.model_class,
+            self.__class__.__name__
+        )
+
+    def options(self, id):
+        """Method to get the methods allowd for this enpoint."""
+        return dict(Allow=self.methods)
+
+
+class Logins(Resource):
+    """Class to handle login requests, the passwords are never returned by this
+    endpoint, use the connection credentials instead."""
+    model_class = models.LoginModel
+    methods = ['GET', 'POST', 'OPTIONS']
+
+    @auth.login_required
+    def get(self):
+        """Method to handle get requests
+        ---
+        tags:
+          - Logins
+
+        security:
+          - basicAuth: []
+
+        definitions:
+          Login:
+            type: object
+            properties:
+              id:
+                type: integer
+                description: Id of the login
+              user:
+                type: string
+                description: User of the login
+              connection_type:
+                type: integer
+                description: connection type id
+          Logins:
+            type: object
+            properties:
+              login:
+                type: array
+                items:
+                  $ref: '#/definitions/Login'
+        responses:
+          '200':
+            type: object
+            description: A list of Logins
+            schema:
+              $ref: '#/definitions/Logins'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        return utils.basic_get(app.session, self.model_class, self.__class__.__name__)
+
+    @auth.login_required
+    def post(self):
+        """Method to handle post requests, the password is stored encripted.
+        ---
+        tags:
+          - Logins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: body
+            name: login
+            description: User and password of the login
+            schema:
+              $ref: '#/definitions/LoginBody'
+
+        definitions:
+          LoginBody:
+            type: object
+            properties:
+              user:
+                type: string
+                description: User of the login
+              password:
+                type: string
+                description: Password of the login
+              connection_type:
+                type: integer
+                description: connection type id
+
+        responses:
+          '200':
+            description: Object with the status of the request, and id of the new login
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Object with the status of the request
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        class_fields = self.model_class.get_fields()
+        for item in class_fields:
+            if item not in data:
+                return {
+                    'error': 'Invalid body provided',
+                    'required_fields': class_fields
+                }, 401
+
+        for requirement in self.model_class.get_requirements():
+            requirement_result = utils.check_requirements(requirement[0], data[requirement[1]])
+            if not requirement_result[0]:
+                return {'error': requirement_result[1]}, 401
+
+        model = self.model_class(*[data[item] for item in class_fields])
+        app.session.add(model)
+        app.session.flush()
+        changes.record_change(app.session, model, changes.CREATED)
+        app.session.commit()
+
+        return {'success': 'Registered successfully', 'id': model.id}
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class Login(Resource):
+    """Class to handle single login requests."""
+    model_class = models.LoginModel
+    methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
+
+    @auth.login_required
+    def get(self, id):
+        """Method to get single Login, without the password.
+        ---
+        tags:
+          - Logins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the Login
+
+        responses:
+          '200':
+            description: returns the login
+            schema:
+              $ref: '#/definitions/Login'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        return utils.basic_single_get(
+            id,
+            app,
+            self.model_class,
+            request,
+            self.__class__.__name__
+        )
+
+    @auth.login_required
+    def put(self, id):
+        """Method to change single Login.
+        ---
+        tags:
+          - Logins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the Login
+          - in: body
+            name: login
+            description: New values of the login.
+            schema:
+              $ref: '#/definitions/LoginBody'
+
+        responses:
+          '200':
+            description: Status of the update
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Error message
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        verifier, row = utils.check_if_info_exists(self.model_class, id)
+        if not verifier:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        for item in row.get_fields():
+            if item not in data:
+                return {
+                    'error': 'Invalid body provided',
+                    'required_fields': row.get_fields()
+                }, 401
+
+        for requirement in row.get_requirements():
+            requirement_result = utils.check_requirements(requirement[0], data[requirement[1]])
+            if not requirement_result[0]:
+                return {'error': requirement_result[1]}, 401
+
+        row.user = data['user']
+        row.password = models.encript_password(data['password'])
+        row.connection_type = data['connection_type']
+
+        changes.record_change(app.session, row, changes.UPDATED)
+        app.session.commit()
+
+        message = f"{self.__class__.__name__}:" + \
+                  f" {row.id} saved successfully"
+        app.logger.debug(f"[{current_username()}] " + message)
+
+        return dict(message=message, register=row.to_json())
+
+    @auth.login_required
+    def delete(self, id):
+        """Method to handle the delete of a Login, its connections are deleted too.
+        ---
+        tags:
+          - Logins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the Login.
+
+        responses:
+          '200':
+            description: A objects with a success message
+            schema:
+              $ref: '#/definitions/BasicDelete'
+          '401':
+            description: A object with the error message and the id requested
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        verifier, row = utils.check_if_info_exists(self.model_class, id)
+        if not verifier:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        connections = app.session.query(models.ConnectionLoginModel.id)\
+            .where(models.ConnectionLoginModel.login_id == row.id)
+        changes.record_changes(app.session, models.ConnectionLoginModel.__tablename__,
+                               [connection.id for connection in connections], changes.DELETED)
+        app.session.query(models.ConnectionLoginModel)\
+            .where(models.ConnectionLoginModel.login_id == row.id)\
+            .delete(synchronize_session=False)
+        app.session.delete(row)
+        changes.record_change(app.session, row, changes.DELETED)
+        app.session.commit()
+
+        return dict(success=f'{id} deleted'), 200
+
+    def options(self, id):
+        """Method to get the methods allowd for this enpoint."""
+        return dict(Allow=self.methods)
+
+
+class ConnectionLogins(Resource):
+    """Class to handle the links of the logins and the servers, only the links of the
+    servers visible by the groups of the user are returned."""
+    model_class = models.ConnectionLoginModel
+    methods = ['GET', 'POST', 'OPTIONS']
+
+    @auth.login_required
+    def get(self):
+        """Method to handle get requests
+        ---
+        tags:
+          - ConnectionLogins
+
+        security:
+          - basicAuth: []
+
+        definitions:
+          ConnectionLogin:
+            type: object
+            properties:
+              id:
+                type: integer
+                description: Id of the connection login
+              login:
+                type: object
+                description: Login object
+                schema:
+                  $ref: '#/definitions/Login'
+              connection:
+                type: object
+                description: Server object
+                schema:
+                  $ref: '#/definitions/Server'
+          ConnectionLogins:
+            type: object
+            properties:
+              connection_login:
+                type: array
+                items:
+                  $ref: '#/definitions/ConnectionLogin'
+        responses:
+          '200':
+            type: object
+            description: A list of the connection logins
+            schema:
+              $ref: '#/definitions/ConnectionLogins'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        # the logins and servers are loaded on the same query, instead of one query by row
+        query = app.session.query(self.model_class, models.LoginModel, models.ServerModel)\
+            .join(models.LoginModel, models.LoginModel.id == self.model_class.login_id)\
+            .join(models.ServerModel, models.ServerModel.id == self.model_class.connection_id)
+        rows = utils.filter_visible_connection_logins(query).all()
+
+        app.logger.debug(
+            f"[{current_username()}] Returning all {self.__class__.__name__} rows")
+
+        return {self.model_class.__tablename__: [
+            dict(id=row.id, login=login.to_json(), connection=server.to_json())
+            for row, login, server in rows]}
+
+    @auth.login_required
+    def post(self):
+        """Method to link a login to a server.
+        ---
+        tags:
+          - ConnectionLogins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: body
+            name: connection_login
+            description: link of the login and server
+            schema:
+              $ref: '#/definitions/ConnectionLoginBody'
+
+        definitions:
+          ConnectionLoginBody:
+            type: object
+            properties:
+              login_id:
+                type: integer
+                description: The id of the login
+              connection_id:
+                type: integer
+                description: The id of the server
+
+        responses:
+          '200':
+            description: Object with the status of the request, and id of the new link
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Object with the status of the request
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        class_fields = self.model_class.get_fields()
+        for item in class_fields:
+            if item not in data:
+                return {
+                    'error': 'Invalid body provided',
+                    'required_fields': class_fields
+                }, 401
+
+        if not utils.check_if_info_exists(models.LoginModel, data['login_id'])[0]:
+            return {'error': 'Login not found'}, 401
+
+        server = utils.filter_visible_servers(app.session.query(models.ServerModel))\
+            .where(models.ServerModel.id == data['connection_id']).first()
+        if not server:
+            return {'error': 'Server not found'}, 401
+
+        row = app.session.query(self.model_class)\
+            .where(self.model_class.login_id == data['login_id'],
+                   self.model_class.connection_id == data['connection_id']).first()
+        if row:
+            return dict(
+               error=f'{self.__class__.__name__}: Combination already exists'
+            ), 401
+
+        row = self.model_class(data['login_id'], data['connection_id'])
+        app.session.add(row)
+        app.session.flush()
+        changes.record_change(app.session, row, changes.CREATED)
+        app.session.commit()
+
+        return {'success': 'Registered successfully', 'id': row.id}
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class ConnectionLogin(Resource):
+    """Class to handle a single link of a login and a server."""
+    model_class = models.ConnectionLoginModel
+    methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
+
+    @auth.login_required
+    def get(self, id):
+        """Method to get single connection login.
+        ---
+        tags:
+          - ConnectionLogins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the connection login
+
+        responses:
+          '200':
+            description: returns a login / server combination
+            schema:
+              $ref: '#/definitions/ConnectionLogin'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        query = utils.filter_visible_connection_logins(app.session.query(self.model_class))
+        return utils.basic_single_get(
+            id,
+            app,
+            self.model_class,
+            request,
+            self.__class__.__name__,
+            query
+        )
+
+    @auth.login_required
+    def put(self, id):
+        """Method to change single connection login.
+        ---
+        tags:
+          - ConnectionLogins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the connection login
+          - in: body
+            name: connection_login
+            description: Login / server combination.
+            schema:
+              $ref: '#/definitions/ConnectionLoginBody'
+
+        responses:
+          '200':
+            description: Status of the update
+            schema:
+              $ref: '#/definitions/BasicPost'
+          '401':
+            description: Error message
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        row = utils.filter_visible_connection_logins(app.session.query(self.model_class))\
+            .where(self.model_class.id == id).first()
+        if not row:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        data = json.loads(request.get_data().decode('utf-8'))
+
+        if not all(item in data for item in row.get_fields()):
+            return {
+                'error': 'Invalid body provided',
+                'required_fields': row.get_fields()
+            }, 401
+
+        if not utils.check_if_info_exists(models.LoginModel, data['login_id'])[0]:
+            return {'error': 'Login not found'}, 401
+
+        server = utils.filter_visible_servers(app.session.query(models.ServerModel))\
+            .where(models.ServerModel.id == data['connection_id']).first()
+        if not server:
+            return {'error': 'Server not found'}, 401
+
+        row.login_id = data['login_id']
+        row.connection_id = data['connection_id']
+        changes.record_change(app.session, row, changes.UPDATED)
+        app.session.commit()
+
+        message = f"{self.__class__.__name__}:" + \
+                  f" {row.id} saved successfully"
+        app.logger.debug(f"[{current_username()}] " + message)
+
+        return dict(message=message, register=row.to_json(app.session))
+
+    @auth.login_required
+    def delete(self, id):
+        """Method to handle the delete of a connection login
+        ---
+        tags:
+          - ConnectionLogins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the connection login.
+
+        responses:
+          '200':
+            description: A objects with a success message
+            schema:
+              $ref: '#/definitions/BasicDelete'
+          '401':
+            description: A object with the error message and the id requested
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        row = utils.filter_visible_connection_logins(app.session.query(self.model_class))\
+            .where(self.model_class.id == id).first()
+        if not row:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        app.session.delete(row)
+        changes.record_change(app.session, row, changes.DELETED)
+        app.session.commit()
+
+        return dict(success=f'{id} deleted'), 200
+
+    def options(self, id):
+        """Method to get the methods allowd for this enpoint."""
+        return dict(Allow=self.methods)
+
+
+class ConnectionCredentials(Resource):
+    """Class to resolve the credentials of a connection, used by the automations to
+    connect to the servers."""
+    model_class = models.ConnectionLoginModel
+    methods = ['GET', 'OPTIONS']
+
+    @auth.login_required
+    def get(self, id):
+        """Method to get the host, port and login of a connection login.
+        ---
+        tags:
+          - ConnectionLogins
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: path
+            name: id
+            description: Id of the connection login
+
+        definitions:
+          ConnectionCredentials:
+            type: object
+            properties:
+              id:
+                type: integer
+                description: Id of the connection login
+              host:
+                type: string
+                description: Hostname or ip address of the server
+              port:
+                type: integer
+                description: port used by the connection
+              connection_type:
+                type: integer
+                description: connection type id
+              user:
+                type: string
+                description: User of the login
+              password:
+                type: string
+                description: Password of the login
+
+        responses:
+          '200':
+            description: The credentials of the connection
+            schema:
+              $ref: '#/definitions/ConnectionCredentials'
+          '401':
+            description: Error if the connection does not exist or is not visible
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        # resolved in a single query, this is called for every connection of a deploy
+        query = app.session.query(
+                self.model_class.id,
+                models.ServerModel.host,
+                models.ServerModel.port,
+                models.ServerModel.connection_type,
+                models.LoginModel.user,
+                models.LoginModel.password)\
+            .join(models.LoginModel, models.LoginModel.id == self.model_class.login_id)\
+            .join(models.ServerModel, models.ServerModel.id == self.model_class.connection_id)\
+            .where(self.model_class.id == id)
+        row = utils.filter_visible_connection_logins(query).first()
+
+        if not row:
+            return dict(
+                error=f'{self.__class__.__name__} id not exists',
+                id=id), 401
+
+        app.logger.info(f'[{current_username()}] Returning the credentials of connection {id}')
+
+        return dict(
+            id=row.id,
+            host=row.host,
+            port=row.port,
+            connection_type=row.connection_type,
+            user=row.user,
+            password=models.decript_password(row.password)
+        )
+
+    def options(self, id):
+        """Method to get the methods allowd for this enpoint."""
+        return dict(Allow=self.methods)
+
+
+class Tokens(Resource):
+    """Class to handle the issue of authentication tokens."""
+    methods = ['POST', 'OPTIONS']
+
+    @basic_auth.login_required
+    def post(self):
+        """Method to issue a token for the user authenticated with user and password.
+        ---
+        tags:
+          - Authentication
+
+        security:
+          - basicAuth: []
+
+        definitions:
+          Token:
+            type: object
+            properties:
+              token:
+                type: string
+                description: Signed token to be sent on the header Authorization as Bearer
+              token_type:
+                type: string
+                description: Type of the token
+                example: Bearer
+              expires_in:
+                type: integer
+                description: Seconds until the token expires
+                example: 900
+        responses:
+          '200':
+            description: The new token
+            schema:
+              $ref: '#/definitions/Token'
+          '401':
+            description: Error if user is not authorized
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        app.logger.debug(f'[{current_username()}] Token issued')
+        return app.tokens.issue(current_username())
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class TokenRefresh(Resource):
+    """Class to handle the refresh of authentication tokens."""
+    methods = ['POST', 'OPTIONS']
+
+    @token_auth.login_required
+    def post(self):
+        """Method to issue a new token using a token that did not expire yet.
+        ---
+        tags:
+          - Authentication
+
+        security:
+          - bearerAuth: []
+
+        responses:
+          '200':
+            description: The new token
+            schema:
+              $ref: '#/definitions/Token'
+          '401':
+            description: Error if the token is not valid
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        # the token used on the refresh is replaced by the new one
+        app.tokens.revoke(app.session, g.token_payload)
+        app.logger.debug(f'[{current_username()}] Token refreshed')
+        return app.tokens.issue(current_username())
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class TokenRevoke(Resource):
+    """Class to handle the revocation of authentication tokens."""
+    methods = ['POST', 'OPTIONS']
+
+    @token_auth.login_required
+    def post(self):
+        """Method to revoke the token used on the request.
+        ---
+        tags:
+          - Authentication
+
+        security:
+          - bearerAuth: []
+
+        responses:
+          '200':
+            description: A objects with a success message
+            schema:
+              $ref: '#/definitions/BasicDelete'
+          '401':
+            description: Error if the token is not valid
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        app.tokens.revoke(app.session, g.token_payload)
+        app.logger.debug(f'[{current_username()}] Token revoked')
+
+        return dict(success='Token revoked'), 200
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class RateLimitMetrics(Resource):
+    """Class to handle the metrics of the rate limit."""
+    methods = ['GET']
+
+    @auth.login_required
+    def get(self):
+        """Method to get the number of requests throttled by the rate limit.
+        ---
+        tags:
+          - Metrics
+
+        security:
+          - basicAuth: []
+
+        definitions:
+          RateLimitBucket:
+            type: object
+            properties:
+              key:
+                type: string
+                description: Kind and identifier of the bucket
+                example: ip:127.0.0.1
+              throttled:
+                type: integer
+                description: Number of throttled requests
+          RateLimitMetrics:
+            type: object
+            properties:
+              throttled:
+                type: integer
+                description: Total of throttled requests
+              buckets:
+                type: array
+                items:
+                  $ref: '#/definitions/RateLimitBucket'
+        responses:
+          '200':
+            description: The metrics of the rate limit
+            schema:
+              $ref: '#/definitions/RateLimitMetrics'
+          '401':
+            description: Error if user is not authorized or not on the admin group
+            schema:
+              type: string
+              example: Unauthorized Access
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can read the metrics'}, 401
+
+        return app.rate_limiter.metrics()
+
+
+class Changes(Resource):
+    """Class to handle the feed of the changes, only the admin group can read it since it
+    has the ids of all the rows changed."""
+    methods = ['GET', 'OPTIONS']
+
+    @auth.login_required
+    def get(self):
+        """Method to get the changes after a sequence, waiting for them if asked.
+        ---
+        tags:
+          - Changes
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: query
+            name: since
+            type: integer
+            description: Last sequence seen by the client, 0 to get all the changes
+          - in: query
+            name: limit
+            type: integer
+            description: Maximum number of changes returned, up to 1000
+          - in: query
+            name: wait
+            type: number
+            description: Seconds to wait for new changes when there are none, up to 20
+
+        definitions:
+          Change:
+            type: object
+            properties:
+              seq:
+                type: integer
+                description: Sequence of the change
+              entity:
+                type: string
+                description: Table changed
+                example: database
+              entity_id:
+                type: integer
+                description: Id of the row changed
+              operation:
+                type: string
+                enum: [create, update, delete]
+              change_date:
+                type: string
+                description: Date of the change
+          Changes:
+            type: object
+            properties:
+              changes:
+                type: array
+                items:
+                  $ref: '#/definitions/Change'
+              last_seq:
+                type: integer
+                description: Sequence to be informed as since on the next request
+
+        responses:
+          '200':
+            description: The changes after the sequence
+            schema:
+              $ref: '#/definitions/Changes'
+          '401':
+            description: Error if the parameters are not valid or the user is not on the
+              admin group
+            schema:
+              $ref: '#/definitions/Error'
+          '429':
+            description: Error if too many clients are waiting for changes
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can read the changes'}, 401
+
+        since = changes.parse_sequence(request.args.get('since'))
+        limit = changes.parse_sequence(request.args.get('limit'), changes.CHANGES_LIMIT)
+        wait = changes.parse_wait(request.args.get('wait'))
+
+        if since is None or not limit or wait is None:
+            return {'error': 'Invalid since, limit or wait provided'}, 401
+
+        limit = min(limit, changes.CHANGES_LIMIT)
+        rows = changes.get_changes(app.session, since, limit)
+        if not rows and wait:
+            slot = app.change_waiters.acquire()
+            if slot is None:
+                return changes.waiters_exceeded()
+
+            try:
+                rows = changes.wait_for_changes(app.session, since, wait, limit)
+            finally:
+                changes.WaiterSlots.release(slot)
+
+        return dict(changes=[row.to_json() for row in rows],
+                    last_seq=rows[-1].id if rows else since)
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class ChangesStream(Resource):
+    """Class to handle the feed of the changes as Server-Sent Events."""
+    methods = ['GET', 'OPTIONS']
+
+    @auth.login_required
+    def get(self):
+        """Method to stream the changes after a sequence, the stream is closed after a few
+        seconds and the client reconnects with the Last-Event-ID header.
+        ---
+        tags:
+          - Changes
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: query
+            name: since
+            type: integer
+            description: Last sequence seen by the client, the Last-Event-ID has priority
+
+        produces:
+          - text/event-stream
+
+        responses:
+          '200':
+            description: Stream of change events, with the sequence as id
+            schema:
+              type: string
+          '401':
+            description: Error if the sequence is not valid or the user is not on the admin
+              group
+            schema:
+              $ref: '#/definitions/Error'
+          '429':
+            description: Error if too many clients are waiting for changes
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can read the changes'}, 401
+
+        since = changes.parse_sequence(
+            request.headers.get('Last-Event-ID', request.args.get('since')))
+        if since is None:
+            return {'error': 'Invalid since provided'}, 401
+
+        slot = app.change_waiters.acquire()
+        if slot is None:
+            return changes.waiters_exceeded()
+
+        stream = changes.stream_changes(app.session, since, slot=slot)
+        return Response(stream_with_context(stream), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class AuditLog(Resource):
+    """Class to query the audit trail of the changes, only the admin group can read it."""
+    model_class = models.AuditLogModel
+    methods = ['GET', 'OPTIONS']
+
+    @auth.login_required
+    def get(self):
+        """Method to query the audit entries, from the newest to the oldest.
+        ---
+        tags:
+          - Audit
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: query
+            name: user
+            type: string
+            description: Name of the user that made the changes
+          - in: query
+            name: entity
+            type: string
+            description: Table changed
+            example: database
+          - in: query
+            name: entity_id
+            type: integer
+            description: Id of the row changed, used with the entity
+          - in: query
+            name: start
+            type: string
+            description: Changes made from this date, on the iso format
+            example: '2022-08-21T00:00:00'
+          - in: query
+            name: end
+            type: string
+            description: Changes made before this date, on the iso format
+          - in: query
+            name: before_id
+            type: integer
+            description: Entries older than this id, to get the next page
+          - in: query
+            name: limit
+            type: integer
+            description: Maximum number of entries returned, up to 1000
+
+        definitions:
+          AuditEntry:
+            type: object
+            properties:
+              id:
+                type: integer
+                description: Id of the entry
+              username:
+                type: string
+                description: User that made the change
+              entity:
+                type: string
+                description: Table changed
+              entity_id:
+                type: integer
+                description: Id of the row changed
+              operation:
+                type: string
+                enum: [create, update, delete]
+              before:
+                type: object
+                description: Values of the changed columns before the change
+              after:
+                type: object
+                description: Values of the changed columns after the change
+              audit_date:
+                type: string
+                description: Date of the change
+          AuditEntries:
+            type: object
+            properties:
+              audit_log:
+                type: array
+                items:
+                  $ref: '#/definitions/AuditEntry'
+
+        responses:
+          '200':
+            description: The audit entries
+            schema:
+              $ref: '#/definitions/AuditEntries'
+          '401':
+            description: Error if the parameters are not valid or the user is not an admin
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can read the audit'}, 401
+
+        try:
+            start = request.args.get('start')
+            start = datetime.fromisoformat(start) if start else None
+            end = request.args.get('end')
+            end = datetime.fromisoformat(end) if end else None
+            entity_id = request.args.get('entity_id', type=int)
+            before_id = request.args.get('before_id', type=int)
+            limit = min(int(request.args.get('limit', 1000)), 1000)
+        except ValueError:
+            return {'error': 'Invalid parameters provided'}, 401
+
+        query = app.session.query(self.model_class)
+        if request.args.get('user'):
+            query = query.where(self.model_class.username == request.args['user'])
+        if request.args.get('entity'):
+            query = query.where(self.model_class.entity == request.args['entity'])
+        if entity_id is not None:
+            query = query.where(self.model_class.entity_id == entity_id)
+        if start:
+            query = query.where(self.model_class.audit_date >= start)
+        if end:
+            query = query.where(self.model_class.audit_date < end)
+        if before_id:
+            query = query.where(self.model_class.id < before_id)
+
+        # ordered by date, so the filters by user and entity are served by their indexes
+        rows = query.order_by(self.model_class.audit_date.desc(), self.model_class.id.desc())\
+            .limit(limit).all()
+        return {self.model_class.__tablename__: [row.to_json() for row in rows]}
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class Batch(Resource):
+    """Class to run many operations on a single request and transaction."""
+    methods = ['POST', 'OPTIONS']
+
+    @auth.login_required
+    def post(self):
+        """Method to run a list of operations, all of them are applied or none.
+        ---
+        tags:
+          - Batch
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: body
+            name: operations
+            description: Operations to be executed on order, the strings $<index>.<field>
+              on the path and on the body are replaced by the field of the result of the
+              operation of that index
+            schema:
+              $ref: '#/definitions/BatchBody'
+
+        definitions:
+          BatchOperation:
+            type: object
+            properties:
+              method:
+                type: string
+                enum: [GET, POST, PUT, DELETE]
+              path:
+                type: string
+                example: /user_groups/
+              body:
+                type: object
+                example: {"group_id": "$0.id", "user_id": "$1.id"}
+          BatchBody:
+            type: object
+            properties:
+              operations:
+                type: array
+                items:
+                  $ref: '#/definitions/BatchOperation'
+          BatchResult:
+            type: object
+            properties:
+              status:
+                type: integer
+                description: Status code of the operation
+              body:
+                type: object
+                description: Response of the operation
+          BatchResults:
+            type: object
+            properties:
+              results:
+                type: array
+                items:
+                  $ref: '#/definitions/BatchResult'
+
+        responses:
+          '200':
+            description: The results of all the operations, they were committed
+            schema:
+              $ref: '#/definitions/BatchResults'
+          '401':
+            description: Error if an operation is not valid or failed, nothing is committed
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        data = json.loads(request.get_data().decode('utf-8') or 'null')
+        operations = data.get('operations') if isinstance(data, dict) else None
+
+        try:
+            batch.validate_operations(operations)
+            results, failed = batch.run_batch(app, app.session, current_username(), operations)
+        except batch.BatchError as error:
+            return {'error': str(error)}, 401
+
+        if failed is not None:
+            app.logger.info(f'[{current_username()}] Batch rolled back on operation {failed}')
+            return {'error': f'Operation {failed} failed, the batch was rolled back',
+                    'results': results}, 401
+
+        app.logger.info(f'[{current_username()}] Batch of {len(results)} operations committed')
+        return {'results': results}
+
+    def options(self):
+        return dict(Allow=self.methods)
+
+
+class Backups(Resource):
+    """Class to take snapshots of the database while the api is running, only the admin
+    group can use it."""
+    methods = ['GET', 'POST', 'OPTIONS']
+
+    @auth.login_required
+    def get(self):
+        """Method to list the snapshots taken, from the newest to the oldest.
+        ---
+        tags:
+          - Backups
+
+        security:
+          - basicAuth: []
+
+        definitions:
+          Backup:
+            type: object
+            properties:
+              name:
+                type: string
+                description: File name of the snapshot
+                example: api-20220821-120000.db.gz
+              bytes:
+                type: integer
+                description: Size of the snapshot
+              creation_date:
+                type: string
+                description: Date the snapshot was written
+          Backups:
+            type: object
+            properties:
+              running:
+                type: boolean
+                description: If there is a snapshot being taken
+              backups:
+                type: array
+                items:
+                  $ref: '#/definitions/Backup'
+
+        responses:
+          '200':
+            description: The snapshots on the backup directory
+            schema:
+              $ref: '#/definitions/Backups'
+          '401':
+            description: Error if the user is not an admin
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can manage the backups'}, 401
+
+        backups = []
+        if os.path.isdir(app.backup_directory):
+            with os.scandir(app.backup_directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(('.db', '.db.gz')):
+                        stat = entry.stat()
+                        backups.append(dict(
+                            name=entry.name, bytes=stat.st_size,
+                            creation_date=datetime.fromtimestamp(stat.st_mtime).isoformat()))
+
+        backups.sort(key=lambda item: item['name'], reverse=True)
+        running = app.backup_thread is not None and app.backup_thread.is_alive()
+        return {'running': running, 'backups': backups}
+
+    @auth.login_required
+    def post(self):
+        """Method to start a snapshot of the database, it is written on the background and
+        shows up on the list when complete.
+        ---
+        tags:
+          - Backups
+
+        security:
+          - basicAuth: []
+
+        parameters:
+          - in: body
+            name: backup
+            description: Options of the snapshot
+            schema:
+              $ref: '#/definitions/BackupBody'
+
+        definitions:
+          BackupBody:
+            type: object
+            properties:
+              compress:
+                type: boolean
+                description: Compress the snapshot with gzip
+                example: true
+
+        responses:
+          '200':
+            description: The name of the snapshot started
+            schema:
+              $ref: '#/definitions/Backup'
+          '401':
+            description: Error if the user is not an admin or a snapshot is running
+            schema:
+              $ref: '#/definitions/Error'
+        """
+        if not utils.is_admin():
+            return {'error': 'Only the admin group can manage the backups'}, 401
+
+        if not app.database_path:
+            return {'error': 'The backups are only taken of sqlite databases'}, 401
+
+        data = json.loads(request.get_data().decode('utf-8') or '{}')
+        compress = bool(data.get('compress', False)) if isinstance(data, dict) else False
+
+        # the snapshots of a process are taken one at a time
+        if app.backup_thread is not None and app.backup_thread.is_alive():
+            return {'error': 'A backup is already running'}, 401
+
+        name = backup.snapshot_name(compress)
+        app.backup_thread = backup.start_backup(
+            app.database_path, os.path.join(app.backup_directory, name), compress)
+        app.logger.info(f'[{current_username()}] Backup {name} started')
+
+        return {'name': name, 'status': 'started'}
+
+    def options(self):
+        return dict(Allow=self.methods)
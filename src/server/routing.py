@@ -0,0 +1,124 @@
+"""Module to choose the session of the reads and to keep the users that wrote recently,
+so their reads are not sent to a replica.
+
+The reads of the lists are sent to the read engine, a replica of the database, while the
+writes go to the primary. A request uses the same read session for all its reads, so the
+cached responses are stored with the table versions of the same database they were read
+from. A replica can be a little behind the primary, so for a few seconds after a write
+the reads of the same user are sent to the primary, and the user always sees its own
+changes. The time of the last write of each user is kept on a separate sqlite file, so all
+the gunicorn workers share it, the same way as the rate limit.
+"""
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from flask import Flask, g, has_request_context
+
+from server.app import App
+from server.authentication import current_username
+
+
+app: Flask = App('main')
+
+# seconds that the reads of a user go to the primary after a write
+READ_YOUR_WRITES = float(os.getenv('API_READ_YOUR_WRITES_SECONDS', 5))
+
+CREATE_TABLE = '''
+CREATE TABLE IF NOT EXISTS recent_write (
+    username TEXT PRIMARY KEY,
+    updated REAL NOT NULL
+)
+'''
+
+MARK_WRITE = '''
+INSERT INTO recent_write (username, updated) VALUES (:username, :now)
+ON CONFLICT (username) DO UPDATE SET updated = :now
+'''
+
+
+class RecentWrites:
+    """Time of the last write of each user, shared by the processes using the same file."""
+
+    def __init__(self, database_file: str, window: float = READ_YOUR_WRITES):
+        self.database_file = database_file
+        self.window = window
+
+        self.connection = None
+        self.pid = None
+        self.last_cleanup = time.time()
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Returns the connection of the current process, since it can't be shared after
+        the fork of the gunicorn workers."""
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.database_file, timeout=5,
+                                              isolation_level=None, check_same_thread=False)
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=OFF')
+            self.connection.execute(CREATE_TABLE)
+            self.pid = os.getpid()
+
+        return self.connection
+
+    def mark(self, username: str) -> None:
+        """Registers a write of the user."""
+        now = time.time()
+        self.get_connection().execute(MARK_WRITE, dict(username=username, now=now))
+
+        # removes the users that did not write for a while, at most once by minute
+        if now - self.last_cleanup >= 60:
+            self.get_connection().execute(
+                'DELETE FROM recent_write WHERE updated < ?', (now - self.window, ))
+            self.last_cleanup = now
+
+    def wrote_recently(self, username: str) -> bool:
+        """Returns if the user wrote something on the last window seconds."""
+        row = self.get_connection().execute(
+            'SELECT updated FROM recent_write WHERE username = ?', (username, )).fetchone()
+        return row is not None and row[0] > time.time() - self.window
+
+    def on_commit(self, tables) -> None:
+        """Registers the write of the user of the request, called after each commit."""
+        username = current_username() if has_request_context() else None
+        if username:
+            self.mark(username)
+
+
+def reads_from_replica() -> bool:
+    """Returns if the reads of the request can go to the read engine. They stay on the
+    primary while the session has changes not committed, as inside a batch, and for a
+    few seconds after a write of the same user, so the user always sees its own writes."""
+    if app.read_session is app.session:
+        return False
+
+    if app.session.info.get('defer_commit') or app.session.info.get('changed_tables'):
+        return False
+
+    username = current_username()
+    return not (app.recent_writes and username and app.recent_writes.wrote_recently(username))
+
+
+@contextmanager
+def read_session():
+    """Returns the session used by the reads of the request, the nested calls get the same
+    session of the outer one. The transaction of the read session is rolled back at the
+    end, so the connection goes back to the pool and the rows are loaded again on the next
+    request.
+
+    :return: the read session or the session of the primary
+    :rtype: Session
+    """
+    if g.get('read_session') is not None:
+        yield g.read_session
+        return
+
+    session = app.read_session if reads_from_replica() else app.session
+    g.read_session = session
+    try:
+        yield session
+    finally:
+        g.read_session = None
+        if session is not app.session:
+            session.rollback()
@@ -0,0 +1,178 @@
+"""Module to handle the signed tokens used to authenticate the requests.
+
+The tokens are stateless, they carry the user name and the expiration signed with a
+HMAC-SHA256, so they are verified without any access to the database. The format is
+``<key id>.<payload>.<signature>`` with the payload and signature on base64url.
+
+The signing keys can be rotated, the first key is used to sign the new tokens and the
+others are only used to verify the tokens that were already issued. They are read from
+the environment variable API_TOKEN_KEYS (``kid:secret,kid:secret``) or from the file
+``token.key`` on the database directory (one ``kid:secret`` by line), which is created
+with a random key if it does not exist.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+
+from config.utils import file_lock
+from database.models import RevokedTokenModel
+
+
+# seconds that a token is valid after it is issued
+TOKEN_TTL = int(os.getenv('API_TOKEN_TTL', 900))
+# seconds between the synchronizations of the revoked tokens with the database
+DENYLIST_SYNC_INTERVAL = 5
+
+
+def encode(data: bytes) -> str:
+    """Encodes bytes to base64url without padding."""
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('utf-8')
+
+
+def decode(data: str) -> bytes:
+    """Decodes a base64url string without padding."""
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def parse_keys(value: str) -> list:
+    """Parses the signing keys on the format ``kid:secret`` separated by comma or new line.
+
+    :param value: keys to be parsed
+    :type value: str
+    :return: list of tuples (kid, secret), the first one is the current key
+    :rtype: list
+    """
+    keys = []
+    for item in value.replace(',', '\n').splitlines():
+        if ':' not in item:
+            continue
+        kid, secret = item.strip().split(':', 1)
+        keys.append((kid, secret.encode('utf-8')))
+
+    return keys
+
+
+def load_signing_keys(database_directory: str) -> list:
+    """Loads the signing keys from the environment or from the token.key file.
+
+    :param database_directory: directory of the database, where the key file is kept
+    :type database_directory: str
+    :return: list of tuples (kid, secret), the first one is the current key
+    :rtype: list
+    """
+    if os.getenv('API_TOKEN_KEYS'):
+        return parse_keys(os.getenv('API_TOKEN_KEYS'))
+
+    key_file = os.path.join(database_directory, 'token.key')
+    with file_lock(f'{key_file}.lock'):
+        if not os.path.exists(key_file):
+            with open(key_file, 'w') as file:
+                file.write(f'{secrets.token_hex(4)}:{secrets.token_urlsafe(32)}\n')
+            os.chmod(key_file, 0o600)
+
+        with open(key_file) as file:
+            return parse_keys(file.read())
+
+
+class TokenManager:
+    """Issues and verifies the signed tokens, keeping the revoked ones on memory."""
+
+    def __init__(self, keys: list, ttl: int = TOKEN_TTL):
+        self.current_kid = keys[0][0]
+        self.keys = dict(keys)
+        self.ttl = ttl
+
+        # jti -> expiration timestamp of the revoked tokens not expired yet
+        self.denylist = {}
+        self.denylist_last_id = 0
+        self.denylist_synced = 0
+
+    def sign(self, message: str, kid: str) -> str:
+        """Returns the signature of the message with the key kid."""
+        return encode(hmac.new(self.keys[kid], message.encode('utf-8'), hashlib.sha256).digest())
+
+    def issue(self, username: str) -> dict:
+        """Issues a new token for the user.
+
+        :param username: user name
+        :type username: str
+        :return: the token and its expiration
+        :rtype: dict
+        """
+        # the issue time has milliseconds, so a token issued right after the tokens of the
+        # user are revoked is not taken as revoked too
+        now = time.time()
+        payload = dict(sub=username, iat=round(now, 3), exp=int(now) + self.ttl,
+                       jti=secrets.token_hex(16))
+
+        message = f'{self.current_kid}.{encode(json.dumps(payload).encode("utf-8"))}'
+        token = f'{message}.{self.sign(message, self.current_kid)}'
+
+        return dict(token=token, token_type='Bearer', expires_in=self.ttl)
+
+    def decode(self, token: str) -> dict:
+        """Verifies the token and returns its payload.
+
+        :param token: token to be verified
+        :type token: str
+        :return: the payload of the token or None if the token is not valid
+        :rtype: dict
+        """
+        try:
+            kid, payload, signature = token.split('.')
+        except (AttributeError, ValueError):
+            return None
+
+        if kid not in self.keys or \
+                not hmac.compare_digest(signature, self.sign(f'{kid}.{payload}', kid)):
+            return None
+
+        try:
+            payload = json.loads(decode(payload))
+        except ValueError:
+            return None
+
+        if payload.get('exp', 0) <= time.time() or payload.get('jti') in self.denylist:
+            return None
+
+        return payload
+
+    def revoke(self, session, payload: dict) -> None:
+        """Revokes a token, the other workers get the revocation on their next sync.
+
+        :param session: database session
+        :type session: Session
+        :param payload: payload of the token
+        :type payload: dict
+        """
+        self.denylist[payload['jti']] = payload['exp']
+
+        session.add(RevokedTokenModel(payload['jti'], datetime.fromtimestamp(payload['exp'])))
+        session.commit()
+
+    def sync_denylist(self, session, force: bool = False) -> None:
+        """Loads the tokens revoked since the last sync, at most once by sync interval.
+
+        :param session: database session
+        :type session: Session
+        :param force: sync even if the interval did not pass yet
+        :type force: bool
+        """
+        now = time.time()
+        if not force and now - self.denylist_synced < DENYLIST_SYNC_INTERVAL:
+            return
+
+        rows = session.query(RevokedTokenModel)\
+            .where(RevokedTokenModel.id > self.denylist_last_id)\
+            .order_by(RevokedTokenModel.id).all()
+        for row in rows:
+            self.denylist[row.jti] = row.expiration_date.timestamp()
+            self.denylist_last_id = row.id
+
+        self.denylist = {jti: exp for jti, exp in self.denylist.items() if exp > now}
+        self.denylist_synced = now
@@ -1,17 +1,31 @@
 """Module to handle utillity methods"""
+import os
 import re
+import time
 from typing import Tuple
 
 from config.utils import create_directories
-from database.utils import initiate_db
-from flask import Flask, request
+from database import models
+from database.utils import ADMIN_GROUP_ID, create_read_engine, create_session, initiate_db
+from database.utils import insert_ignore
+from flask import Flask, g, request
 from flask_cors import CORS
 from flask_restful import Api
 from flasgger import Swagger
+from sqlalchemy import event, select, tuple_
+from sqlalchemy.orm import Session
 import json
 
+from server import audit_log
+from server import cache
+from server import changes
 from server import resources
+from server import tokens
+from server import versions
+from server.rate_limit import RateLimiter
+from server.routing import RecentWrites, read_session
 from server.app import App
+from server.authentication import current_username
 
 template = {
     "swagger": "2.0",
@@ -36,20 +50,55 @@ template = {
 
 app: Flask = App('main')
 
+# whitespace and control characters, not valid on a hostname or ip address
+INVALID_HOST = re.compile(r'[\s\x00-\x1f\x7f]')
+
 
 def create_app(app_name: str, database_directory: str = 'sqlite',
-               log_dir: str = './logs', directory_files: str = './files') -> Flask:
+               log_dir: str = './logs', directory_files: str = './files',
+               migrate: bool = True, database_url: str = None) -> Flask:
     """Method to handle requests to the server."""
+    # time spent on each phase of the startup, in milliseconds
+    startup_timings = {}
+    start = time.perf_counter()
+
     create_directories([database_directory, directory_files, log_dir])
+    start = record_phase(startup_timings, 'directories', start)
 
     app: Flask = App(app_name)
+    app.startup_timings = startup_timings
 
     CORS(app)
     api = Api(app)
 
-    engine, session = initiate_db(database_directory)
+    engine, session = initiate_db(database_directory, migrate, database_url)
     app.engine = engine
     app.session = session
+    # the reads go to the replica of API_DATABASE_READ_URL, on sqlite to read only connections
+    app.read_engine = create_read_engine(engine)
+    app.read_session = create_session(app.read_engine) if app.read_engine is not engine \
+        else session
+    # without a replica the reads are never behind the writes
+    app.recent_writes = None
+    if os.getenv('API_DATABASE_READ_URL'):
+        app.recent_writes = RecentWrites(os.path.join(database_directory, 'recent_writes.db'))
+        versions.subscribe(app.recent_writes.on_commit)
+    app.tokens = tokens.TokenManager(tokens.load_signing_keys(database_directory))
+    # the backups are only taken of the sqlite files
+    app.database_path = engine.url.database if engine.dialect.name == 'sqlite' else None
+    app.backup_directory = os.path.join(database_directory, 'backups')
+    app.backup_thread = None
+    app.audit_writer = audit_log.AuditWriter(app.engine)
+    audit_log.attach(app.session, app.audit_writer)
+    app.type_cache = cache.TypeCache()
+    app.response_cache = cache.ResponseCache(permission_scope)
+    versions.subscribe(app.type_cache.invalidate)
+    app.rate_limiter = RateLimiter(os.path.join(database_directory, 'rate_limit.db'),
+                                   os.getenv('API_RATE_LIMIT_ENABLED', '1') == '1')
+    app.change_waiters = changes.WaiterSlots(os.path.join(database_directory, 'change_waiter'))
+    app.before_request(limit_request)
+    app.teardown_request(end_session)
+    start = record_phase(startup_timings, 'database', start)
 
     basic_methods = ['GET', 'POST', 'OPTIONS']
     individual_methods = ['GET', 'PUT', 'OPTIONS', 'DELETE']
@@ -68,6 +117,9 @@ def create_app(app_name: str, database_directory: str = 'sqlite',
 
     api.add_resource(resources.Groups, '/groups/', methods=basic_methods)
     api.add_resource(resources.Group, '/groups/<id>', methods=individual_methods)
+    api.add_resource(resources.GroupMembers, '/groups/<id>/members', methods=['POST', 'OPTIONS'])
+    api.add_resource(resources.GroupFunctions, '/groups/<id>/functions',
+                     methods=['POST', 'OPTIONS'])
 
     api.add_resource(resources.Users, '/users/', methods=basic_methods)
     api.add_resource(resources.User, '/users/<id>', methods=individual_methods)
@@ -78,18 +130,161 @@ def create_app(app_name: str, database_directory: str = 'sqlite',
     api.add_resource(resources.FunctionPermissions, '/function_permissions/', methods=basic_methods)
     api.add_resource(resources.FunctionPermission, '/function_permissions/<id>', methods=individual_methods)
 
-    api.add_resource(resources.Databases, '/databases/', methods=basic_methods)
+    api.add_resource(resources.Databases, '/databases/',
+                     methods=['GET', 'POST', 'PUT', 'OPTIONS'])
     api.add_resource(resources.Database, '/databases/<id>', methods=individual_methods)
+    api.add_resource(resources.DatabasesDsn, '/databases/dsn', methods=['GET', 'OPTIONS'])
+    api.add_resource(resources.DatabaseDsn, '/databases/<id>/dsn', methods=['GET', 'OPTIONS'])
+
+    api.add_resource(resources.Servers, '/servers/', methods=basic_methods)
+    api.add_resource(resources.ServersExport, '/servers/export', methods=['GET', 'OPTIONS'])
+    api.add_resource(resources.Server, '/servers/<id>', methods=individual_methods)
+
+    api.add_resource(resources.ServerPermissions, '/server_permissions/', methods=basic_methods)
+    api.add_resource(resources.ServerPermission, '/server_permissions/<id>',
+                     methods=individual_methods)
+
+    api.add_resource(resources.Logins, '/logins/', methods=basic_methods)
+    api.add_resource(resources.Login, '/logins/<id>', methods=individual_methods)
+
+    api.add_resource(resources.ConnectionLogins, '/connection_logins/', methods=basic_methods)
+    api.add_resource(resources.ConnectionLogin, '/connection_logins/<id>',
+                     methods=individual_methods)
+    api.add_resource(resources.ConnectionCredentials, '/connections/<id>/credentials',
+                     methods=['GET', 'OPTIONS'])
+
+    api.add_resource(resources.Tokens, '/auth/token', methods=['POST', 'OPTIONS'])
+    api.add_resource(resources.TokenRefresh, '/auth/token/refresh', methods=['POST', 'OPTIONS'])
+    api.add_resource(resources.TokenRevoke, '/auth/token/revoke', methods=['POST', 'OPTIONS'])
+
+    api.add_resource(resources.RateLimitMetrics, '/metrics/rate_limit', methods=['GET'])
+
+    api.add_resource(resources.Changes, '/changes', methods=['GET', 'OPTIONS'])
+    api.add_resource(resources.ChangesStream, '/changes/stream', methods=['GET', 'OPTIONS'])
+
+    api.add_resource(resources.AuditLog, '/audit', methods=['GET', 'OPTIONS'])
+    api.add_resource(resources.Batch, '/batch', methods=['POST', 'OPTIONS'])
+    api.add_resource(resources.Backups, '/admin/backups', methods=basic_methods)
+    start = record_phase(startup_timings, 'resources', start)
 
     # app.config['SWAGGER'] = {
     #     'ignore_verbs': []
     # }
 
-    swagger = Swagger(app, template=template)
-    print(swagger)
+    app.swagger = Swagger(app, template=template)
+    record_phase(startup_timings, 'swagger', start)
     return app
 
 
+def limit_request():
+    """Checks the rate limit of the ip of the request before it is handled, the bucket of
+    the user is only checked after the authentication, by the authentication itself.
+
+    :return: None if the request is allowed, otherwise the 429 response
+    """
+    retry_after = app.rate_limiter.check_ip(request.remote_addr)
+    if not retry_after:
+        return None
+
+    app.logger.warning(f'Request from {request.remote_addr} to {request.path} '
+                       f'throttled, retry after {retry_after}s')
+    return dict(error='Too many requests', retry_after=retry_after), 429, \
+        {'Retry-After': str(retry_after)}
+
+
+def end_session(exception=None):
+    """Rolls back the changes left on the session at the end of a request, the writes that
+    succeeded were already committed, so only the changes of a request that failed are
+    discarded. The session is shared by the requests of the worker, so without it the next
+    requests would fail until something rolls it back. The transactions that only read are
+    kept, as before.
+
+    :param exception: exception raised by the request, if any
+    :type exception: Exception
+    """
+    # the operations of a batch run on the transaction of the batch, that ends it
+    session = app.session
+    if session.info.get('defer_commit'):
+        return
+
+    failed = not session.is_active or session.info.get('flushed') or \
+        session.new or session.dirty or session.deleted
+    if exception is None and not failed:
+        return
+
+    app.logger.warning(f'Rolling back the changes of the request {request.method} '
+                       f'{request.path}: {exception!r}')
+    session.rollback()
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_flushed(session, flush_context):
+    """Marks that the transaction sent changes not committed yet."""
+    session.info['flushed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _clear_flushed(session):
+    """Clears the mark of the changes not committed, the transaction ended."""
+    session.info.pop('flushed', None)
+
+
+def record_phase(timings: dict, phase: str, start: float) -> float:
+    """Records the time spent on a phase of the startup.
+
+    :param timings: dict with the time of each phase in milliseconds
+    :type timings: dict
+    :param phase: name of the phase
+    :type phase: str
+    :param start: perf_counter of the start of the phase
+    :type start: float
+    :return: perf_counter of the end of the phase, to be used as the start of the next
+    :rtype: float
+    """
+    end = time.perf_counter()
+    timings[phase] = round((end - start) * 1000, 3)
+    return end
+
+
+def prepare_preload(app: Flask) -> None:
+    """Prepares the app loaded on the gunicorn master to be shared with the workers.
+
+    The swagger specs are built once here so the workers inherit them already cached,
+    and the database connections are released so no worker inherits an open one.
+
+    :param app: flask app
+    :type app: Flask
+    """
+    with app.test_request_context():
+        for endpoint in app.swagger.endpoints:
+            app.swagger.get_apispecs(endpoint)
+
+    app.session.close()
+    app.engine.dispose()
+    if app.read_engine is not app.engine:
+        app.read_session.close()
+        app.read_engine.dispose()
+
+
+def reset_connections(app: Flask) -> None:
+    """Recreates the database connections of the app after the worker fork.
+
+    :param app: flask app
+    :type app: Flask
+    """
+    # close=False leaves the connections inherited from the master untouched
+    app.engine.dispose(close=False)
+    app.session = create_session(app.engine)
+    audit_log.attach(app.session, app.audit_writer)
+
+    if app.read_engine is app.engine:
+        app.read_session = app.session
+    else:
+        app.read_engine.dispose(close=False)
+        app.read_session = create_session(app.read_engine)
+
+
 def check_requirements(model_class, id) -> Tuple[bool, str]:
     """Checks if the requirement exists
 
@@ -100,12 +295,36 @@ def check_requirements(model_class, id) -> Tuple[bool, str]:
     :return: Tuple with the result
     :rtype: tuple
     """
-    if not check_if_info_exists(model_class, id)[0]:
+    if app.type_cache.is_cached(model_class):
+        exists = app.type_cache.exists(app.session, model_class, id)
+    else:
+        exists = check_if_info_exists(model_class, id)[0]
+
+    if not exists:
         return False, f'{model_class.__name__} not found'
 
     return True, 'Info exists'
 
 
+def find_missing_ids(model_class, ids: list) -> list:
+    """Returns the ids that don't exist on the table of the model, checked with a single
+    query or on the cache of the type tables.
+
+    :param model_class: model class
+    :type model_class: Base
+    :param ids: ids to be checked
+    :type ids: list
+    :return: list with the ids not found
+    :rtype: list
+    """
+    if app.type_cache.is_cached(model_class):
+        found = app.type_cache.get(app.session, model_class)
+        return [item for item in ids if str(item) not in found]
+
+    found = {row.id for row in app.session.query(model_class.id).where(model_class.id.in_(ids))}
+    return [item for item in ids if item not in found]
+
+
 def check_if_info_exists(model, id) -> tuple:
     """Checks if the model exists already
 
@@ -122,6 +341,106 @@ def check_if_info_exists(model, id) -> tuple:
     return True, row
 
 
+def get_caller_group_ids() -> set:
+    """Returns the ids of the groups of the user of the request, they are loaded once by
+    request and kept on flask.g.
+
+    :return: set with the group ids
+    :rtype: set
+    """
+    if 'caller_group_ids' not in g:
+        rows = app.session.query(models.UserGroupModel.group_id)\
+            .join(models.UserModel, models.UserModel.id == models.UserGroupModel.user_id)\
+            .where(models.UserModel.name == current_username())
+        g.caller_group_ids = {row.group_id for row in rows}
+
+    return g.caller_group_ids
+
+
+def is_admin() -> bool:
+    """Returns True if the user of the request belongs to the admin group."""
+    return ADMIN_GROUP_ID in get_caller_group_ids()
+
+
+def permission_scope() -> tuple:
+    """Returns the scope of the data visible by the user of the request, the users of the
+    same groups see the same rows."""
+    if is_admin():
+        return (ADMIN_GROUP_ID, )
+    return tuple(sorted(get_caller_group_ids()))
+
+
+def filter_visible_servers(query):
+    """Filters a query of servers to the ones visible by the groups of the user, using a
+    semi-join with server_permissions, so the filter is done by the database.
+
+    :param query: query selecting ServerModel
+    :type query: Query
+    :return: filtered query
+    :rtype: Query
+    """
+    if is_admin():
+        return query
+
+    return query.where(models.ServerModel.id.in_(visible_server_ids()))
+
+
+def visible_server_ids():
+    """Returns the subquery of the ids of the servers granted to the groups of the user.
+
+    :return: select of the server ids
+    :rtype: Select
+    """
+    return select(models.ServerPermissionsModel.server_id)\
+        .where(models.ServerPermissionsModel.group_id.in_(get_caller_group_ids()))
+
+
+def filter_visible_connection_logins(query):
+    """Filters a query of connection logins to the ones of the servers visible by the
+    groups of the user.
+
+    :param query: query selecting ConnectionLoginModel
+    :type query: Query
+    :return: filtered query
+    :rtype: Query
+    """
+    if is_admin():
+        return query
+
+    return query.where(models.ConnectionLoginModel.connection_id.in_(visible_server_ids()))
+
+
+def filter_visible_server_permissions(query):
+    """Filters a query of server permissions to the ones of the groups of the user.
+
+    :param query: query selecting ServerPermissionsModel
+    :type query: Query
+    :return: filtered query
+    :rtype: Query
+    """
+    if is_admin():
+        return query
+
+    return query.where(models.ServerPermissionsModel.group_id.in_(get_caller_group_ids()))
+
+
+def host_check(host) -> Tuple[bool, str]:
+    """Checks the host of a server, the host is written as is on the exports, so
+    whitespace or control characters could add entries to a ssh_config or an inventory.
+
+    :param host: hostname or ip address
+    :return: True if is valid otherwise false
+    :rtype: tuple
+    """
+    if not isinstance(host, str) or not host:
+        return False, 'Host must be a non empty string'
+
+    if INVALID_HOST.search(host):
+        return False, 'Host cant contain whitespace or control characters'
+
+    return True, 'Valid'
+
+
 def password_complexity_check(user, password) -> Tuple[bool, str]:
     """Method to check the complexity of a given password
 
@@ -152,13 +471,24 @@ def password_complexity_check(user, password) -> Tuple[bool, str]:
     return True, 'Valid'
 
 
-def basic_get(session, model_class, request_class_name):
-    """Method to handle get requests for type tables."""
-    rows = app.session.query(model_class).all()
+def basic_get(session, model_class, request_class_name, query=None):
+    """Method to handle get requests for type tables, query can be informed to filter
+    the rows returned. The type tables are returned from the cache and the other rows
+    from the read engine."""
     app.logger.debug(
-        f"[{request.authorization.username}] Returning all {request_class_name} rows")
+        f"[{current_username()}] Returning all {request_class_name} rows")
 
-    resp = {model_class.__tablename__: [row.to_json(session) for row in rows]}
+    with read_session() as session:
+        if query is None and app.type_cache.is_cached(model_class):
+            rows = app.type_cache.get(session, model_class)
+            return {model_class.__tablename__: list(rows.values())}
+
+        if query is None:
+            query = session.query(model_class)
+
+        rows = query.with_session(session).all()
+
+        resp = {model_class.__tablename__: [row.to_json(session) for row in rows]}
     return resp
 
 
@@ -177,16 +507,163 @@ def basic_post(session, request, model_class):
            error=f'{model_class.__class__.__name__}: {data["description"]} already exists'
         ), 401
 
-    session.bulk_save_objects([model_class(data["description"])])
+    row = model_class(data["description"])
+    session.add(row)
+    session.flush()
+    changes.record_change(session, row, changes.CREATED)
     session.commit()
 
-    row = session.query(model_class).\
-        where(model_class.description == data['description']).first()
-
     return {'success': 'Registered successfully', 'id': row.id}
 
 
-def basic_single_get(id, app, model_class, request, class_name) -> dict:
+# natural keys by query on the sync, each one uses 3 parameters of the statement
+SYNC_BATCH_SIZE = 300
+
+
+def sync_by_natural_key(session, model_class, records: list) -> dict:
+    """Inserts or updates the records by the natural key of the model, only the changed
+    rows are written, so the same list can be synced many times.
+
+    The existing rows are loaded by a single query for each batch of keys and compared on
+    memory, the new rows are inserted with a single statement and the changed ones are
+    updated with an executemany.
+
+    :param session: database session
+    :type session: Session
+    :param model_class: model class with get_fields and get_natural_key
+    :type model_class: Base
+    :param records: records with all the fields of the model
+    :type records: list
+    :return: number of inserted, updated and unchanged records
+    :rtype: dict
+    """
+    fields = model_class.get_fields()
+    natural_key = model_class.get_natural_key()
+    key_columns = [getattr(model_class, item) for item in natural_key]
+
+    # the keys are compared as strings, since the json can bring the numbers as strings,
+    # and the last record wins when the same key is repeated
+    incoming = {tuple(str(record[item]) for item in natural_key): record for record in records}
+
+    existing = {}
+    keys = [tuple(record[item] for item in natural_key) for record in incoming.values()]
+    for start in range(0, len(keys), SYNC_BATCH_SIZE):
+        rows = session.query(model_class.id, *[getattr(model_class, item) for item in fields])\
+            .where(tuple_(*key_columns).in_(keys[start:start + SYNC_BATCH_SIZE]))\
+            .order_by(model_class.id.desc())
+        for row in rows:
+            # the oldest row is kept when there are duplicates from before the sync
+            existing[tuple(str(getattr(row, item)) for item in natural_key)] = row
+
+    inserts, updates, diffs = [], [], []
+    for key, record in incoming.items():
+        values = {item: record[item] for item in fields}
+        row = existing.get(key)
+        if row is None:
+            inserts.append(values)
+            continue
+
+        changed = [item for item in fields if str(getattr(row, item)) != str(values[item])]
+        if changed:
+            updates.append(dict(values, id=row.id))
+            diffs.append(({item: getattr(row, item) for item in changed},
+                          {item: values[item] for item in changed}))
+
+    if inserts:
+        session.execute(model_class.__table__.insert(), inserts)
+        inserted_keys = [tuple(values[item] for item in natural_key) for values in inserts]
+        for start in range(0, len(inserted_keys), SYNC_BATCH_SIZE):
+            rows = session.query(model_class.id, *key_columns)\
+                .where(tuple_(*key_columns).in_(inserted_keys[start:start + SYNC_BATCH_SIZE]))\
+                .all()
+            changes.record_changes(
+                session, model_class.__tablename__, [row.id for row in rows], changes.CREATED,
+                [(None, incoming[tuple(str(getattr(row, item)) for item in natural_key)])
+                 for row in rows])
+    if updates:
+        session.bulk_update_mappings(model_class, updates)
+        changes.record_changes(session, model_class.__tablename__,
+                               [values['id'] for values in updates], changes.UPDATED, diffs)
+    session.commit()
+
+    return dict(inserted=len(inserts), updated=len(updates),
+                unchanged=len(incoming) - len(inserts) - len(updates))
+
+
+def insert_pair(session, model_class, **values):
+    """Inserts a row of an association table with a single statement, relying on its
+    unique index to skip the pairs that already exist.
+
+    :param session: database session
+    :type session: Session
+    :param model_class: model of the association table
+    :type model_class: Base
+    :param values: values of the columns of the pair
+    :type values: dict
+    :return: the row inserted or None if the pair already exists
+    :rtype: Base
+    """
+    result = session.execute(insert_ignore(session, model_class).values(**values))
+    if not result.rowcount:
+        return None
+
+    row = model_class(**values)
+    row.id = result.inserted_primary_key[0]
+    changes.record_change(session, row, changes.CREATED)
+    return row
+
+
+def pair_exists(session, model_class, id, **values) -> bool:
+    """Returns if another row of an association table already has the pair of values."""
+    query = session.query(model_class.id).where(model_class.id != id)
+    for field, value in values.items():
+        query = query.where(getattr(model_class, field) == value)
+    return query.first() is not None
+
+
+def assign_to_group(session, model_class, group_id: int, field: str, ids: list) -> dict:
+    """Assigns many rows to a group on an association table, as the users of a group on
+    user_grp, the pairs that already exist are skipped and the new ones are inserted with
+    a single statement and committed once.
+
+    :param session: database session
+    :type session: Session
+    :param model_class: model of the association table, with group_id
+    :type model_class: Base
+    :param group_id: id of the group
+    :type group_id: int
+    :param field: column with the ids assigned to the group
+    :type field: str
+    :param ids: ids to be assigned, already validated
+    :type ids: list
+    :return: number of inserted and already existing pairs
+    :rtype: dict
+    """
+    column = getattr(model_class, field)
+    ids = list(dict.fromkeys(ids))
+
+    existing = {row[0] for row in session.query(column)
+                .where(model_class.group_id == group_id)
+                .where(column.in_(ids))}
+    new_ids = [item for item in ids if item not in existing]
+
+    if new_ids:
+        # the unique index skips the pairs inserted by a concurrent request
+        session.execute(insert_ignore(session, model_class),
+                        [{'group_id': group_id, field: item} for item in new_ids])
+        rows = session.query(model_class.id, column)\
+            .where(model_class.group_id == group_id)\
+            .where(column.in_(new_ids))\
+            .order_by(model_class.id).all()
+        changes.record_changes(
+            session, model_class.__tablename__, [row.id for row in rows], changes.CREATED,
+            [(None, {'id': row.id, 'group_id': group_id, field: row[1]}) for row in rows])
+    session.commit()
+
+    return dict(inserted=len(new_ids), existing=len(ids) - len(new_ids))
+
+
+def basic_single_get(id, app, model_class, request, class_name, query=None) -> dict:
     """Basic method to decouple the get method of some classes
 
     :param id: id for the model
@@ -199,22 +676,31 @@ def basic_single_get(id, app, model_class, request, class_name) -> dict:
     :type request: request
     :param class_name: Name of the class using the method
     :type class_name: str
+    :param query: query to filter the rows visible, defaults to all the rows
+    :type query: Query
     :return: Returns a json object
     :rtype: dict
     """
-    row = app.session.query(model_class)\
-        .where(model_class.id == id).first()
-
-    if not row:
+    # the type tables are served from the cache, already as json
+    with read_session() as session:
+        if query is None and app.type_cache.is_cached(model_class):
+            result = app.type_cache.get(session, model_class).get(str(id))
+        else:
+            if query is None:
+                query = session.query(model_class)
+            row = query.with_session(session).where(model_class.id == id).first()
+            result = row.to_json(session) if row else None
+
+    if not result:
         error_message = f'No information found on {class_name} found'
-        app.logger.debug(f'[{request.authorization.username}] {error_message}')
+        app.logger.debug(f'[{current_username()}] {error_message}')
 
         return dict(error=error_message), 401
 
     app.logger.debug(
-        f'[{request.authorization.username}] '
+        f'[{current_username()}] '
         f'Returning {class_name} id {id}')
-    return row.to_json()
+    return result
 
 
 def basic_single_put(id, app, model_class, request, class_name) -> dict:
@@ -249,11 +735,12 @@ def basic_single_put(id, app, model_class, request, class_name) -> dict:
     row.description = data['description']
 
     app.session.bulk_save_objects([row])
+    changes.record_change(app.session, row, changes.UPDATED)
     app.session.commit()
 
     message = f"{class_name}:" + \
               f" {row.id} saved successfully"
-    app.logger.debug(f"[{request.authorization.username}] " + message)
+    app.logger.debug(f"[{current_username()}] " + message)
 
     return dict(message=message, register=row.to_json()), 200
 
@@ -281,6 +768,7 @@ def basic_single_delete(id, app, model_class, class_name) -> dict:
             id=id), 401
 
     app.session.delete(row)
+    changes.record_change(app.session, row, changes.DELETED)
     app.session.commit()
 
     return dict(success=f'{id} deleted'), 200
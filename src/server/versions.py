@@ -0,0 +1,82 @@
+"""Module to keep a version by table, incremented on every commit that changes the table.
+
+The writes mark the tables they change on the session and the versions are incremented on
+the same transaction of the change, so the caches of every worker find out that a table
+changed reading only the small table_version table, instead of the table itself. The
+caches of the process that made the change are notified right after the commit.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database.models import TableVersionModel
+from database.utils import insert_ignore
+
+
+# callbacks notified with the set of tables changed by each commit of the process
+listeners = []
+
+
+def mark_changed(session, table: str) -> None:
+    """Marks a table as changed by the current transaction of the session.
+
+    :param session: database session
+    :type session: Session
+    :param table: name of the table changed
+    :type table: str
+    """
+    session.info.setdefault('changed_tables', set()).add(table)
+
+
+def get_versions(session, tables) -> dict:
+    """Returns the versions of the tables, the tables never changed have version 0.
+
+    :param session: database session
+    :type session: Session
+    :param tables: names of the tables
+    :type tables: iterable
+    :return: dict with the version by table name
+    :rtype: dict
+    """
+    tables = list(tables)
+    versions = dict.fromkeys(tables, 0)
+    versions.update(session.query(TableVersionModel.table_name, TableVersionModel.version)
+                    .where(TableVersionModel.table_name.in_(tables)))
+    return versions
+
+
+def subscribe(callback) -> None:
+    """Makes the callback receive the set of tables changed by each commit of the process."""
+    if callback not in listeners:
+        listeners.append(callback)
+
+
+@event.listens_for(Session, 'before_commit')
+def _increment_versions(session):
+    """Increments the versions of the tables changed on the transaction being committed."""
+    tables = session.info.get('changed_tables')
+    if not tables:
+        return
+
+    table = TableVersionModel.__table__
+    session.execute(insert_ignore(session, TableVersionModel),
+                    [dict(table_name=name, version=0) for name in tables])
+    session.execute(table.update()
+                    .where(table.c.table_name.in_(tables))
+                    .values(version=table.c.version + 1))
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_listeners(session):
+    """Notifies the listeners of the process about the tables changed."""
+    tables = session.info.pop('changed_tables', None)
+    if not tables:
+        return
+
+    for callback in listeners:
+        callback(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_tables(session):
+    """Discards the tables marked by the changes rolled back."""
+    session.info.pop('changed_tables', None)
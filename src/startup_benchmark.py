@@ -0,0 +1,141 @@
+"""Benchmark of the cold start of the application.
+
+Runs ``main.main`` on a new python interpreter with ``-X importtime`` and a new database
+directory, reporting the wall time of the startup, the import cost of each package, the
+time spent on each phase of ``create_app`` and the peak RSS of the process.
+
+Example:
+    python startup_benchmark.py --max-wall-ms 3000 --max-rss-mb 150
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+# code executed on the new interpreter, prints the measures as json on the last line
+STARTUP_CODE = '''
+import json
+import resource
+import sys
+import time
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.main(cwd=sys.argv[1])
+created = time.perf_counter()
+
+with app.test_request_context():
+    for endpoint in app.swagger.endpoints:
+        app.swagger.get_apispecs(endpoint)
+timings = dict(app.startup_timings, swagger_specs=round((time.perf_counter() - created) * 1000, 3))
+
+print(json.dumps(dict(
+    import_ms=round((imported - start) * 1000, 3),
+    create_app_ms=round((created - imported) * 1000, 3),
+    wall_ms=round((time.perf_counter() - start) * 1000, 3),
+    phases=timings,
+    peak_rss_mb=round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 3),
+)))
+'''
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(output: str) -> dict:
+    """Parses the output of ``-X importtime`` summing the time of each top level package.
+
+    Each line has the format ``import time: self [us] | cumulative | imported package``
+    and the nested imports are indented on the package name.
+
+    :param output: stderr of the interpreter
+    :type output: str
+    :return: dict with the self time in milliseconds of each top level package
+    :rtype: dict
+    """
+    packages = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_us) / 1000
+
+    return {package: round(ms, 3) for package, ms in
+            sorted(packages.items(), key=lambda item: item[1], reverse=True)}
+
+
+def profile_startup() -> dict:
+    """Runs the startup of the application on a new interpreter and returns the measures.
+
+    :return: dict with the measures of the startup
+    :rtype: dict
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE, directory],
+            cwd=SOURCE_DIRECTORY, capture_output=True, text=True, check=True)
+
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(process.stderr)
+    return result
+
+
+def check_thresholds(result: dict, max_wall_ms: float, max_rss_mb: float) -> list:
+    """Returns the thresholds exceeded by the startup.
+
+    :param result: measures returned by profile_startup
+    :type result: dict
+    :param max_wall_ms: maximum wall time of the startup in milliseconds
+    :type max_wall_ms: float
+    :param max_rss_mb: maximum peak RSS in megabytes
+    :type max_rss_mb: float
+    :return: list with the error messages
+    :rtype: list
+    """
+    errors = []
+    if result['wall_ms'] > max_wall_ms:
+        errors.append(f'wall time {result["wall_ms"]}ms exceeds {max_wall_ms}ms')
+    if result['peak_rss_mb'] > max_rss_mb:
+        errors.append(f'peak rss {result["peak_rss_mb"]}MB exceeds {max_rss_mb}MB')
+
+    return errors
+
+
+def main(argv: list = None) -> int:
+    """Entrypoint of the startup benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the cold start of the api.')
+    parser.add_argument('--max-wall-ms', type=float, default=5000)
+    parser.add_argument('--max-rss-mb', type=float, default=200)
+    parser.add_argument('--top', type=int, default=15, help='number of packages to show')
+    parser.add_argument('--json', action='store_true', help='prints the result as json')
+    args = parser.parse_args(argv)
+
+    result = profile_startup()
+    errors = check_thresholds(result, args.max_wall_ms, args.max_rss_mb)
+
+    if args.json:
+        print(json.dumps(dict(result, errors=errors), indent=2))
+    else:
+        print(f'wall time:   {result["wall_ms"]}ms')
+        print(f'imports:     {result["import_ms"]}ms')
+        print(f'create_app:  {result["create_app_ms"]}ms')
+        print(f'peak rss:    {result["peak_rss_mb"]}MB')
+        print('phases:')
+        for phase, ms in result['phases'].items():
+            print(f'  {phase:<20} {ms}ms')
+        print('imports by package:')
+        for package, ms in list(result['imports'].items())[:args.top]:
+            print(f'  {package:<20} {ms}ms')
+        for error in errors:
+            print(f'ERROR {error}')
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Generator of a synthetic inventory to benchmark the api with realistic volumes."""
+import random
+from datetime import date
+
+from database import models
+from database import utils
+
+
+def generate_inventory(session, groups: int = 10, users: int = 100, memberships: int = 2,
+                       databases: int = 1000, servers: int = 1000, seed: int = 0) -> dict:
+    """Inserts groups, users, memberships, databases and servers on the database.
+
+    :param session: database session
+    :type session: Session
+    :param groups: number of groups
+    :type groups: int
+    :param users: number of users
+    :type users: int
+    :param memberships: number of groups of each user
+    :type memberships: int
+    :param databases: number of databases
+    :type databases: int
+    :param servers: number of servers
+    :type servers: int
+    :param seed: seed of the random generator, so the inventory is reproducible
+    :type seed: int
+    :return: number of rows inserted by table
+    :rtype: dict
+    """
+    generator = random.Random(seed)
+    today = date.today()
+    prefix = f'synthetic-{seed}'
+
+    group_ids = _insert(session, models.GroupModel, [
+        dict(description=f'{prefix}-group-{index}', creation_date=today)
+        for index in range(groups)])
+
+    password = models.password_hash('Synthetic-password-1')
+    user_ids = _insert(session, models.UserModel, [
+        dict(name=f'{prefix}-user-{index}', password=password,
+             creation_date=today, update_date=today)
+        for index in range(users)])
+
+    membership_rows = []
+    for user_id in user_ids:
+        for group_id in generator.sample(group_ids, min(memberships, len(group_ids))):
+            membership_rows.append(dict(group_id=group_id, user_id=user_id))
+    _insert(session, models.UserGroupModel, membership_rows)
+
+    database_types = [item.value for item in utils.DatabaseEnum]
+    _insert(session, models.DatabaseModel, [
+        dict(description=f'{prefix}-database-{index}', host=f'db{index}.example.com',
+             port=generator.choice([1521, 3306, 5432, 1433, 6379, 27017]),
+             sid=f'sid{index}', database_type_id=generator.choice(database_types))
+        for index in range(databases)])
+
+    server_types = [item.value for item in utils.ServerTypeEnum]
+    connection_types = [item.value for item in utils.ConnectionTypeEnum]
+    _insert(session, models.ServerModel, [
+        dict(description=f'{prefix}-server-{index}', host=f'srv{index}.example.com', port=22,
+             server_type_id=generator.choice(server_types),
+             connection_type=generator.choice(connection_types))
+        for index in range(servers)])
+
+    session.commit()
+    return dict(groups=groups, users=users, user_grp=len(membership_rows),
+                databases=databases, servers=servers)
+
+
+def _insert(session, model, rows: list) -> list:
+    """Inserts the rows in chunks and returns the ids generated."""
+    if not rows:
+        return []
+
+    last_id = session.query(model.id).order_by(model.id.desc()).limit(1).scalar() or 0
+    for start in range(0, len(rows), 500):
+        session.execute(model.__table__.insert(), rows[start:start + 500])
+
+    # the sequences of PostgreSQL can skip ids, as the ones of the rows deleted
+    return [row.id for row in session.query(model.id).where(model.id > last_id)
+            .order_by(model.id)]
@@ -0,0 +1,161 @@
+"""In-process WSGI load driver, measures the throughput and the latency of the endpoints.
+
+The requests are sent directly to the WSGI app, without network and without gunicorn,
+so the measures only reflect the cost of the api itself.
+
+Example:
+    python tests/benchmarks/load.py --requests 500 --databases 5000
+    python tests/benchmarks/load.py --save-baseline
+    python tests/benchmarks/load.py --compare --tolerance 0.25
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../src')))
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from werkzeug.test import run_wsgi_app, EnvironBuilder
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baselines', 'load.json')
+
+DEFAULT_ENDPOINTS = (
+    '/database_types/',
+    '/groups/',
+    '/users/',
+    '/databases/',
+    '/databases/1',
+)
+
+
+def percentile(values: list, percent: float) -> float:
+    """Returns the percentile of a sorted list using the nearest rank."""
+    index = max(0, min(len(values) - 1, int(round(percent / 100 * len(values))) - 1))
+    return values[index]
+
+
+def run_load(app, path: str, requests: int, headers: dict, method: str = 'GET') -> dict:
+    """Sends the requests to the app sequentially and returns the measures.
+
+    :param app: flask app
+    :type app: Flask
+    :param path: path of the endpoint
+    :type path: str
+    :param requests: number of requests
+    :type requests: int
+    :param headers: headers of the requests
+    :type headers: dict
+    :param method: http method
+    :type method: str
+    :return: throughput in requests per second and latencies in milliseconds
+    :rtype: dict
+    """
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        environ = EnvironBuilder(path=path, method=method, headers=headers).get_environ()
+        request_start = time.perf_counter()
+        app_iter, status, _ = run_wsgi_app(app.wsgi_app, environ, buffered=True)
+        latencies.append((time.perf_counter() - request_start) * 1000)
+        if not status.startswith('2'):
+            errors += 1
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return dict(
+        requests=requests,
+        errors=errors,
+        throughput=round(requests / elapsed, 2),
+        p50_ms=round(percentile(latencies, 50), 3),
+        p90_ms=round(percentile(latencies, 90), 3),
+        p99_ms=round(percentile(latencies, 99), 3),
+        max_ms=round(latencies[-1], 3),
+    )
+
+
+def compare_with_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compares the results with the baseline, returning the regressions found.
+
+    :param results: results by endpoint
+    :type results: dict
+    :param baseline: baseline results by endpoint
+    :type baseline: dict
+    :param tolerance: allowed regression, 0.25 means 25% slower
+    :type tolerance: float
+    :return: list with the regression messages
+    :rtype: list
+    """
+    regressions = []
+    for path, result in results.items():
+        if path not in baseline:
+            continue
+
+        expected = baseline[path]['p50_ms']
+        if result['p50_ms'] > expected * (1 + tolerance):
+            regressions.append(f'{path}: p50 {result["p50_ms"]}ms, baseline {expected}ms')
+
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    """Entrypoint of the load driver."""
+    parser = argparse.ArgumentParser(description='In-process load test of the api.')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--groups', type=int, default=10)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--databases', type=int, default=1000)
+    parser.add_argument('--servers', type=int, default=1000)
+    parser.add_argument('--endpoint', action='append', help='endpoint to be tested')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    # the load test measures the api itself, it would be throttled by the rate limit
+    os.environ.setdefault('API_RATE_LIMIT_ENABLED', '0')
+
+    import main as api
+    from inventory import generate_inventory
+
+    app = api.main(cwd=tempfile.mkdtemp())
+    inventory = generate_inventory(app.session, groups=args.groups, users=args.users,
+                                   databases=args.databases, servers=args.servers)
+    print(f'inventory: {inventory}')
+
+    credentials = base64.b64encode(b'admin:admin').decode('utf-8')
+    headers = {'Authorization': f'Basic {credentials}'}
+
+    results = {}
+    for path in args.endpoint or DEFAULT_ENDPOINTS:
+        results[path] = run_load(app, path, args.requests, headers)
+        result = results[path]
+        print(f'{path:<25} {result["throughput"]:>9} req/s  p50={result["p50_ms"]}ms '
+              f'p90={result["p90_ms"]}ms p99={result["p99_ms"]}ms max={result["max_ms"]}ms '
+              f'errors={result["errors"]}')
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_FILE), exist_ok=True)
+        with open(BASELINE_FILE, 'w') as file:
+            json.dump(dict(inventory=inventory, results=results), file, indent=2)
+
+    if args.compare:
+        with open(BASELINE_FILE) as file:
+            baseline = json.load(file)['results']
+
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+pytest.importorskip('pytest_benchmark')
+
+from database import models
+from inventory import generate_inventory
+from load import run_load
+
+
+@pytest.fixture(scope='module')
+def inventory(app):
+    return generate_inventory(app.session, groups=10, users=100, databases=1000, servers=1000,
+                              seed=31)
+
+
+def test_basic_get(benchmark, app, auth_headers, inventory):
+    from server import utils
+
+    with app.test_request_context(headers=auth_headers):
+        result = benchmark(utils.basic_get, app.session, models.DatabaseModel, 'Databases')
+
+    assert len(result['database']) >= inventory['databases']
+
+
+def test_basic_post(benchmark, app, auth_headers, inventory):
+    from server import utils
+
+    counter = itertools.count()
+
+    def post():
+        body = f'{{"description": "benchmark-group-{next(counter)}"}}'
+        with app.test_request_context(method='POST', data=body, headers=auth_headers):
+            from flask import request
+            return utils.basic_post(app.session, request, models.GroupModel)
+
+    result = benchmark(post)
+    assert result['success'] == 'Registered successfully'
+
+
+def test_verify(benchmark, app, monkeypatch):
+    from server.authentication import verify
+
+    # the rate limit of the user is charged by verify, the benchmark would be throttled
+    monkeypatch.setattr(app.rate_limiter, 'enabled', False)
+    with app.test_request_context():
+        assert benchmark(verify, 'admin', 'admin')
+
+
+def test_to_json(benchmark, app, inventory):
+    rows = app.session.query(models.UserGroupModel).limit(100).all()
+
+    result = benchmark(lambda: [row.to_json(app.session) for row in rows])
+    assert len(result) == 100
+
+
+def test_load_databases(app, auth_headers, inventory):
+    result = run_load(app, '/databases/', 20, auth_headers)
+
+    assert result['errors'] == 0
+    assert result['p50_ms'] <= result['p99_ms']
+
+
+def test_export_servers(benchmark, app, auth_headers, inventory):
+    client = app.test_client()
+
+    def export():
+        # the response is streamed, it is only rendered when the body is read
+        response = client.get('/servers/export?format=ini', headers=auth_headers)
+        return response.status_code, response.text
+
+    # few rounds, each one is a request counted by the rate limit
+    status, text = benchmark.pedantic(export, rounds=5)
+    assert status == 200
+    assert text.count('ansible_host=') >= inventory['servers']
+
+
+@pytest.fixture(scope='module')
+def large_database(tmp_path_factory):
+    """Database of BENCHMARK_BACKUP_MB megabytes, set it to a few GB to measure the
+    throughput of the backups on a production sized file."""
+    import sqlite3
+
+    size_mb = int(os.getenv('BENCHMARK_BACKUP_MB', 64))
+    path = str(tmp_path_factory.mktemp('backup') / 'api.db')
+    connection = sqlite3.connect(path)
+    # the same journal mode of the api database
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, value BLOB)')
+    for _ in range(size_mb):
+        # 1MB by batch, half random to have something to compress
+        connection.execute('INSERT INTO item (value) SELECT randomblob(2048) || zeroblob(2048) '
+                           'FROM (WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 '
+                           'FROM n WHERE x < 256) SELECT x FROM n)')
+        connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_backup_throughput(benchmark, tmp_path, large_database, compress):
+    from database import backup
+
+    output = str(tmp_path / ('api.db.gz' if compress else 'api.db'))
+    result = benchmark.pedantic(backup.create_backup, args=(large_database, output),
+                                rounds=3)
+
+    size_mb = os.path.getsize(large_database) / 1024 / 1024
+    benchmark.extra_info['source_mb'] = round(size_mb, 1)
+    benchmark.extra_info['mb_per_second'] = round(size_mb / benchmark.stats.stats.mean, 1)
+    assert result['bytes'] > 0
+
+
+def test_restore_throughput(benchmark, tmp_path, large_database):
+    from database import backup
+
+    snapshot = str(tmp_path / 'api.db')
+    backup.create_backup(large_database, snapshot)
+    target = str(tmp_path / 'restored.db')
+
+    benchmark.pedantic(backup.restore_backup, args=(snapshot, target), rounds=3)
+    size_mb = os.path.getsize(large_database) / 1024 / 1024
+    benchmark.extra_info['mb_per_second'] = round(size_mb / benchmark.stats.stats.mean, 1)
+
+
+def test_backup_while_writing(benchmark, tmp_path, large_database):
+    """The backup must finish while another connection writes, as the api does."""
+    import sqlite3
+    import threading
+    import time
+    from database import backup
+
+    stop = threading.Event()
+    writes = []
+
+    def write():
+        connection = sqlite3.connect(large_database, timeout=5)
+        while not stop.is_set():
+            connection.execute('INSERT INTO item (value) VALUES (randomblob(64))')
+            connection.commit()
+            writes.append(time.perf_counter())
+            time.sleep(0.01)
+        connection.close()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        output = str(tmp_path / 'api.db')
+        result = benchmark.pedantic(backup.create_backup, args=(large_database, output),
+                                    rounds=3)
+    finally:
+        stop.set()
+        writer.join()
+
+    # the writer was not blocked by the copies
+    gaps = [after - before for before, after in zip(writes, writes[1:])]
+    benchmark.extra_info['writes'] = len(writes)
+    benchmark.extra_info['max_write_gap_ms'] = round(max(gaps) * 1000, 1)
+    assert result['bytes'] > 0
+    assert max(gaps) < 1
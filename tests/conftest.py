@@ -0,0 +1,40 @@
+import base64
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+
+@pytest.fixture(scope='session')
+def database_url():
+    """Runs the tests on the postgresql of TEST_DATABASE_URL when it is set, the database
+    is recreated, so it must be a throwaway one. Defaults to a new sqlite file."""
+    url = os.getenv('TEST_DATABASE_URL')
+    if url:
+        from sqlalchemy import create_engine
+        from database import models
+
+        engine = create_engine(url)
+        models.Base.metadata.drop_all(engine)
+        engine.dispose()
+    return url
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory, database_url):
+    """The app is a singleton, so it is created only once for all the tests."""
+    import main
+    return main.main(cwd=str(tmp_path_factory.mktemp('api')), database_url=database_url)
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def auth_headers():
+    credentials = base64.b64encode(b'admin:admin').decode('utf-8')
+    return {'Authorization': f'Basic {credentials}'}
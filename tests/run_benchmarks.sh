@@ -0,0 +1,17 @@
+# compares the micro benchmarks and the load test with the baselines of this machine, the
+# baselines are not versioned since the timings depend on the hardware, so on the first
+# run they are created on tests/benchmarks/baselines and the next runs are compared with
+# them, remove the directory to create them again
+BASELINES=tests/benchmarks/baselines
+
+if [ ! -f "$BASELINES/load.json" ]; then
+    echo "creating the local baselines on $BASELINES"
+    pytest tests/benchmarks --benchmark-only --benchmark-storage="file://$BASELINES" \
+    --benchmark-save=baseline && \
+    python tests/benchmarks/load.py --save-baseline
+    exit $?
+fi
+
+pytest tests/benchmarks --benchmark-only --benchmark-storage="file://$BASELINES" \
+--benchmark-compare --benchmark-compare-fail=median:25% && \
+python tests/benchmarks/load.py --compare --tolerance 0.25
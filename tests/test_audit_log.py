@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from database import models
+from server import audit_log
+
+
+def test_audit_entries_are_written_after_the_commit(app, client, auth_headers):
+    response = client.post('/groups/', headers=auth_headers, json=dict(description='audited'))
+    group_id = response.json['id']
+    client.put(f'/groups/{group_id}', headers=auth_headers, json=dict(description='audited 2'))
+
+    app.audit_writer.flush()
+
+    response = client.get(f'/audit?entity=groups&entity_id={group_id}', headers=auth_headers)
+    entries = response.json['audit_log']
+    assert [entry['operation'] for entry in entries] == ['update', 'create']
+    assert entries[0]['username'] == 'admin'
+    assert entries[0]['before'] == dict(description='audited')
+    assert entries[0]['after'] == dict(description='audited 2')
+    assert entries[1]['after']['description'] == 'audited'
+
+    start = (datetime.now() - timedelta(minutes=1)).isoformat()
+    response = client.get(f'/audit?user=admin&start={start}&limit=1', headers=auth_headers)
+    assert len(response.json['audit_log']) == 1
+
+    assert client.get('/audit?start=yesterday', headers=auth_headers).status_code == 401
+
+
+def test_rolled_back_changes_are_not_audited(app):
+    audit_log.stage(app.session, 'groups', 0, 'create', after=dict(description='rollback'))
+    app.session.rollback()
+    app.session.commit()
+
+    assert app.audit_writer.flush() == 0
+
+
+def test_passwords_are_masked(app):
+    login = models.LoginModel('audit', 'secret', 1)
+    app.session.add(login)
+    app.session.commit()
+    assert audit_log.row_values(login)['password'] == audit_log.MASK
+
+    login.password = models.encript_password('other')
+    assert audit_log.row_diff(login) == (dict(password=audit_log.MASK),
+                                         dict(password=audit_log.MASK))
+    app.session.rollback()
@@ -0,0 +1,55 @@
+import base64
+from datetime import date
+
+from database import models
+from server import authentication
+
+
+def test_legacy_password_is_rehashed_on_login(app):
+    app.session.execute(models.UserModel.__table__.insert().values(
+        name='legacy-user', password=models.legacy_password_hash('Legacy-password-1'),
+        creation_date=date.today(), update_date=date.today()))
+    app.session.commit()
+
+    with app.test_request_context():
+        assert not authentication.verify('legacy-user', 'wrong-password')
+        assert authentication.verify('legacy-user', 'Legacy-password-1')
+
+    user = app.session.query(models.UserModel).where(models.UserModel.name == 'legacy-user').one()
+    assert user.password.startswith('pbkdf2_sha256$')
+    assert user.validate_password('Legacy-password-1')
+
+
+def test_verified_credentials_are_cached(app, monkeypatch):
+    with app.test_request_context():
+        assert authentication.verify('admin', 'admin')
+
+        # a cache hit does not check the password hash again
+        monkeypatch.setattr(models.UserModel, 'validate_password', lambda *args: False)
+        assert authentication.verify('admin', 'admin')
+        assert not authentication.verify('admin', 'other-password')
+
+        authentication.invalidate_credentials('admin')
+        assert not authentication.verify('admin', 'admin')
+
+
+def basic_auth(username, password):
+    credentials = base64.b64encode(f'{username}:{password}'.encode('utf-8')).decode('utf-8')
+    return {'Authorization': f'Basic {credentials}'}
+
+
+def test_password_change_invalidates_cached_credentials(client, auth_headers):
+    response = client.post('/users/', headers=auth_headers,
+                           json=dict(name='changing-user', password='First-password-1'))
+    user_id = response.json['id']
+
+    first = basic_auth('changing-user', 'First-password-1')
+    second = basic_auth('changing-user', 'Second-password-2')
+    assert client.get('/groups/', headers=first).status_code == 200
+
+    response = client.put(f'/users/{user_id}', headers=auth_headers,
+                          json=dict(name='changing-user', password='Second-password-2'))
+    assert response.status_code == 200
+
+    assert client.get('/groups/', headers=first).status_code == 401
+    assert client.get('/groups/', headers=second).status_code == 200
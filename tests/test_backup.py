@@ -0,0 +1,98 @@
+import os
+import sqlite3
+
+import pytest
+
+from database import backup
+
+
+def create_database(path, rows):
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE IF NOT EXISTS item (id INTEGER PRIMARY KEY, value TEXT)')
+    connection.execute('DELETE FROM item')
+    connection.executemany('INSERT INTO item (value) VALUES (?)',
+                           [(f'value {index}' * 20, ) for index in range(rows)])
+    connection.commit()
+    connection.close()
+
+
+def count_rows(path):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute('SELECT COUNT(*) FROM item').fetchone()[0]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize('name', ['api.db', 'api.db.gz'])
+def test_backup_and_restore(tmp_path, name):
+    database = str(tmp_path / 'api.db')
+    create_database(database, 2000)
+
+    output = str(tmp_path / 'backups' / name)
+    result = backup.create_backup(database, output)
+    assert result['pages'] > 16
+    assert result['bytes'] == os.path.getsize(output)
+    assert os.listdir(tmp_path / 'backups') == [name]
+
+    create_database(database, 10)
+    backup.restore_backup(output, database)
+    assert count_rows(database) == 2000
+
+
+def test_restore_rejects_invalid_snapshot(tmp_path):
+    database = str(tmp_path / 'api.db')
+    create_database(database, 10)
+    for name in ('invalid.db', 'invalid.db.gz'):
+        (tmp_path / name).write_bytes(b'not a database' * 100)
+        with pytest.raises(ValueError):
+            backup.restore_backup(str(tmp_path / name), database)
+
+    assert count_rows(database) == 10
+    assert sorted(os.listdir(tmp_path)) == ['api.db', 'invalid.db', 'invalid.db.gz']
+
+
+def test_backup_command_line(tmp_path, capsys):
+    database = str(tmp_path / 'api.db')
+    create_database(database, 100)
+
+    assert backup.main(['create', '--database', database]) == 0
+    output = os.path.join(tmp_path, 'backups', os.listdir(tmp_path / 'backups')[0])
+    assert backup.main(['restore', '--database', database, '--input', output]) == 0
+    assert backup.main(['restore', '--database', database, '--input', database + '-']) == 1
+    assert 'restored' in capsys.readouterr().out
+
+
+def test_backup_endpoint(app, client, auth_headers):
+    if not app.database_path:
+        pytest.skip('the backups are only taken of sqlite databases')
+
+    response = client.post('/admin/backups', headers=auth_headers, json=dict(compress=True))
+    name = response.json['name']
+    assert name.endswith('.db.gz')
+    app.backup_thread.join()
+
+    response = client.get('/admin/backups', headers=auth_headers)
+    assert response.json['running'] is False
+    assert name in [item['name'] for item in response.json['backups']]
+
+
+def test_restore_drops_the_cached_lists(app, client, auth_headers, tmp_path):
+    if not app.database_path:
+        pytest.skip('the backups are only taken of sqlite databases')
+
+    snapshot = str(tmp_path / 'api.db')
+    backup.create_backup(app.database_path, snapshot)
+
+    client.post('/groups/', headers=auth_headers, json=dict(description='before_restore'))
+    groups = client.get('/groups/', headers=auth_headers).json['groups']
+    assert 'before_restore' in [group['description'] for group in groups]
+
+    backup.restore_backup(snapshot, app.database_path)
+    client.post('/groups/', headers=auth_headers, json=dict(description='after_restore'))
+
+    # the versions of the restore are past the ones cached before it
+    groups = client.get('/groups/', headers=auth_headers).json['groups']
+    descriptions = [group['description'] for group in groups]
+    assert 'after_restore' in descriptions
+    assert 'before_restore' not in descriptions
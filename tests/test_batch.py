@@ -0,0 +1,47 @@
+from database import models
+from server import batch
+
+
+def test_resolve_references():
+    results = [dict(status=200, body=dict(id=7)), dict(status=200, body=dict(id=9))]
+    assert batch.resolve({'group_id': '$0.id', 'ids': ['$1.id']}, results) == \
+        {'group_id': 7, 'ids': [9]}
+    assert batch.resolve('/groups/$1.id', results) == '/groups/9'
+
+
+def test_batch_runs_on_a_single_transaction(app, client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json=dict(operations=[
+        dict(method='POST', path='/groups/', body=dict(description='batch group')),
+        dict(method='POST', path='/users/', body=dict(name='batch_user',
+                                                      password='Batch-Passw0rd!')),
+        dict(method='POST', path='/user_groups/', body=dict(group_id='$0.id',
+                                                            user_id='$1.id')),
+        dict(method='GET', path='/groups/$0.id'),
+    ]))
+    assert response.status_code == 200
+
+    results = response.json['results']
+    assert [result['status'] for result in results] == [200, 200, 200, 200]
+    assert results[3]['body']['description'] == 'batch group'
+    assert app.session.query(models.UserGroupModel)\
+        .where(models.UserGroupModel.group_id == results[0]['body']['id'])\
+        .where(models.UserGroupModel.user_id == results[1]['body']['id']).count() == 1
+
+
+def test_batch_rolled_back_on_failure(app, client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json=dict(operations=[
+        dict(method='POST', path='/groups/', body=dict(description='rolled back')),
+        dict(method='GET', path='/groups/0'),
+    ]))
+    assert response.status_code == 401
+    assert response.json['results'][1]['status'] == 401
+    assert app.session.query(models.GroupModel)\
+        .where(models.GroupModel.description == 'rolled back').count() == 0
+
+    for operations in ([], [dict(path='/auth/token', method='POST')],
+                       [dict(path='/groups/$3.id')], [dict(path='/groups/', method='PATCH')]):
+        response = client.post('/batch', headers=auth_headers, json=dict(operations=operations))
+        assert response.status_code == 401
+
+    response = client.post('/batch', json=dict(operations=[dict(path='/groups/')]))
+    assert response.status_code == 401
@@ -0,0 +1,106 @@
+from sqlalchemy import event
+
+from database import models
+from server import cache, versions
+
+
+def test_type_tables_served_from_memory(app, client, auth_headers, monkeypatch):
+    monkeypatch.setattr(cache, 'VERSION_CHECK_INTERVAL', 3600)
+    # warms up the cache
+    client.get('/server_types/', headers=auth_headers)
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(app.engine, 'before_cursor_execute', count_statement)
+    try:
+        listed = client.get('/server_types/', headers=auth_headers).json['server_type']
+        single = client.get(f'/server_types/{listed[0]["id"]}', headers=auth_headers).json
+        missing = client.get('/server_types/0', headers=auth_headers)
+    finally:
+        event.remove(app.engine, 'before_cursor_execute', count_statement)
+
+    assert single == listed[0]
+    assert missing.status_code == 401
+    assert not [statement for statement in statements
+                if 'server_type' in statement or 'table_version' in statement]
+
+
+def test_write_refreshes_the_cache(app, client, auth_headers, monkeypatch):
+    monkeypatch.setattr(cache, 'VERSION_CHECK_INTERVAL', 3600)
+    client.get('/connection_types/', headers=auth_headers)
+    version = versions.get_versions(app.session, ['connection_type'])['connection_type']
+
+    response = client.post('/connection_types/', headers=auth_headers,
+                           json=dict(description='cached'))
+    type_id = response.json['id']
+
+    assert versions.get_versions(app.session, ['connection_type'])['connection_type'] == \
+        version + 1
+    listed = client.get('/connection_types/', headers=auth_headers).json['connection_type']
+    assert 'cached' in [row['description'] for row in listed]
+    assert app.type_cache.exists(app.session, models.ConnectionTypeModel, type_id)
+
+
+def test_version_check_reloads_tables_changed_by_other_workers(app):
+    type_cache = cache.TypeCache()
+    assert type_cache.exists(app.session, models.FunctionTypeModel, 1)
+
+    # a change made by another worker only increments the version on the database
+    table = models.TableVersionModel.__table__
+    versions.mark_changed(app.session, 'function_type')
+    app.session.commit()
+
+    assert 'function_type' in type_cache.rows
+    type_cache.check_versions(app.session, force=True)
+    assert 'function_type' not in type_cache.rows
+    assert type_cache.exists(app.session, models.FunctionTypeModel, 1)
+    assert type_cache.versions['function_type'] == app.session.execute(
+        table.select().where(table.c.table_name == 'function_type')).one().version
+
+
+def test_responses_cached_until_the_table_changes(app, client, auth_headers):
+    client.get('/groups/', headers=auth_headers)
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(app.engine, 'before_cursor_execute', count_statement)
+    try:
+        cached = client.get('/groups/', headers=auth_headers).json['groups']
+    finally:
+        event.remove(app.engine, 'before_cursor_execute', count_statement)
+
+    assert not [statement for statement in statements if 'FROM groups' in statement]
+
+    client.post('/groups/', headers=auth_headers, json=dict(description='response cache'))
+    listed = client.get('/groups/', headers=auth_headers).json['groups']
+    assert len(listed) == len(cached) + 1
+
+    # a change made by another worker is seen through the version of the table
+    versions.mark_changed(app.session, 'groups')
+    app.session.commit()
+    key = next(key for key in app.response_cache.entries if key[0] == '/groups/')
+    assert app.response_cache.get(key, tuple(
+        versions.get_versions(app.session, ['groups']).values())) is None
+
+
+def test_response_cache_evicts_least_recently_used():
+    response_cache = cache.ResponseCache(lambda: (), max_bytes=10)
+    response_cache.put('a', (1, ), b'aaaa')
+    response_cache.put('b', (1, ), b'bbbb')
+    assert response_cache.get('a', (1, )) == b'aaaa'
+
+    response_cache.put('c', (1, ), b'cccc')
+    assert response_cache.get('b', (1, )) is None
+    assert response_cache.get('a', (1, )) == b'aaaa'
+    assert response_cache.size == 8
+
+    response_cache.put('d', (1, ), b'd' * 11)
+    assert response_cache.get('d', (1, )) is None
+    assert response_cache.get('a', (2, )) is None
+    assert response_cache.size == 4
@@ -0,0 +1,105 @@
+import base64
+
+from database import models
+from server import changes
+
+
+def test_change_feed(app, client, auth_headers):
+    since = changes.last_sequence(app.session)
+
+    response = client.post('/groups/', headers=auth_headers, json=dict(description='feed'))
+    group_id = response.json['id']
+    client.put(f'/groups/{group_id}', headers=auth_headers, json=dict(description='feed 2'))
+    client.delete(f'/groups/{group_id}', headers=auth_headers)
+
+    response = client.get(f'/changes?since={since}', headers=auth_headers)
+    assert [(change['entity'], change['entity_id'], change['operation'])
+            for change in response.json['changes']] == [
+        ('groups', group_id, 'create'), ('groups', group_id, 'update'),
+        ('groups', group_id, 'delete')]
+
+    last_seq = response.json['last_seq']
+    response = client.get(f'/changes?since={last_seq}&wait=0.1', headers=auth_headers)
+    assert response.json == dict(changes=[], last_seq=last_seq)
+
+    assert client.get('/changes?since=a', headers=auth_headers).status_code == 401
+    for wait in ('nan', 'inf', '-inf', 'a'):
+        response = client.get(f'/changes?since={last_seq}&wait={wait}', headers=auth_headers)
+        assert response.status_code == 401
+    response = client.get(f'/changes?since={last_seq}&wait=-5', headers=auth_headers)
+    assert response.json == dict(changes=[], last_seq=last_seq)
+
+
+def test_change_stream(app, client, auth_headers, monkeypatch):
+    monkeypatch.setattr(changes, 'MAX_WAIT', 0.2)
+    since = changes.last_sequence(app.session)
+    client.post('/groups/', headers=auth_headers, json=dict(description='stream'))
+
+    headers = dict(auth_headers, **{'Last-Event-ID': str(since)})
+    response = client.get('/changes/stream', headers=headers)
+    assert response.mimetype == 'text/event-stream'
+
+    text = response.get_data(as_text=True)
+    assert text.startswith('retry: ')
+    assert f'id: {since + 1}\nevent: change\ndata: ' in text
+    assert '"entity": "groups"' in text
+
+
+def test_changes_are_written_on_the_commit(app):
+    since = changes.last_sequence(app.session)
+    group = models.GroupModel('rolled back')
+    app.session.add(group)
+    app.session.flush()
+    changes.record_change(app.session, group, changes.CREATED)
+    app.session.rollback()
+    assert changes.last_sequence(app.session) == since
+
+    group = models.GroupModel('committed')
+    app.session.add(group)
+    app.session.flush()
+    changes.record_change(app.session, group, changes.CREATED)
+    assert changes.last_sequence(app.session) == since
+    app.session.commit()
+    assert [(row.entity, row.entity_id) for row in changes.get_changes(app.session, since)] \
+        == [('groups', group.id)]
+
+
+def test_changes_only_allowed_to_admin(app, client, auth_headers):
+    client.post('/users/', headers=auth_headers,
+                json=dict(name='changes_user', password='Changes-Passw0rd!'))
+    password = base64.b64encode(b'changes_user:Changes-Passw0rd!').decode('utf-8')
+    headers = {'Authorization': f'Basic {password}'}
+
+    assert client.get('/changes', headers=headers).status_code == 401
+    assert client.get('/changes/stream', headers=headers).status_code == 401
+
+
+def test_waiting_clients_are_limited(app, client, auth_headers, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'change_waiters', changes.WaiterSlots(str(tmp_path / 'waiter'), 1))
+    last_seq = changes.last_sequence(app.session)
+
+    # another worker waiting for changes holds the only slot
+    slot = app.change_waiters.acquire()
+    try:
+        response = client.get(f'/changes?since={last_seq}&wait=0.1', headers=auth_headers)
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '1'
+        assert client.get('/changes/stream', headers=auth_headers).status_code == 429
+
+        # the requests that don't wait are still answered
+        response = client.get(f'/changes?since={last_seq}', headers=auth_headers)
+        assert response.json == dict(changes=[], last_seq=last_seq)
+    finally:
+        changes.WaiterSlots.release(slot)
+
+    response = client.get(f'/changes?since={last_seq}&wait=0.1', headers=auth_headers)
+    assert response.json == dict(changes=[], last_seq=last_seq)
+
+    # the slot of a stream is released when the stream is closed
+    monkeypatch.setattr(changes, 'MAX_WAIT', 0.1)
+    response = client.get('/changes/stream', headers=auth_headers)
+    response.get_data()
+    response.close()
+    slot = app.change_waiters.acquire()
+    assert slot is not None
+    changes.WaiterSlots.release(slot)
@@ -0,0 +1,79 @@
+from sqlalchemy import event
+
+
+def test_connection_credentials(app, client, auth_headers):
+    response = client.post('/servers/', headers=auth_headers, json=dict(
+        description='deploy', host='deploy.local', port=2222,
+        server_type_id=1, connection_type=1))
+    server_id = response.json['id']
+
+    response = client.post('/logins/', headers=auth_headers, json=dict(
+        user='deployer', password='deploy-secret', connection_type=1))
+    assert response.status_code == 200
+    login_id = response.json['id']
+    assert 'password' not in client.get(f'/logins/{login_id}', headers=auth_headers).json
+
+    response = client.post('/connection_logins/', headers=auth_headers,
+                           json=dict(login_id=login_id, connection_id=server_id))
+    assert response.status_code == 200
+    connection_id = response.json['id']
+
+    response = client.post('/connection_logins/', headers=auth_headers,
+                           json=dict(login_id=login_id, connection_id=server_id))
+    assert response.status_code == 401
+
+    connections = client.get('/connection_logins/', headers=auth_headers).json
+    connection = [item for item in connections['connection_login']
+                  if item['id'] == connection_id][0]
+    assert connection['login']['user'] == 'deployer'
+    assert connection['connection']['host'] == 'deploy.local'
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(app.engine, 'before_cursor_execute', count_statement)
+    try:
+        response = client.get(f'/connections/{connection_id}/credentials', headers=auth_headers)
+    finally:
+        event.remove(app.engine, 'before_cursor_execute', count_statement)
+
+    assert response.status_code == 200
+    assert response.json == dict(id=connection_id, host='deploy.local', port=2222,
+                                 connection_type=1, user='deployer', password='deploy-secret')
+    assert len([statement for statement in statements if 'connection_login' in statement]) == 1
+
+    assert client.get('/connections/0/credentials', headers=auth_headers).status_code == 401
+
+    assert client.delete(f'/logins/{login_id}', headers=auth_headers).status_code == 200
+    response = client.get(f'/connections/{connection_id}/credentials', headers=auth_headers)
+    assert response.status_code == 401
+
+
+def test_server_delete_removes_its_connection_logins(app, client, auth_headers):
+    response = client.post('/servers/', headers=auth_headers, json=dict(
+        description='removed', host='removed.local', port=22,
+        server_type_id=1, connection_type=1))
+    server_id = response.json['id']
+
+    response = client.post('/logins/', headers=auth_headers, json=dict(
+        user='remover', password='remove-secret', connection_type=1))
+    login_id = response.json['id']
+
+    response = client.post('/connection_logins/', headers=auth_headers,
+                           json=dict(login_id=login_id, connection_id=server_id))
+    connection_id = response.json['id']
+    since = client.get('/changes', headers=auth_headers).json['last_seq']
+
+    assert client.delete(f'/servers/{server_id}', headers=auth_headers).status_code == 200
+
+    response = client.get(f'/connection_logins/{connection_id}', headers=auth_headers)
+    assert response.status_code == 401
+    connections = client.get('/connection_logins/', headers=auth_headers).json
+    assert connection_id not in [item['id'] for item in connections['connection_login']]
+
+    feed = client.get(f'/changes?since={since}', headers=auth_headers).json['changes']
+    assert dict(entity='connection_login', entity_id=connection_id, operation='delete') in [
+        dict(entity=item['entity'], entity_id=item['entity_id'], operation=item['operation'])
+        for item in feed]
@@ -3,9 +3,39 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
 
+from database import models
 from database import utils
 
 
 def test_pactical_test():
     print(utils.ServerTypeEnum.LINUX)
     assert 2 == 2
+
+
+def test_password_hash_is_salted():
+    first = models.password_hash('password')
+    second = models.password_hash('password')
+
+    assert first != second
+    assert first.startswith(f'pbkdf2_sha256${models.PASSWORD_ITERATIONS}$')
+    assert models.check_password('password', first)
+    assert not models.check_password('wrong', first)
+    assert not models.password_needs_rehash(first)
+
+
+def test_legacy_password_needs_rehash():
+    legacy = models.legacy_password_hash('password')
+
+    assert models.check_password('password', legacy)
+    assert not models.check_password('wrong', legacy)
+    assert models.password_needs_rehash(legacy)
+    assert models.password_needs_rehash(models.password_hash('password', iterations=1000))
+
+
+def test_encripted_password_is_reversible():
+    first = models.encript_password('password')
+    second = models.encript_password('password')
+
+    assert first != second
+    assert models.decript_password(first) == 'password'
+    assert models.decript_password(second) == 'password'
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from sqlalchemy import event
+
+from database import models
+from database import utils
+
+
+def count_rows(session):
+    return {
+        model.__tablename__: session.query(model).count()
+        for model in (models.ServerTypeModel, models.ConnectionTypeModel,
+                      models.DatabaseTypeModel, models.FunctionTypeModel, models.GroupModel,
+                      models.UserModel, models.UserGroupModel, models.FunctionPermissionsModel)
+    }
+
+
+EXPECTED_ROWS = {
+    'server_type': len(utils.ServerTypeEnum),
+    'connection_type': len(utils.ConnectionTypeEnum),
+    'database_type': len(utils.DatabaseEnum),
+    'function_type': len(utils.FunctionTypeEnum),
+    'groups': 1,
+    'user': 1,
+    'user_grp': 1,
+    'function_permissions': len(utils.FunctionTypeEnum),
+}
+
+
+def test_insert_types_is_idempotent(tmp_path):
+    _, session = utils.initiate_db(str(tmp_path))
+    assert count_rows(session) == EXPECTED_ROWS
+
+    utils.insert_types(session)
+    assert count_rows(session) == EXPECTED_ROWS
+    assert session.query(models.UserModel).first().validate_password('admin')
+
+
+def test_first_boot_seeding_benchmark(tmp_path):
+    statements = []
+
+    def count_statement(*args):
+        statements.append(args[2])
+
+    start = time.perf_counter()
+    engine, session = utils.initiate_db(str(tmp_path))
+    elapsed = time.perf_counter() - start
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    utils.insert_types(session)
+
+    # one insert by table, without any select to check the existing rows
+    assert len(statements) == 8
+    assert not any(statement.lstrip().upper().startswith('SELECT') for statement in statements)
+    assert elapsed < 2
+
+
+def initiate_worker(directory):
+    _, session = utils.initiate_db(directory)
+    session.close()
+
+
+def test_concurrent_workers_seed_once(tmp_path):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=initiate_worker, args=(str(tmp_path), ))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    _, session = utils.initiate_db(str(tmp_path))
+    assert count_rows(session) == EXPECTED_ROWS
+
+
+def test_initiate_db_with_database_url(tmp_path):
+    database = tmp_path / 'other.db'
+    engine, session = utils.initiate_db(str(tmp_path), database_url=f'sqlite:///{database}')
+
+    assert engine.url.database == str(database)
+    assert count_rows(session)['user'] == 1
+    assert not (tmp_path / 'api.db').exists()
+
+
+def test_postgresql_engine_pool():
+    pytest.importorskip('psycopg2')
+    from sqlalchemy.pool import QueuePool
+
+    engine = utils.create_database_engine('postgresql://api@localhost/api')
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == utils.POOL_SIZE
+    assert engine.pool._pre_ping
@@ -0,0 +1,51 @@
+from sqlalchemy import event
+
+from database import models
+
+
+def database(index, **kwargs):
+    return dict(dict(description=f'sync {index}', host=f'sync{index}.local', port=5432,
+                     sid=f'sid{index}', database_type_id=3), **kwargs)
+
+
+def test_sync_databases_by_natural_key(app, client, auth_headers):
+    records = [database(index) for index in range(5)]
+
+    response = client.put('/databases/', headers=auth_headers, json=dict(database=records))
+    assert response.json == dict(inserted=5, updated=0, unchanged=0)
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    records[0]['description'] = 'changed'
+    records.append(database(5))
+    event.listen(app.engine, 'before_cursor_execute', count_statement)
+    try:
+        response = client.put('/databases/', headers=auth_headers, json=dict(database=records))
+    finally:
+        event.remove(app.engine, 'before_cursor_execute', count_statement)
+
+    assert response.json == dict(inserted=1, updated=1, unchanged=4)
+    # the existing rows are loaded by one query, the other one gets the ids of the inserts,
+    # only sqlite quotes the table name
+    assert len([statement for statement in statements
+                if statement.replace('"', '').startswith('SELECT database.id AS database_id, ')
+                and 'database_description' in statement]) == 1
+
+    response = client.put('/databases/', headers=auth_headers, json=dict(database=records))
+    assert response.json == dict(inserted=0, updated=0, unchanged=6)
+
+    row = app.session.query(models.DatabaseModel)\
+        .where(models.DatabaseModel.host == 'sync0.local').one()
+    assert row.description == 'changed'
+
+    response = client.post('/databases/', headers=auth_headers, json=database(1))
+    assert response.status_code == 401
+
+    response = client.put('/databases/', headers=auth_headers,
+                          json=dict(database=[database(9, database_type_id=99)]))
+    assert response.status_code == 401
+    response = client.put('/databases/', headers=auth_headers, json=[database(9)])
+    assert response.status_code == 401
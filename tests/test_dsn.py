@@ -0,0 +1,47 @@
+from database.utils import DatabaseEnum
+from server import dsn
+
+
+def test_render_dsn_by_database_type():
+    assert dsn.render_dsn(DatabaseEnum.ORACLE.value, 'ora', 1521, 'ORCL') == 'ora:1521/ORCL'
+    assert dsn.render_dsn(DatabaseEnum.MYSQL.value, 'my', 3306, 'app') == 'mysql://my:3306/app'
+    assert dsn.render_dsn(DatabaseEnum.SQLITE.value, '', 0, '/var/app.db') == \
+        'sqlite:////var/app.db'
+    assert dsn.render_dsn(DatabaseEnum.MSSQL.value, 'sql', 1433, 'app') == \
+        'Server=sql,1433;Database=app'
+    # a value can't add attributes to the odbc connection string
+    assert dsn.render_dsn(DatabaseEnum.MSSQL.value, 'sql', 1433, 'app;Encrypt=no') == \
+        'Server=sql,1433;Database={app;Encrypt=no}'
+    assert dsn.render_dsn(DatabaseEnum.MSSQL.value, 'sql;UID=sa', 1433, 'a}b;') == \
+        'Server={sql;UID=sa,1433};Database={a}}b;}'
+    assert dsn.render_dsn(DatabaseEnum.REDIS.value, '::1', 6379, '0') == 'redis://[::1]:6379/0'
+    assert dsn.render_dsn(DatabaseEnum.MONGODB.value, 'mongo', 27017, 'a b') == \
+        'mongodb://mongo:27017/a%20b'
+    assert dsn.render_dsn(99, 'host', 1, 'sid') is None
+
+
+def test_dsn_endpoints(app, client, auth_headers):
+    ids = []
+    for sid in ('orders', 'billing'):
+        response = client.post('/databases/', headers=auth_headers, json=dict(
+            description=sid, host='pg.local', port=5432, sid=sid,
+            database_type_id=DatabaseEnum.POSTGRES.value))
+        ids.append(response.json['id'])
+
+    response = client.get(f'/databases/{ids[0]}/dsn', headers=auth_headers)
+    assert response.json['dsn'] == 'postgresql://pg.local:5432/orders'
+
+    response = client.put(f'/databases/{ids[0]}', headers=auth_headers, json=dict(
+        description='orders', host='mysql.local', port=3306, sid='orders',
+        database_type_id=DatabaseEnum.MYSQL.value))
+    assert response.status_code == 200
+
+    response = client.get(f'/databases/dsn?ids={ids[0]},{ids[1]}', headers=auth_headers)
+    assert [item['dsn'] for item in response.json['database']] == [
+        'mysql://mysql.local:3306/orders', 'postgresql://pg.local:5432/billing']
+
+    all_rows = client.get('/databases/dsn', headers=auth_headers).json['database']
+    assert set(ids) <= {item['id'] for item in all_rows}
+
+    assert client.get('/databases/dsn?ids=a', headers=auth_headers).status_code == 401
+    assert client.get('/databases/0/dsn', headers=auth_headers).status_code == 401
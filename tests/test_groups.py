@@ -0,0 +1,123 @@
+import base64
+
+from sqlalchemy import event
+
+from database import models
+
+
+def create_users(client, auth_headers, names):
+    ids = []
+    for name in names:
+        response = client.post('/users/', headers=auth_headers,
+                               json=dict(name=name, password='Members-Passw0rd!'))
+        ids.append(response.json['id'])
+    return ids
+
+
+def test_add_group_members(app, client, auth_headers):
+    group_id = client.post('/groups/', headers=auth_headers,
+                           json=dict(description='members')).json['id']
+    user_ids = create_users(client, auth_headers, [f'member_{index}' for index in range(4)])
+
+    response = client.post(f'/groups/{group_id}/members', headers=auth_headers,
+                           json=dict(user_ids=user_ids[:2]))
+    assert response.json == dict(inserted=2, existing=0)
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(app.engine, 'before_cursor_execute', count_statement)
+    try:
+        response = client.post(f'/groups/{group_id}/members', headers=auth_headers,
+                               json=dict(user_ids=user_ids + user_ids[:1]))
+    finally:
+        event.remove(app.engine, 'before_cursor_execute', count_statement)
+
+    assert response.json == dict(inserted=2, existing=2)
+    # the new pairs are inserted by a single statement
+    assert len([statement for statement in statements
+                if statement.startswith('INSERT INTO user_grp')]) == 1
+    assert app.session.query(models.UserGroupModel)\
+        .where(models.UserGroupModel.group_id == group_id).count() == 4
+
+    response = client.post(f'/groups/{group_id}/members', headers=auth_headers,
+                           json=dict(user_ids=[user_ids[0], 0]))
+    assert response.status_code == 401
+    assert response.json['user_ids'] == [0]
+
+    assert client.post('/groups/0/members', headers=auth_headers,
+                       json=dict(user_ids=user_ids)).status_code == 401
+    assert client.post(f'/groups/{group_id}/members', headers=auth_headers,
+                       json=dict(user_ids='a')).status_code == 401
+
+
+def test_grant_group_functions(app, client, auth_headers):
+    group_id = client.post('/groups/', headers=auth_headers,
+                           json=dict(description='functions')).json['id']
+
+    response = client.post(f'/groups/{group_id}/functions', headers=auth_headers,
+                           json=dict(function_ids=[1, 2, 2]))
+    assert response.json == dict(inserted=2, existing=0)
+
+    response = client.post(f'/groups/{group_id}/functions', headers=auth_headers,
+                           json=dict(function_ids=[2, 3]))
+    assert response.json == dict(inserted=1, existing=1)
+
+    response = client.post(f'/groups/{group_id}/functions', headers=auth_headers,
+                           json=dict(function_ids=[999]))
+    assert response.status_code == 401
+
+
+def test_duplicated_pairs_are_rejected(app, client, auth_headers):
+    group_id = client.post('/groups/', headers=auth_headers,
+                           json=dict(description='pairs')).json['id']
+    user_ids = create_users(client, auth_headers, ['pair_0', 'pair_1'])
+
+    response = client.post('/user_groups/', headers=auth_headers,
+                           json=dict(group_id=group_id, user_id=user_ids[0]))
+    first_id = response.json['id']
+    response = client.post('/user_groups/', headers=auth_headers,
+                           json=dict(group_id=group_id, user_id=user_ids[0]))
+    assert response.status_code == 401
+
+    # the check was only applied to the group before, so a second user was rejected
+    response = client.post('/user_groups/', headers=auth_headers,
+                           json=dict(group_id=group_id, user_id=user_ids[1]))
+    assert response.status_code == 200
+    second_id = response.json['id']
+    response = client.put(f'/user_groups/{second_id}', headers=auth_headers,
+                          json=dict(group_id=group_id, user_id=user_ids[0]))
+    assert response.status_code == 401
+    response = client.put(f'/user_groups/{first_id}', headers=auth_headers,
+                          json=dict(group_id=1, user_id=user_ids[1]))
+    assert response.json['register']['group']['id'] == 1
+
+    function_permission = client.post('/function_permissions/', headers=auth_headers,
+                                      json=dict(group_id=group_id, function_id=1)).json['id']
+    response = client.put(f'/function_permissions/{function_permission}', headers=auth_headers,
+                          json=dict(group_id=group_id, function_id=2))
+    assert response.json['register']['function']['id'] == 2
+
+
+def test_group_assignments_only_allowed_to_admin(app, client, auth_headers):
+    group_id = client.post('/groups/', headers=auth_headers,
+                           json=dict(description='escalation')).json['id']
+    [user_id] = create_users(client, auth_headers, ['escalating'])
+
+    password = base64.b64encode(b'escalating:Members-Passw0rd!').decode('utf-8')
+    headers = {'Authorization': f'Basic {password}'}
+
+    response = client.post(f'/groups/{group_id}/members', headers=headers,
+                           json=dict(user_ids=[user_id]))
+    assert response.status_code == 401
+    assert response.json['error'] == 'Only the admin group can change the group assignments'
+    response = client.post(f'/groups/{group_id}/functions', headers=headers,
+                           json=dict(function_ids=[1]))
+    assert response.status_code == 401
+
+    assert app.session.query(models.UserGroupModel)\
+        .where(models.UserGroupModel.group_id == group_id).count() == 0
+    assert app.session.query(models.FunctionPermissionsModel)\
+        .where(models.FunctionPermissionsModel.group_id == group_id).count() == 0
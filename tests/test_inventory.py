@@ -0,0 +1,127 @@
+import base64
+
+from database import models
+from server import inventory
+
+
+def test_export_servers(app, client, auth_headers):
+    response = client.post('/servers/', headers=auth_headers, json=dict(
+        description='web 01', host='web01.local', port=22,
+        server_type_id=1, connection_type=1))
+    server_id = response.json['id']
+    response = client.post('/groups/', headers=auth_headers, json=dict(description='web'))
+    group_id = response.json['id']
+    client.post('/server_permissions/', headers=auth_headers,
+                json=dict(group_id=group_id, server_id=server_id))
+
+    response = client.get('/servers/export', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert f'Host web_01-{server_id}\n    HostName web01.local\n    Port 22\n' in response.text
+
+    response = client.get('/servers/export?format=ini', headers=auth_headers)
+    lines = response.text.splitlines()
+    host_line = f'web_01-{server_id} ansible_host=web01.local ansible_port=22 ' \
+                'server_type=linux connection_type=ssh'
+    assert lines[lines.index('[web]') + 1] == host_line
+
+    response = client.get('/servers/export?format=yaml', headers=auth_headers)
+    assert response.text.startswith('all:\n  children:\n')
+    assert f'    web:\n      hosts:\n        web_01-{server_id}:\n' \
+           f'          ansible_host: "web01.local"\n' in response.text
+
+    assert client.get('/servers/export?format=csv', headers=auth_headers).status_code == 401
+
+
+def test_ungrouped_servers_are_exported():
+    Row = type('Row', (), {})
+    row = Row()
+    row.id, row.description, row.host, row.port = 1, 'db', 'db.local', 22
+    row.server_type, row.connection_type, row.group, row.group_id = 'LINUX', 'SSH', None, None
+
+    assert list(inventory.render_ini([row])) == [
+        '[ungrouped]\n',
+        'db-1 ansible_host=db.local ansible_port=22 server_type=linux connection_type=ssh\n']
+
+
+def test_export_rejects_injected_config(app, client, auth_headers):
+    server = dict(description='safe', host='10.0.0.1', port=22, server_type_id=1,
+                  connection_type=1)
+    for host in ('10.0.0.1\n    ProxyCommand sh -c id', '10.0.0.1 ansible_user=root',
+                 '10.0.0.1\tx', '10.0.0.1\x00', '', None):
+        response = client.post('/servers/', headers=auth_headers, json=dict(server, host=host))
+        assert response.status_code == 401
+
+    server_id = client.post('/servers/', headers=auth_headers, json=server).json['id']
+    response = client.put(f'/servers/{server_id}', headers=auth_headers,
+                          json=dict(server, host='10.0.0.1\nHost *'))
+    assert response.status_code == 401
+
+    # the description is only written on a comment, on a single line
+    response = client.put(f'/servers/{server_id}', headers=auth_headers,
+                          json=dict(server, description='injected\nHost *\n  User root'))
+    assert response.status_code == 200
+
+    response = client.get('/servers/export?format=ssh_config', headers=auth_headers)
+    lines = response.text.splitlines()
+    assert '# injected Host *   User root (LINUX)' in lines
+    assert 'Host *' not in lines
+    assert not any('ProxyCommand' in line or line.strip() == 'User root' for line in lines)
+
+    response = client.get('/servers/export?format=ini', headers=auth_headers)
+    assert 'ansible_user' not in response.text
+
+
+def test_export_cleans_stored_hosts():
+    Row = type('Row', (), {})
+    row = Row()
+    row.id, row.description, row.host, row.port = 1, 'db\nHost *', 'db\n  ProxyCommand x', 22
+    row.server_type, row.connection_type, row.group, row.group_id = 'LINUX', 'SSH', None, None
+
+    assert list(inventory.render_ssh_config([row])) == [
+        '# db Host * (LINUX)\n', 'Host db_Host__-1\n', '    HostName dbProxyCommandx\n',
+        '    Port 22\n\n']
+
+
+def test_export_lists_only_the_caller_groups(app, client, auth_headers):
+    server_id = client.post('/servers/', headers=auth_headers, json=dict(
+        description='shared', host='shared.local', port=22, server_type_id=1,
+        connection_type=1)).json['id']
+
+    group = models.GroupModel('exporters')
+    other_group = models.GroupModel('secret team')
+    user = models.UserModel('exporter', 'Exporter-pass1')
+    app.session.add_all([group, other_group, user])
+    app.session.commit()
+    app.session.add(models.UserGroupModel(group.id, user.id))
+    app.session.commit()
+    for group_id in (group.id, other_group.id):
+        client.post('/server_permissions/', headers=auth_headers,
+                    json=dict(group_id=group_id, server_id=server_id))
+
+    credentials = base64.b64encode(b'exporter:Exporter-pass1').decode('utf-8')
+    headers = {'Authorization': f'Basic {credentials}'}
+    for export_format in ('ini', 'yaml'):
+        response = client.get(f'/servers/export?format={export_format}', headers=headers)
+        assert 'exporters' in response.text
+        assert 'secret' not in response.text
+        assert response.text.count(f'shared-{server_id}') == 1
+
+    response = client.get('/servers/export?format=ini', headers=auth_headers)
+    assert '[secret_team]' in response.text
+
+
+def test_group_names_are_unique():
+    Row = type('Row', (), {})
+    rows = []
+    for group_id, group in ((None, None), (1, 'ungrouped'), (2, 'web 1'), (3, 'web_1'),
+                            (4, 'web_1')):
+        row = Row()
+        row.id, row.description, row.host, row.port = len(rows), 'db', 'db.local', 22
+        row.server_type, row.connection_type = 'LINUX', 'SSH'
+        row.group, row.group_id = group, group_id
+        rows.append(row)
+
+    groups = [line for line in inventory.render_yaml(rows) if line.endswith(':\n      hosts:\n')]
+    assert [line.split(':')[0].strip() for line in groups] == [
+        'ungrouped', 'ungrouped_2', 'web_1', 'web_1_2', 'web_1_3']
@@ -0,0 +1,58 @@
+import base64
+
+from database import models
+from server import authentication
+from server import login_guard
+from server.login_guard import LoginGuard
+
+
+def test_user_is_locked_after_failures(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('server.login_guard.time.time', lambda: now[0])
+    guard = LoginGuard()
+
+    for _ in range(login_guard.MAX_FAILURES['user'] - 1):
+        guard.register_failure('user', '10.0.0.1')
+    assert guard.retry_after('user', '10.0.0.1') == 0
+
+    guard.register_failure('user', '10.0.0.1')
+    assert guard.retry_after('user', '10.0.0.1') == login_guard.LOCKOUT_BASE
+    assert guard.retry_after('other-user', '10.0.0.2') == 0
+
+    # the lock doubles on each new failure
+    guard.register_failure('user', '10.0.0.1')
+    assert guard.retry_after('user', '10.0.0.1') == login_guard.LOCKOUT_BASE * 2
+
+    now[0] += login_guard.LOCKOUT_BASE * 2
+    assert guard.retry_after('user', '10.0.0.1') == 0
+
+
+def test_flush_shares_locks_between_workers(app):
+    guard = LoginGuard()
+    for _ in range(login_guard.MAX_FAILURES['user']):
+        guard.register_failure('flushed-user', '10.0.0.3')
+
+    assert app.session.query(models.LoginFailureModel).count() == 0
+    guard.flush(app.session, force=True)
+    assert app.session.query(models.LoginFailureModel).count() == 2
+
+    other_worker = LoginGuard()
+    other_worker.flush(app.session, force=True)
+    assert other_worker.retry_after('flushed-user', '10.0.0.4') > 0
+
+    guard.register_success('flushed-user', '10.0.0.3')
+    guard.flush(app.session, force=True)
+    assert app.session.query(models.LoginFailureModel).count() == 1
+
+
+def test_locked_login_returns_429(app, client, monkeypatch):
+    monkeypatch.setattr(authentication, 'login_guard', LoginGuard())
+    credentials = base64.b64encode(b'admin:wrong-password').decode('utf-8')
+    headers = {'Authorization': f'Basic {credentials}'}
+
+    for _ in range(login_guard.MAX_FAILURES['user']):
+        assert client.get('/groups/', headers=headers).status_code == 401
+
+    response = client.get('/groups/', headers=headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
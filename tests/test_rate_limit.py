@@ -0,0 +1,91 @@
+import base64
+
+from server.rate_limit import RateLimiter
+
+
+def test_token_bucket(tmp_path):
+    limiter = RateLimiter(str(tmp_path / 'rate_limit.db'))
+    limiter.limits = dict(user=(1, 3), ip=(100, 100))
+
+    assert [limiter.check('user', '10.0.0.1') for _ in range(3)] == [0, 0, 0]
+    assert limiter.check('user', '10.0.0.1') == 1
+    assert limiter.check('other-user', '10.0.0.1') == 0
+
+    # another process using the same file shares the buckets
+    other_worker = RateLimiter(str(tmp_path / 'rate_limit.db'))
+    other_worker.limits = limiter.limits
+    assert other_worker.check('user', '10.0.0.1') == 1
+
+    metrics = limiter.metrics()
+    assert metrics['throttled'] == 2
+    assert metrics['buckets'] == [dict(key='user:user', throttled=2)]
+
+
+def test_bucket_is_refilled(tmp_path, monkeypatch):
+    limiter = RateLimiter(str(tmp_path / 'rate_limit.db'))
+    limiter.limits = dict(user=(10, 1), ip=(100, 100))
+
+    now = [1000.0]
+    monkeypatch.setattr('server.rate_limit.time.time', lambda: now[0])
+
+    assert limiter.check('user', '10.0.0.1') == 0
+    assert limiter.check('user', '10.0.0.1') == 1
+    now[0] += 0.1
+    assert limiter.check('user', '10.0.0.1') == 0
+
+
+def test_throttled_request_returns_429(app, client, auth_headers, tmp_path, monkeypatch):
+    limiter = RateLimiter(str(tmp_path / 'rate_limit.db'))
+    limiter.limits = dict(user=(0.1, 2), ip=(100, 100))
+    monkeypatch.setattr(app, 'rate_limiter', limiter)
+
+    assert client.get('/groups/', headers=auth_headers).status_code == 200
+    assert client.get('/groups/', headers=auth_headers).status_code == 200
+
+    response = client.get('/groups/', headers=auth_headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '10'
+
+    response = client.get('/metrics/rate_limit', headers=auth_headers)
+    assert response.status_code == 429
+    assert limiter.metrics()['throttled'] == 2
+
+
+def test_user_bucket_charged_after_authentication(app, client, auth_headers, tmp_path,
+                                                  monkeypatch):
+    client.post('/users/', headers=auth_headers,
+                json=dict(name='limited_user', password='Limited-Passw0rd!'))
+
+    limiter = RateLimiter(str(tmp_path / 'rate_limit.db'))
+    limiter.limits = dict(user=(0.1, 2), ip=(100, 100))
+    monkeypatch.setattr(app, 'rate_limiter', limiter)
+
+    # the requests with a wrong password don't consume the bucket of the user
+    wrong_password = base64.b64encode(b'limited_user:wrong').decode('utf-8')
+    for _ in range(3):
+        response = client.get('/groups/', headers={'Authorization': f'Basic {wrong_password}'})
+        assert response.status_code == 401
+
+    password = base64.b64encode(b'limited_user:Limited-Passw0rd!').decode('utf-8')
+    assert client.get('/groups/', headers={'Authorization': f'Basic {password}'})\
+        .status_code == 200
+
+    # the bearer tokens share the bucket of the user
+    token = app.tokens.issue('limited_user')['token']
+    assert client.get('/groups/', headers={'Authorization': f'Bearer {token}'})\
+        .status_code == 200
+    response = client.get('/groups/', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 429
+    assert response.json['retry_after'] == 10
+
+
+def test_metrics_only_allowed_to_admin(app, client, auth_headers):
+    client.post('/users/', headers=auth_headers,
+                json=dict(name='metrics_user', password='Metrics-Passw0rd!'))
+
+    password = base64.b64encode(b'metrics_user:Metrics-Passw0rd!').decode('utf-8')
+    response = client.get('/metrics/rate_limit', headers={'Authorization': f'Basic {password}'})
+    assert response.status_code == 401
+    assert response.json['error'] == 'Only the admin group can read the metrics'
+
+    assert client.get('/metrics/rate_limit', headers=auth_headers).status_code == 200
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from database import backup
+from database import models
+from database.utils import create_database_engine, create_read_engine, create_session
+from database.utils import initiate_db
+from server import utils
+from server.routing import RecentWrites
+
+
+def test_read_engine_is_read_only(tmp_path):
+    engine, session = initiate_db(str(tmp_path))
+    read_engine = create_read_engine(engine)
+    assert read_engine is not engine
+
+    with read_engine.connect() as connection:
+        assert connection.execute('SELECT COUNT(*) FROM user').scalar() == 1
+        with pytest.raises(OperationalError):
+            connection.execute('DELETE FROM user')
+
+
+def test_recent_writes(tmp_path):
+    recent_writes = RecentWrites(str(tmp_path / 'recent_writes.db'), window=60)
+    assert not recent_writes.wrote_recently('admin')
+
+    recent_writes.mark('admin')
+    assert recent_writes.wrote_recently('admin')
+    assert not recent_writes.wrote_recently('other')
+
+    recent_writes.window = 0
+    assert not recent_writes.wrote_recently('admin')
+
+
+def test_reads_routed_to_read_engine(app, client, auth_headers, tmp_path, monkeypatch):
+    if app.read_engine is app.engine:
+        pytest.skip('the reads only have a separate engine on sqlite or with a replica')
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(app.read_engine, 'before_cursor_execute', count_statement)
+    try:
+        group_id = client.post('/groups/', headers=auth_headers,
+                               json=dict(description='routed')).json['id']
+        statements.clear()
+        response = client.get(f'/groups/{group_id}', headers=auth_headers)
+        assert response.json['description'] == 'routed'
+        assert any(statement.startswith('SELECT') for statement in statements)
+
+        # after a write the reads of the user stay on the primary for a few seconds
+        monkeypatch.setattr(app, 'recent_writes', RecentWrites(str(tmp_path / 'recent.db')))
+        app.recent_writes.mark('admin')
+        statements.clear()
+        response = client.get(f'/groups/{group_id}', headers=auth_headers)
+        assert response.json['description'] == 'routed'
+        assert statements == []
+    finally:
+        event.remove(app.read_engine, 'before_cursor_execute', count_statement)
+
+    # the read session does not keep a transaction open between the requests
+    assert not app.read_session.in_transaction()
+    assert app.session.query(models.GroupModel).get(group_id) is not None
+
+
+def test_lagging_replica_is_not_cached_as_current(app, client, auth_headers, tmp_path,
+                                                  monkeypatch):
+    if not app.database_path:
+        pytest.skip('the replica is simulated with a copy of the sqlite file')
+
+    # a copy of the database that does not get the writes made after it
+    replica = str(tmp_path / 'replica.db')
+    backup.create_backup(app.database_path, replica)
+    replica_engine = create_database_engine(f'sqlite:///{replica}')
+    monkeypatch.setattr(app, 'read_engine', replica_engine)
+    monkeypatch.setattr(app, 'read_session', create_session(replica_engine))
+
+    client.post('/groups/', headers=auth_headers, json=dict(description='lagging'))
+    groups = client.get('/groups/', headers=auth_headers).json['groups']
+    assert 'lagging' not in [group['description'] for group in groups]
+
+    # once the replica is up to date the list is read again, it was cached with the
+    # versions of the replica
+    monkeypatch.setattr(app, 'read_session', app.session)
+    groups = client.get('/groups/', headers=auth_headers).json['groups']
+    assert 'lagging' in [group['description'] for group in groups]
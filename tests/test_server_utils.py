@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from database import models
+from database.utils import initiate_db
+from server import audit_log
+from server import utils
+
+
+def query_after_fork(app, queue):
+    utils.reset_connections(app)
+    queue.put(app.session.query(models.UserModel).count())
+
+
+def test_reset_connections_after_fork(tmp_path):
+    engine, session = initiate_db(str(tmp_path))
+    app = SimpleNamespace(engine=engine, session=session, read_engine=engine,
+                          audit_writer=audit_log.AuditWriter(engine))
+    assert app.session.query(models.UserModel).count() == 1
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    worker = context.Process(target=query_after_fork, args=(app, queue))
+    worker.start()
+    worker.join()
+
+    assert worker.exitcode == 0
+    assert queue.get(timeout=1) == 1
+    assert app.session.query(models.UserModel).count() == 1
+
+
+def test_failed_write_does_not_break_the_next_requests(app, client, auth_headers):
+    response = client.post('/servers/', headers=auth_headers, json=dict(
+        description=None, host='broken.local', port=22, server_type_id=1, connection_type=1))
+    assert response.status_code == 500
+
+    assert client.get('/groups/', headers=auth_headers).status_code == 200
+    response = client.post('/groups/', headers=auth_headers, json=dict(description='after'))
+    assert response.status_code == 200
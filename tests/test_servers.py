@@ -0,0 +1,55 @@
+import base64
+
+from database import models
+
+
+def basic_headers(username, password):
+    credentials = base64.b64encode(f'{username}:{password}'.encode('utf-8')).decode('utf-8')
+    return {'Authorization': f'Basic {credentials}'}
+
+
+def create_server(client, auth_headers, description):
+    response = client.post('/servers/', headers=auth_headers, json=dict(
+        description=description, host=f'{description}.local', port=22,
+        server_type_id=1, connection_type=1))
+    assert response.status_code == 200
+    return response.json['id']
+
+
+def test_servers_are_filtered_by_the_caller_groups(app, client, auth_headers):
+    visible = create_server(client, auth_headers, 'visible')
+    hidden = create_server(client, auth_headers, 'hidden')
+
+    group = models.GroupModel('operators')
+    user = models.UserModel('operator', 'Operator-pass1')
+    app.session.add_all([group, user])
+    app.session.commit()
+    app.session.add(models.UserGroupModel(group.id, user.id))
+    app.session.commit()
+
+    response = client.post('/server_permissions/', headers=auth_headers,
+                           json=dict(group_id=group.id, server_id=visible))
+    assert response.status_code == 200
+    response = client.post('/server_permissions/', headers=auth_headers,
+                           json=dict(group_id=group.id, server_id=visible))
+    assert response.status_code == 401
+
+    headers = basic_headers('operator', 'Operator-pass1')
+    servers = client.get('/servers/', headers=headers).json['server']
+    assert [server['id'] for server in servers] == [visible]
+    assert client.get(f'/servers/{visible}', headers=headers).status_code == 200
+    assert client.get(f'/servers/{hidden}', headers=headers).status_code == 401
+    assert client.delete(f'/servers/{hidden}', headers=headers).status_code == 401
+
+    permissions = client.get('/server_permissions/', headers=headers).json
+    assert len(permissions['server_permissions']) == 1
+
+    response = client.post('/server_permissions/', headers=headers,
+                           json=dict(group_id=group.id, server_id=hidden))
+    assert response.status_code == 401
+
+    servers = client.get('/servers/', headers=auth_headers).json['server']
+    assert {visible, hidden} <= {server['id'] for server in servers}
+
+    assert client.delete(f'/servers/{visible}', headers=auth_headers).status_code == 200
+    assert client.get('/servers/', headers=headers).json['server'] == []
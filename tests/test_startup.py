@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import startup_benchmark
+
+
+MAX_WALL_MS = float(os.getenv('STARTUP_MAX_WALL_MS', 5000))
+MAX_RSS_MB = float(os.getenv('STARTUP_MAX_RSS_MB', 200))
+
+
+def test_parse_importtime():
+    output = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       150 |        150 |     sqlalchemy.util',
+        'import time:      1000 |       1150 |   sqlalchemy',
+        'import time:       500 |        500 | flask',
+    ])
+    assert startup_benchmark.parse_importtime(output) == {'sqlalchemy': 1.15, 'flask': 0.5}
+
+
+def test_startup_within_thresholds():
+    result = startup_benchmark.profile_startup()
+
+    assert set(result['phases']) == {
+        'directories', 'database', 'resources', 'swagger', 'swagger_specs'}
+    assert 'sqlalchemy' in result['imports']
+    assert startup_benchmark.check_thresholds(result, MAX_WALL_MS, MAX_RSS_MB) == []
@@ -0,0 +1,98 @@
+import base64
+
+from database import models
+from server import tokens
+
+
+def test_issue_and_decode_token():
+    manager = tokens.TokenManager([('k1', b'secret')])
+    issued = manager.issue('admin')
+
+    payload = manager.decode(issued['token'])
+    assert payload['sub'] == 'admin'
+    assert issued['token_type'] == 'Bearer'
+
+
+def test_tampered_and_expired_tokens_are_rejected():
+    manager = tokens.TokenManager([('k1', b'secret')])
+    kid, payload, signature = manager.issue('admin')['token'].split('.')
+
+    forged = tokens.encode(b'{"sub": "other", "exp": 9999999999, "jti": "x"}')
+    assert manager.decode(f'{kid}.{forged}.{signature}') is None
+    assert manager.decode('not a token') is None
+
+    expired = tokens.TokenManager([('k1', b'secret')], ttl=-1)
+    assert expired.decode(expired.issue('admin')['token']) is None
+
+
+def test_key_rotation():
+    old = tokens.TokenManager([('k1', b'old secret')])
+    token = old.issue('admin')['token']
+
+    rotated = tokens.TokenManager([('k2', b'new secret'), ('k1', b'old secret')])
+    assert rotated.decode(token)['sub'] == 'admin'
+    assert rotated.issue('admin')['token'].startswith('k2.')
+
+    removed = tokens.TokenManager([('k2', b'new secret')])
+    assert removed.decode(token) is None
+
+
+def test_token_endpoints(app, client, auth_headers):
+    response = client.post('/auth/token', headers=auth_headers)
+    assert response.status_code == 200
+    bearer = {'Authorization': f'Bearer {response.json["token"]}'}
+
+    assert client.get('/groups/', headers=bearer).status_code == 200
+
+    response = client.post('/auth/token/refresh', headers=bearer)
+    assert response.status_code == 200
+    refreshed = {'Authorization': f'Bearer {response.json["token"]}'}
+
+    # the refresh replaces the token used on it
+    assert client.get('/groups/', headers=bearer).status_code == 401
+    assert client.post('/auth/token/refresh', headers=bearer).status_code == 401
+    assert client.get('/groups/', headers=refreshed).status_code == 200
+
+    assert client.post('/auth/token/revoke', headers=refreshed).status_code == 200
+    assert client.get('/groups/', headers=refreshed).status_code == 401
+
+
+def test_tokens_of_changed_and_deleted_users_are_rejected(app, client, auth_headers):
+    user = models.UserModel('token_user', 'Token-pass1')
+    app.session.add(user)
+    app.session.commit()
+    user_id = user.id
+
+    credentials = base64.b64encode(b'token_user:Token-pass1').decode('utf-8')
+    response = client.post('/auth/token', headers={'Authorization': f'Basic {credentials}'})
+    bearer = {'Authorization': f'Bearer {response.json["token"]}'}
+    assert client.get('/groups/', headers=bearer).status_code == 200
+
+    # the same password keeps the tokens, a new one revokes them
+    response = client.put(f'/users/{user_id}', headers=auth_headers,
+                          json=dict(name='token_user', password='Token-pass1'))
+    assert response.status_code == 200
+    assert client.get('/groups/', headers=bearer).status_code == 200
+
+    response = client.put(f'/users/{user_id}', headers=auth_headers,
+                          json=dict(name='token_user', password='Token-pass2'))
+    assert response.status_code == 200
+    assert client.get('/groups/', headers=bearer).status_code == 401
+
+    credentials = base64.b64encode(b'token_user:Token-pass2').decode('utf-8')
+    response = client.post('/auth/token', headers={'Authorization': f'Basic {credentials}'})
+    bearer = {'Authorization': f'Bearer {response.json["token"]}'}
+    assert client.get('/groups/', headers=bearer).status_code == 200
+
+    assert client.delete(f'/users/{user_id}', headers=auth_headers).status_code == 200
+    assert client.get('/groups/', headers=bearer).status_code == 401
+
+
+def test_revocation_is_synced_from_database(app):
+    other_worker = tokens.TokenManager(list(app.tokens.keys.items()))
+    token = app.tokens.issue('admin')['token']
+    assert other_worker.decode(token) is not None
+
+    app.tokens.revoke(app.session, app.tokens.decode(token))
+    other_worker.sync_denylist(app.session, force=True)
+    assert other_worker.decode(token) is None